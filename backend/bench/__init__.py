@@ -0,0 +1,3 @@
+"""
+Offline record/replay stubs and load-test benchmarks for the backend.
+"""
@@ -0,0 +1,279 @@
+"""
+Transport-level record/replay for the upstream APIs.
+
+Installing a Replayer patches the requests and httpx transports, so every call made by
+googlemaps, the weather module and the DeepSeek processor goes through it without any change
+to the app code. In 'record' mode requests go to the real APIs and each response is saved as a
+JSON file in a cassette directory. In 'replay' mode responses are served from the cassette, or
+generated by bench.synthetic when there is no recording. Either way a configurable latency is
+added per upstream service and every call is counted.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from . import synthetic
+
+MODE_RECORD = 'record'
+MODE_REPLAY = 'replay'
+
+# query parameters and headers left out of cassette keys and files
+SECRET_PARAMS = frozenset(['key', 'signature', 'client'])
+
+# (mean, jitter) in seconds added to each call, roughly what the real services take
+DEFAULT_LATENCY = {
+    'maps': (0.08, 0.03),
+    'weather': (0.05, 0.02),
+    'llm': (0.8, 0.3),
+}
+
+MAPS_ENDPOINTS = {
+    'directions': 'directions',
+    'geocode': 'geocode',
+    'nearbysearch': 'places_nearby',
+    'details': 'place',
+    'distancematrix': 'distance_matrix',
+}
+
+
+class ReplayMiss(Exception):
+    """
+    Raised in replay mode for a request with no recording and no synthetic response.
+    """
+    pass
+
+
+def classify(url: str) -> Tuple[str, str]:
+    """
+    Name the upstream service and endpoint of a URL.
+
+    Returns:
+        Tuple of (service, endpoint), e.g. ('maps', 'places_nearby') or ('weather', 'forecast')
+    """
+    parts = urlsplit(url)
+    if parts.hostname == 'maps.googleapis.com':
+        name = parts.path.rstrip('/').split('/')[-2]
+        return 'maps', MAPS_ENDPOINTS.get(name, name)
+    if parts.hostname == 'places.googleapis.com':
+        return 'maps', 'places_search_nearby'
+    if parts.hostname == 'api.open-meteo.com':
+        return 'weather', 'forecast'
+    if parts.hostname == 'openrouter.ai':
+        return 'llm', 'chat_completion'
+    return 'other', parts.hostname or ''
+
+
+def request_key(method: str, url: str, body: Optional[bytes]) -> str:
+    """Stable cassette key of a request, ignoring the API key and parameter order."""
+    parts = urlsplit(url)
+    params = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in SECRET_PARAMS)
+    digest = hashlib.sha1()
+    digest.update(f"{method.upper()} {parts.hostname}{parts.path} {params}".encode('utf-8'))
+    digest.update(body or b'')
+    return digest.hexdigest()
+
+
+class Replayer:
+    """
+    Records or replays upstream HTTP calls while installed.
+
+    Args:
+        mode: 'record' or 'replay'
+        cassette_dir: Directory of recorded responses, None to replay only synthetic responses
+        latency: Per-service (mean, jitter) seconds, merged over DEFAULT_LATENCY
+        latency_scale: Multiplier applied to every latency, 0 to disable it
+        use_synthetic: Whether replay falls back to synthetic responses for unrecorded requests
+        seed: Seed of the latency jitter
+    """
+
+    def __init__(self, mode: str = MODE_REPLAY, cassette_dir: Optional[str] = None,
+                 latency: Optional[Dict[str, Tuple[float, float]]] = None, latency_scale: float = 1.0,
+                 use_synthetic: bool = True, seed: int = 0):
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"Unknown replay mode: {mode}")
+        if mode == MODE_RECORD and not cassette_dir:
+            raise ValueError("Recording needs a cassette directory")
+
+        self.mode = mode
+        self.cassette_dir = cassette_dir
+        self.latency = {**DEFAULT_LATENCY, **(latency or {})}
+        self.latency_scale = latency_scale
+        self.use_synthetic = use_synthetic
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._originals = None
+        if cassette_dir:
+            os.makedirs(cassette_dir, exist_ok=True)
+
+    # -- installation -------------------------------------------------------------------
+
+    def install(self) -> 'Replayer':
+        """Patch the requests and httpx transports. Returns self."""
+        if self._originals is not None:
+            return self
+        self._originals = (HTTPAdapter.send, httpx.HTTPTransport.handle_request,
+                           httpx.AsyncHTTPTransport.handle_async_request)
+        replayer = self
+        original_send, original_handle, original_handle_async = self._originals
+
+        def send(adapter, request, **kwargs):
+            return replayer._send_requests(original_send, adapter, request, **kwargs)
+
+        def handle_request(transport, request):
+            return replayer._handle_httpx(original_handle, transport, request)
+
+        async def handle_async_request(transport, request):
+            return await replayer._handle_httpx_async(original_handle_async, transport, request)
+
+        HTTPAdapter.send = send
+        httpx.HTTPTransport.handle_request = handle_request
+        httpx.AsyncHTTPTransport.handle_async_request = handle_async_request
+        return self
+
+    def uninstall(self) -> None:
+        """Restore the original transports."""
+        if self._originals is None:
+            return
+        HTTPAdapter.send, httpx.HTTPTransport.handle_request, httpx.AsyncHTTPTransport.handle_async_request = \
+            self._originals
+        self._originals = None
+
+    def __enter__(self) -> 'Replayer':
+        return self.install()
+
+    def __exit__(self, *exc_info) -> None:
+        self.uninstall()
+
+    # -- bookkeeping --------------------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, int]:
+        """Return a copy of the per-endpoint call counts."""
+        with self._lock:
+            return dict(self.calls)
+
+    def _count(self, url: str) -> str:
+        service, endpoint = classify(url)
+        with self._lock:
+            self.calls[f"{service}.{endpoint}"] += 1
+        return service
+
+    def _delay(self, service: str) -> float:
+        mean, jitter = self.latency.get(service, (0.0, 0.0))
+        with self._lock:
+            delay = mean + self._random.uniform(-jitter, jitter)
+        return max(delay, 0.0) * self.latency_scale
+
+    # -- cassettes ----------------------------------------------------------------------
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cassette_dir, f"{key}.json")
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.cassette_dir or not os.path.exists(self._path(key)):
+            return None
+        with open(self._path(key), 'r', encoding='utf-8') as f:
+            return json.load(f)['response']
+
+    def _save(self, key: str, method: str, url: str, response: Dict[str, Any]) -> None:
+        parts = urlsplit(url)
+        params = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in SECRET_PARAMS]
+        record = {'request': {'method': method, 'url': f"{parts.scheme}://{parts.netloc}{parts.path}",
+                              'params': params},
+                  'response': response}
+        with open(self._path(key), 'w', encoding='utf-8') as f:
+            json.dump(record, f, indent=1)
+
+    def _replay(self, method: str, url: str, body: Optional[bytes]) -> Dict[str, Any]:
+        response = self._load(request_key(method, url, body))
+        if response is None and self.use_synthetic:
+            response = synthetic.respond(method, url, body)
+        if response is None:
+            raise ReplayMiss(f"No recording for {method} {urlsplit(url).path}")
+        return response
+
+    # -- transports ---------------------------------------------------------------------
+
+    def _send_requests(self, original_send, adapter, request, **kwargs):
+        service = self._count(request.url)
+        body = request.body.encode('utf-8') if isinstance(request.body, str) else request.body
+
+        if self.mode == MODE_RECORD:
+            started = time.monotonic()
+            response = original_send(adapter, request, **kwargs)
+            self._save(request_key(request.method, request.url, body), request.method, request.url, {
+                'status': response.status_code,
+                'headers': {'Content-Type': response.headers.get('Content-Type', 'application/json')},
+                'body': response.text,
+                'elapsed': time.monotonic() - started,
+            })
+            return response
+
+        try:
+            recorded = self._replay(request.method, request.url, body)
+        except ReplayMiss as e:
+            raise requests.ConnectionError(str(e), request=request)
+        time.sleep(self._delay(service))
+
+        response = requests.Response()
+        response.status_code = recorded['status']
+        response.headers = CaseInsensitiveDict(recorded.get('headers', {}))
+        response._content = recorded['body'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.reason = 'OK' if recorded['status'] == 200 else 'Replayed'
+        return response
+
+    def _httpx_response(self, request: httpx.Request, recorded: Dict[str, Any]) -> httpx.Response:
+        return httpx.Response(recorded['status'], headers=recorded.get('headers', {}),
+                              content=recorded['body'].encode('utf-8'), request=request)
+
+    def _handle_httpx(self, original_handle, transport, request):
+        service = self._count(str(request.url))
+        if self.mode == MODE_RECORD:
+            response = original_handle(transport, request)
+            response.read()
+            self._save(request_key(request.method, str(request.url), request.content), request.method,
+                       str(request.url), {'status': response.status_code,
+                                          'headers': {'Content-Type': response.headers.get('Content-Type', '')},
+                                          'body': response.text})
+            return response
+
+        try:
+            recorded = self._replay(request.method, str(request.url), request.content)
+        except ReplayMiss as e:
+            raise httpx.ConnectError(str(e), request=request)
+        time.sleep(self._delay(service))
+        return self._httpx_response(request, recorded)
+
+    async def _handle_httpx_async(self, original_handle_async, transport, request):
+        service = self._count(str(request.url))
+        if self.mode == MODE_RECORD:
+            response = await original_handle_async(transport, request)
+            await response.aread()
+            self._save(request_key(request.method, str(request.url), request.content), request.method,
+                       str(request.url), {'status': response.status_code,
+                                          'headers': {'Content-Type': response.headers.get('Content-Type', '')},
+                                          'body': response.text})
+            return response
+
+        try:
+            recorded = self._replay(request.method, str(request.url), request.content)
+        except ReplayMiss as e:
+            raise httpx.ConnectError(str(e), request=request)
+        await asyncio.sleep(self._delay(service))
+        return self._httpx_response(request, recorded)
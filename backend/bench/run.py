@@ -0,0 +1,186 @@
+"""
+Load-test benchmark for the route view, fully offline.
+
+Drives the Django index view in-process at several concurrency levels and route lengths with
+every upstream call going through a Replayer, and reports latency percentiles, throughput and
+upstream calls per request.
+
+Usage (from the backend directory):
+    python -m bench.run
+    python -m bench.run --concurrency 1,8,32 --route-km 20,200 --requests 64
+    python -m bench.run --replay cassettes/        # recorded responses, synthetic for the rest
+    python -m bench.run --record cassettes/ --requests 1 --concurrency 1   # real APIs, uses quota
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_API_KEY = 'AIzaBenchmarkReplayKey'  # googlemaps only checks the prefix
+DEFAULT_FILTERS = 'restaurant,cafe,park,museum'
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    index = min(int(round(fraction * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def setup_django(args: argparse.Namespace) -> None:
+    """Configure Django for benchmarking: in-process caches only and dummy keys when replaying."""
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'src.settings')
+    import django
+    from django.conf import settings
+    django.setup()
+
+    settings.ALLOWED_HOSTS = ['*']
+    settings.ASYNC_VIEWS = args.use_async
+    # keep the shared cache file out of it, every run starts cold
+    settings.MAPS_CACHE = {'BACKEND': None, 'MAX_ENTRIES': 2048}
+    if args.places_backend:
+        settings.PLACES_BACKEND = args.places_backend
+    if not args.record:
+        settings.GOOGLE_MAPS_API_KEY = settings.GOOGLE_MAPS_API_KEY or BENCH_API_KEY
+        settings.DEEPSEEK_API_KEY = settings.DEEPSEEK_API_KEY or 'bench'
+
+
+def route_params(args: argparse.Namespace, token: str, route_km: float, run: str, i: int) -> Dict[str, str]:
+    # unique addresses per request unless --warm, so caches and coalescing do not hide upstream work
+    suffix = '' if args.warm else f" {run}-{i}"
+    return {'start': f"Bench Start{suffix}", 'destination': f"Bench Destination{suffix} {route_km:g}km",
+            'format': args.format, 'prefs': token}
+
+
+def run_sync(args, token, route_km, concurrency, run) -> List[Any]:
+    from django.test import Client
+
+    def one(i):
+        started = time.perf_counter()
+        response = Client().get('/', route_params(args, token, route_km, run, i),
+                                HTTP_ACCEPT_ENCODING=args.accept_encoding)
+        return time.perf_counter() - started, response.status_code, len(response.content)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(one, range(args.requests)))
+
+
+def run_async(args, token, route_km, concurrency, run) -> List[Any]:
+    from django.test import AsyncClient
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one(i):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await AsyncClient().get('/', route_params(args, token, route_km, run, i),
+                                                   HTTP_ACCEPT_ENCODING=args.accept_encoding)
+                return time.perf_counter() - started, response.status_code, len(response.content)
+
+        return await asyncio.gather(*(one(i) for i in range(args.requests)))
+
+    return asyncio.run(main())
+
+
+def benchmark(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    from bench.replay import MODE_RECORD, MODE_REPLAY, Replayer
+    from src.preferences import Preferences, encode_preferences
+
+    replayer = Replayer(mode=MODE_RECORD if args.record else MODE_REPLAY,
+                        cassette_dir=args.record or args.replay,
+                        latency_scale=args.latency_scale,
+                        use_synthetic=not args.no_synthetic).install()
+    token = encode_preferences(Preferences(filters=args.filters.split(','), radius=args.radius))
+    runner = run_async if args.use_async else run_sync
+
+    rows = []
+    for route_km in args.route_km:
+        for concurrency in args.concurrency:
+            run = f"{route_km:g}-{concurrency}-{time.time_ns()}"
+            before = Counter(replayer.snapshot())
+            started = time.perf_counter()
+            results = runner(args, token, route_km, concurrency, run)
+            elapsed = time.perf_counter() - started
+            calls = Counter(replayer.snapshot()) - before
+
+            latencies = [latency for latency, _, _ in results]
+            errors = sum(1 for _, status, _ in results if status != 200)
+            rows.append({
+                'route_km': route_km,
+                'concurrency': concurrency,
+                'requests': len(results),
+                'errors': errors,
+                'p50_ms': percentile(latencies, 0.50) * 1000,
+                'p95_ms': percentile(latencies, 0.95) * 1000,
+                'p99_ms': percentile(latencies, 0.99) * 1000,
+                'throughput_rps': len(results) / elapsed,
+                'response_kb': sum(size for _, _, size in results) / len(results) / 1024,
+                'upstream_per_request': sum(calls.values()) / len(results),
+                'upstream_calls': dict(calls),
+            })
+            print_row(rows[-1])
+
+    replayer.uninstall()
+    return rows
+
+
+def print_row(row: Dict[str, Any]) -> None:
+    print(f"{row['route_km']:>8g} {row['concurrency']:>5} {row['requests']:>5} {row['errors']:>4} "
+          f"{row['p50_ms']:>9.0f} {row['p95_ms']:>9.0f} {row['p99_ms']:>9.0f} "
+          f"{row['throughput_rps']:>8.2f} {row['response_kb']:>7.1f} {row['upstream_per_request']:>9.1f}  "
+          + ' '.join(f"{name}={count}" for name, count in sorted(row['upstream_calls'].items())))
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--concurrency', default='1,4,16',
+                        type=lambda value: [int(v) for v in value.split(',')],
+                        help='comma-separated numbers of concurrent clients')
+    parser.add_argument('--route-km', default='20,100,400',
+                        type=lambda value: [float(v) for v in value.split(',')],
+                        help='comma-separated synthetic route lengths in km')
+    parser.add_argument('--requests', type=int, default=16, help='requests per (route length, concurrency)')
+    parser.add_argument('--filters', default=DEFAULT_FILTERS, help='comma-separated place types to search')
+    parser.add_argument('--radius', type=int, default=5000, help='search radius in meters')
+    parser.add_argument('--latency-scale', type=float, default=1.0,
+                        help='multiplier of the injected upstream latency, 0 to disable it')
+    parser.add_argument('--places-backend', choices=['nearby_search', 'legacy'],
+                        help='places backend to benchmark, settings.PLACES_BACKEND by default')
+    parser.add_argument('--format', choices=['json', 'compact'], default='json',
+                        help='route response format to request')
+    parser.add_argument('--accept-encoding', default='',
+                        help="Accept-Encoding header of the requests, e.g. 'gzip, br'")
+    parser.add_argument('--warm', action='store_true', help='repeat the same route so caches are hit')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='benchmark the async views')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--replay', metavar='DIR', help='replay recorded responses from DIR')
+    source.add_argument('--record', metavar='DIR', help='call the real APIs and record responses to DIR')
+    parser.add_argument('--no-synthetic', action='store_true',
+                        help='fail unrecorded requests instead of generating synthetic responses')
+    parser.add_argument('--json', metavar='FILE', help='also write the results as JSON to FILE')
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    setup_django(args)
+
+    print(f"{'route_km':>8} {'conc':>5} {'reqs':>5} {'errs':>4} {'p50_ms':>9} {'p95_ms':>9} {'p99_ms':>9} "
+          f"{'req/s':>8} {'kb':>7} {'upstream':>9}  calls")
+    rows = benchmark(args)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""
+Deterministic synthetic responses for the upstream APIs.
+
+Used by the Replayer for requests that have no recording, so benchmarks can run without any
+captured data. Responses have the shape of the real APIs and depend only on the request, so
+the same request always gets the same answer. Addresses are hashed to points around Los
+Angeles, and a destination like "somewhere 120km" makes the route that long (DEFAULT_ROUTE_KM
+otherwise).
+"""
+
+import hashlib
+import json
+import math
+import random
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from googlemaps.convert import encode_polyline
+
+DEFAULT_ROUTE_KM = 50
+ROUTE_VERTEX_SPACING_KM = 0.2
+DRIVING_SPEED_MPS = 25
+RESULTS_PER_NEARBY_SEARCH = 20
+ORIGIN_AREA = (34.05, -118.25, 0.5)  # lat, lng and spread in degrees of hashed addresses
+LLM_ANSWER = 'restaurant,tourist_attraction'
+
+COORDINATE_RE = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*,\s*(-?\d+(?:\.\d+)?)\s*$')
+LENGTH_RE = re.compile(r'(\d+(?:\.\d+)?)\s*km\b')
+
+
+def _random(*parts: Any) -> random.Random:
+    seed = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    return random.Random(seed)
+
+
+def _param(params: Dict[str, List[str]], name: str, default: str = '') -> str:
+    return params.get(name, [default])[0]
+
+
+def locate(address: str) -> Tuple[float, float]:
+    """Coordinates of an address: parsed if it is 'lat,lng', hashed near ORIGIN_AREA otherwise."""
+    match = COORDINATE_RE.match(address)
+    if match:
+        return float(match.group(1)), float(match.group(2))
+    lat, lng, spread = ORIGIN_AREA
+    rnd = _random('address', address.lower().strip())
+    return lat + rnd.uniform(-spread, spread), lng + rnd.uniform(-spread, spread)
+
+
+def _move(lat: float, lng: float, bearing: float, km: float) -> Tuple[float, float]:
+    """Move km along a bearing (radians) on a flat-earth approximation, fine for synthetic data."""
+    dlat = km * math.cos(bearing) / 111.0
+    dlng = km * math.sin(bearing) / (111.0 * math.cos(math.radians(lat)))
+    return lat + dlat, lng + dlng
+
+
+def _distance_m(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    dlat = (b[0] - a[0]) * 111000
+    dlng = (b[1] - a[1]) * 111000 * math.cos(math.radians(a[0]))
+    return math.hypot(dlat, dlng)
+
+
+def _location(value: str) -> Dict[str, float]:
+    lat, lng = locate(value)
+    return {'lat': lat, 'lng': lng}
+
+
+def directions(params: Dict[str, List[str]]) -> Dict[str, Any]:
+    origin = _param(params, 'origin')
+    destination = _param(params, 'destination')
+    match = LENGTH_RE.search(destination)
+    length_km = float(match.group(1)) if match else DEFAULT_ROUTE_KM
+
+    rnd = _random('route', origin, destination)
+    point = locate(origin)
+    bearing = rnd.uniform(0, 2 * math.pi)
+    points = [point]
+    for _ in range(max(int(length_km / ROUTE_VERTEX_SPACING_KM), 1)):
+        bearing += rnd.uniform(-0.15, 0.15)
+        point = _move(point[0], point[1], bearing, ROUTE_VERTEX_SPACING_KM)
+        points.append(point)
+
+    distance = int(length_km * 1000)
+    return {'status': 'OK', 'routes': [{
+        'overview_polyline': {'points': encode_polyline(points)},
+        'legs': [{
+            'start_address': origin,
+            'end_address': destination,
+            'start_location': {'lat': points[0][0], 'lng': points[0][1]},
+            'end_location': {'lat': points[-1][0], 'lng': points[-1][1]},
+            'distance': {'value': distance, 'text': f"{length_km:g} km"},
+            'duration': {'value': distance // DRIVING_SPEED_MPS, 'text': ''},
+        }],
+    }]}
+
+
+def geocode(params: Dict[str, List[str]]) -> Dict[str, Any]:
+    address = _param(params, 'address')
+    return {'status': 'OK', 'results': [{'formatted_address': address,
+                                         'geometry': {'location': _location(address)}}]}
+
+
+def places_nearby(params: Dict[str, List[str]]) -> Dict[str, Any]:
+    lat, lng = locate(_param(params, 'location'))
+    place_type = _param(params, 'type', 'point_of_interest')
+    radius_deg = float(_param(params, 'radius', '5000')) / 111000
+
+    rnd = _random('nearby', round(lat, 4), round(lng, 4), place_type)
+    results = []
+    for i in range(RESULTS_PER_NEARBY_SEARCH):
+        place_lat = lat + rnd.uniform(-radius_deg, radius_deg)
+        place_lng = lng + rnd.uniform(-radius_deg, radius_deg)
+        place_id = 'syn_' + hashlib.sha1(f"{place_lat:.5f},{place_lng:.5f},{place_type}".encode()).hexdigest()[:20]
+        results.append({
+            'place_id': place_id,
+            'name': f"{place_type.replace('_', ' ').title()} {i + 1}",
+            'geometry': {'location': {'lat': place_lat, 'lng': place_lng}},
+            'types': [place_type, 'point_of_interest', 'establishment'],
+            'rating': round(rnd.uniform(2.5, 5.0), 1),
+            'user_ratings_total': rnd.randint(0, 5000),
+            'photos': [{'photo_reference': f"photo_{place_id}", 'width': 800, 'height': 600}]
+            if rnd.random() < 0.8 else [],
+        })
+    return {'status': 'OK', 'results': results}
+
+
+def search_nearby(body: Optional[bytes]) -> Dict[str, Any]:
+    """Places API (New) Nearby Search: one page shared by the included types."""
+    request = json.loads(body or b'{}')
+    circle = request['locationRestriction']['circle']
+    lat, lng = circle['center']['latitude'], circle['center']['longitude']
+    radius_deg = float(circle.get('radius', 5000)) / 111000
+    place_types = request.get('includedTypes') or ['point_of_interest']
+
+    rnd = _random('search_nearby', round(lat, 4), round(lng, 4), tuple(place_types))
+    places = []
+    for i in range(min(int(request.get('maxResultCount', RESULTS_PER_NEARBY_SEARCH)), RESULTS_PER_NEARBY_SEARCH)):
+        place_type = place_types[i % len(place_types)]
+        place_lat = lat + rnd.uniform(-radius_deg, radius_deg)
+        place_lng = lng + rnd.uniform(-radius_deg, radius_deg)
+        place_id = 'syn_' + hashlib.sha1(f"{place_lat:.5f},{place_lng:.5f},{place_type}".encode()).hexdigest()[:20]
+        places.append({
+            'id': place_id,
+            'displayName': {'text': f"{place_type.replace('_', ' ').title()} {i + 1}", 'languageCode': 'en'},
+            'location': {'latitude': place_lat, 'longitude': place_lng},
+            'types': [place_type, 'point_of_interest', 'establishment'],
+            'rating': round(rnd.uniform(2.5, 5.0), 1),
+            'userRatingCount': rnd.randint(0, 5000),
+            'photos': [{'name': f"places/{place_id}/photos/photo_{place_id}", 'widthPx': 800, 'heightPx': 600}]
+            if rnd.random() < 0.8 else [],
+        })
+    return {'places': places}
+
+
+def place(params: Dict[str, List[str]]) -> Dict[str, Any]:
+    place_id = _param(params, 'placeid') or _param(params, 'place_id')
+    return {'status': 'OK', 'result': {
+        'website': f"https://example.com/{place_id}",
+        'formatted_phone_number': '(555) 010-0000',
+        'opening_hours': {'open_now': True, 'weekday_text': [f"{day}: 9:00 AM – 9:00 PM" for day in
+                                                             ('Monday', 'Tuesday', 'Wednesday', 'Thursday',
+                                                              'Friday', 'Saturday', 'Sunday')]},
+    }}
+
+
+def distance_matrix(params: Dict[str, List[str]]) -> Dict[str, Any]:
+    origins = [locate(value) for value in _param(params, 'origins').split('|')]
+    destinations = [locate(value) for value in _param(params, 'destinations').split('|')]
+    rows = []
+    for origin in origins:
+        elements = []
+        for destination in destinations:
+            meters = int(_distance_m(origin, destination) * 1.3)
+            elements.append({'status': 'OK', 'distance': {'value': meters},
+                             'duration': {'value': meters // DRIVING_SPEED_MPS}})
+        rows.append({'elements': elements})
+    return {'status': 'OK', 'rows': rows}
+
+
+def forecast(params: Dict[str, List[str]]) -> Any:
+    latitudes = _param(params, 'latitude').split(',')
+    longitudes = _param(params, 'longitude').split(',')
+    bodies = []
+    for lat, lng in zip(latitudes, longitudes):
+        rnd = _random('weather', lat, lng)
+        bodies.append({'latitude': float(lat), 'longitude': float(lng), 'current': {
+            'time': '2025-01-01T12:00',
+            'temperature_2m': round(rnd.uniform(5, 35), 1),
+            'relative_humidity_2m': rnd.randint(10, 90),
+            'apparent_temperature': round(rnd.uniform(5, 35), 1),
+            'precipitation': 0.0,
+            'weather_code': rnd.choice([0, 1, 2, 3, 61]),
+            'wind_speed_10m': round(rnd.uniform(0, 20), 1),
+        }})
+    return bodies if len(bodies) > 1 else bodies[0]
+
+
+def chat_completion() -> Dict[str, Any]:
+    return {'choices': [{'message': {'role': 'assistant', 'content': LLM_ANSWER}}]}
+
+
+MAPS_RESPONDERS = {
+    'directions': directions,
+    'geocode': geocode,
+    'nearbysearch': places_nearby,
+    'details': place,
+    'distancematrix': distance_matrix,
+}
+
+
+def respond(method: str, url: str, body: Optional[bytes]) -> Optional[Dict[str, Any]]:
+    """
+    Build a synthetic response for a request.
+
+    Returns:
+        Dictionary with 'status', 'headers' and 'body' (text), or None for unknown endpoints
+    """
+    parts = urlsplit(url)
+    params = parse_qs(parts.query)
+    if parts.hostname == 'maps.googleapis.com':
+        responder = MAPS_RESPONDERS.get(parts.path.rstrip('/').split('/')[-2])
+        payload = responder(params) if responder else None
+    elif parts.hostname == 'places.googleapis.com' and parts.path.endswith(':searchNearby'):
+        payload = search_nearby(body)
+    elif parts.hostname == 'api.open-meteo.com':
+        payload = forecast(params)
+    elif parts.hostname == 'openrouter.ai':
+        payload = chat_completion()
+    else:
+        payload = None
+
+    if payload is None:
+        return None
+    return {'status': 200, 'headers': {'Content-Type': 'application/json'}, 'body': json.dumps(payload)}
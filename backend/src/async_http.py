@@ -0,0 +1,41 @@
+"""
+Shared async HTTP client for the async views.
+
+httpx connection pools are bound to the event loop they were created on, so one client is
+kept per running loop. Under the ASGI entry point that is a single long-lived pool for the
+whole process. Blocking work the async code cannot avoid, like googlemaps calls and reads
+and writes of the SQLite or Redis cache tier, goes through in_thread instead.
+"""
+
+import asyncio
+import weakref
+
+import httpx
+from asgiref.sync import sync_to_async
+
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def in_thread(func):
+    """Run a blocking function in a worker thread instead of Django's single sync thread."""
+    return sync_to_async(func, thread_sensitive=False)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Return the pooled AsyncClient for the running event loop, creating it on first use.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=DEFAULT_TIMEOUT,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS,
+                                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS),
+        )
+        _clients[loop] = client
+    return client
@@ -0,0 +1,137 @@
+"""
+Async versions of the index, preferences and DeepSeek views.
+
+These are served when settings.ASYNC_VIEWS is on and the app runs under the ASGI entry
+point (src.asgi), so one process can hold hundreds of route requests in flight. DeepSeek
+and Open-Meteo are called through the shared httpx connection pool. googlemaps has no
+async client, so the Google Maps stages run in worker threads without blocking the event loop.
+"""
+
+import json
+import logging
+from typing import AsyncIterator, Iterator
+
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import render
+from django.views.decorators.csrf import csrf_exempt
+
+from .async_http import in_thread
+from .deepseek_processor import ask_model_async
+from .views import (RouteError, classify_locally, get_category_filters, get_job_format, get_route_result,
+                    get_stream_format, get_users_preferences, iter_route_events, llm_classification,
+                    make_stream_response, parse_search_radius, preferences_response, replay_route_stream,
+                    resolve_route_endpoints, route_not_modified, route_request_key, route_response,
+                    start_route_job)
+from .weather import get_weather_for_points_async
+
+logger = logging.getLogger(__name__)
+
+
+async def iterate_in_thread(iterator: Iterator[str]) -> AsyncIterator[str]:
+    """Consume a blocking iterator from a worker thread, one item at a time."""
+    done = object()
+    while True:
+        item = await in_thread(next)(iterator, done)
+        if item is done:
+            return
+        yield item
+
+
+async def index(request):
+    """
+    Async version of views.index.
+    """
+    # Get the user's input from the query parameters
+    start = request.GET.get('start')
+    destination = request.GET.get('destination')
+    if not start or not destination:
+        # If it's just opening the root page (no query), return HTML
+        if "text/html" in request.headers.get("Accept", ""):
+            return render(request, "index.html", {"google_api_key": settings.GOOGLE_MAPS_API_KEY})
+        return JsonResponse({"error": "Missing start or destination"}, status=400)
+
+    preferences = get_users_preferences(request)
+
+    if request.GET.get('mode') == 'job':
+        return await in_thread(start_route_job)(start, destination, preferences, get_job_format(request))
+
+    # the ETag lookup and record may go to the SQLite or Redis tier of the cache, off the event loop
+    not_modified = await in_thread(route_not_modified)(request, start, destination, preferences)
+    if not_modified is not None:
+        return not_modified
+
+    try:
+        # Stream the route and places as they resolve if the client asked for it
+        stream_format = get_stream_format(request)
+        if stream_format:
+            replay = await in_thread(replay_route_stream)(request, start, destination, preferences, stream_format)
+            if replay is not None:
+                return replay
+            route_data, start_coords, dest_coords = await in_thread(resolve_route_endpoints)(start, destination)
+            events = iter_route_events(stream_format, route_data, preferences, start_coords, dest_coords,
+                                       key=route_request_key(start, destination, preferences))
+            return make_stream_response(iterate_in_thread(events), stream_format)
+
+        # Find places along the route (shared with identical requests in flight), then fill in
+        # their weather over the async client
+        result = await in_thread(get_route_result)(start, destination, preferences, fetch_weather=False)
+    except RouteError as e:
+        return HttpResponse(str(e), status=500)
+
+    # copy the entries since the result may be shared with other requests
+    places = {key: list(entry) for key, entry in result['places'].items()}
+    weather = await get_weather_for_points_async([(entry[0], entry[1]) for entry in places.values()])
+    for entry, place_weather in zip(places.values(), weather):
+        entry[7] = place_weather
+
+    return await in_thread(route_response)(request, dict(result, places=places), preferences)
+
+
+@csrf_exempt
+async def set_user_preferences(request):
+    """
+    Async version of views.set_user_preferences.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+
+    try:
+        payload = json.loads(request.body.decode('utf-8') or '{}')
+        categories = payload.get('categories', [])
+        deepseek_input = payload.get('custom_input', '')
+
+        if not isinstance(categories, list):
+            return JsonResponse({'error': 'categories must be a list'}, status=400)
+
+        radius = parse_search_radius(payload.get('radius', None))
+        filters = get_category_filters(categories)
+
+        classification = (classify_locally(deepseek_input)
+                          or llm_classification(await ask_model_async(settings.DEEPSEEK_API_KEY, deepseek_input)))
+        if classification.tags: # not empty
+            filters = classification.tags + filters
+
+        return preferences_response(filters, radius, deepseek_input, classification.source)
+    except Exception as e:
+        logger.error(f"Failed to set preferences: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@csrf_exempt
+async def deepseek_api(request):
+    """
+    Async version of views.deepseek_api.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    try:
+        payload = json.loads(request.body.decode('utf-8') or '{}')
+        query = payload.get('query', '')
+        if not query:
+            return JsonResponse({'error': 'Missing query'}, status=400)
+        result = await ask_model_async(settings.DEEPSEEK_API_KEY, query)
+        return JsonResponse({'result': result})
+    except Exception as e:
+        logger.error(f"DeepSeek API error: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
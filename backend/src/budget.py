@@ -0,0 +1,142 @@
+"""
+Call budgets for the places_nearby searches of a route.
+
+Each route gets at most a fixed number of searches, further limited by a per-minute budget
+shared by every request in the process. When the route needs more searches than it is granted,
+the granted ones go where they help most: sample points are ranked by how much of the route they
+cover that higher-ranked points do not (the ends first, then repeated bisection), and filters
+by how often they have produced a place so far.
+"""
+
+import heapq
+import threading
+import time
+from typing import Dict, List, Sequence, Tuple
+
+
+class RateBudget:
+    """
+    Token bucket holding at most per_minute calls, refilled continuously.
+    """
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self._tokens = float(per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.per_minute, self._tokens + (now - self._updated) * self.per_minute / 60)
+        self._updated = now
+
+    def take(self, wanted: int) -> int:
+        """
+        Take up to wanted calls from the budget without waiting.
+
+        Returns:
+            The number of calls granted, between 0 and wanted
+        """
+        with self._lock:
+            self._refill()
+            granted = max(0, min(wanted, int(self._tokens)))
+            self._tokens -= granted
+            return granted
+
+    def give_back(self, unused: int) -> None:
+        """Return calls that were granted but not made."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.per_minute, self._tokens + unused)
+
+    def available(self) -> int:
+        with self._lock:
+            self._refill()
+            return int(self._tokens)
+
+
+class FilterYield:
+    """
+    How often searches for each place type produced a place, with a uniform prior so
+    untried types start at 0.5.
+    """
+
+    def __init__(self):
+        self._counts: Dict[str, List[int]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, place_type: str, produced: bool) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(place_type, [0, 0])
+            counts[0] += produced
+            counts[1] += 1
+
+    def expected(self, place_type: str) -> float:
+        with self._lock:
+            produced, searched = self._counts.get(place_type, (0, 0))
+        return (produced + 1) / (searched + 2)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            types = list(self._counts)
+        return {place_type: round(self.expected(place_type), 3) for place_type in types}
+
+
+def coverage_gains(count: int) -> List[float]:
+    """
+    Score each of count evenly spaced sample points by the stretch of route it covers on top of
+    the points ranked before it: both ends first, then the midpoint of the widest remaining gap.
+
+    Returns:
+        List of gains aligned with the points, the largest gains go to the points worth searching first
+    """
+    if count <= 0:
+        return []
+    gains = [0.0] * count
+    gains[0] = float(count)
+    if count == 1:
+        return gains
+    gains[-1] = float(count)
+
+    # widest gap first; the negated width keeps heapq a max-heap
+    gaps = [(-(count - 1), 0, count - 1)]
+    while gaps:
+        width, low, high = heapq.heappop(gaps)
+        if high - low < 2:
+            continue
+        middle = (low + high) // 2
+        gains[middle] = -width / 2
+        heapq.heappush(gaps, (-(middle - low), low, middle))
+        heapq.heappush(gaps, (-(high - middle), middle, high))
+    return gains
+
+
+def allocate(point_count: int, place_types: Sequence[str], budget: int,
+             expected_yield: Dict[str, float]) -> List[Tuple[int, str]]:
+    """
+    Choose which (sample point, place type) searches to run within a budget.
+
+    Every search is scored by the coverage gain of its point times the expected yield of its
+    type, and the budget best scores are kept.
+
+    Args:
+        point_count: Number of sample points along the route
+        place_types: Types to search at each point, in display order
+        budget: Maximum number of searches
+        expected_yield: Expected yield of each type, between 0 and 1
+
+    Returns:
+        The chosen (point index, place type) pairs ordered by point, then by type as given
+    """
+    candidates = [(point, place_type) for point in range(point_count) for place_type in place_types]
+    if budget >= len(candidates):
+        return candidates
+    if budget <= 0:
+        return []
+
+    gains = coverage_gains(point_count)
+    type_order = {place_type: i for i, place_type in enumerate(place_types)}
+    chosen = heapq.nlargest(budget, candidates,
+                            key=lambda lookup: (gains[lookup[0]] * expected_yield.get(lookup[1], 0.5),
+                                                -type_order[lookup[1]], -lookup[0]))
+    return sorted(chosen, key=lambda lookup: (lookup[0], type_order[lookup[1]]))
@@ -0,0 +1,398 @@
+"""
+Response cache for upstream API calls.
+
+An in-process LRU with per-entry TTL sits in front of an optional shared tier
+(a local SQLite file or a Redis-compatible server) so that repeated and
+overlapping routes are answered without calling Google again.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .instrumentation import CACHE_HIT, CACHE_MISS, span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 2048
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache where every entry carries its own expiry time.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (found, value) for key, dropping it if it has expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def _store(self, key: str, value: Any, ttl: float) -> None:
+        # callers hold the lock
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store value under key for ttl seconds, evicting the least recently used entry if full."""
+        with self._lock:
+            self._store(key, value, ttl)
+
+    def add(self, key: str, value: Any, ttl: float) -> bool:
+        """Store value only if key is absent or expired. Returns True if it was stored."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                return False
+            self._store(key, value, ttl)
+            return True
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteStore:
+    """
+    Shared cache tier backed by a local SQLite file. Values are stored as JSON text.
+    """
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        self._local = threading.local()
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections cannot be shared between threads, so keep one per thread
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[str]:
+        return self.get_with_ttl(key)[0]
+
+    def get_with_ttl(self, key: str) -> Tuple[Optional[str], Optional[float]]:
+        """Return (value, seconds until it expires), (None, None) if key is absent or expired."""
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None, None
+        remaining = row[1] - time.time()
+        if remaining < 0:
+            self.delete(key)
+            return None, None
+        return row[0], remaining
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl)
+        )
+
+    def add(self, key: str, value: str, ttl: float) -> bool:
+        """Store value only if key is absent or expired. Returns True if it was stored."""
+        connection = self._connection()
+        now = time.time()
+        connection.execute("DELETE FROM cache_entries WHERE key = ? AND expires_at < ?", (key, now))
+        cursor = connection.execute(
+            "INSERT OR IGNORE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, now + ttl)
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key: str) -> None:
+        self._connection().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+
+class RedisStore:
+    """
+    Shared cache tier backed by Redis or any server speaking the Redis protocol.
+
+    Any object with Redis-style get/set(..., px=)/delete methods can be passed as client,
+    which lets a local stand-in replace a real server.
+    """
+
+    def __init__(self, url: Optional[str] = None, client: Any = None, prefix: str = 'journey:'):
+        if client is None:
+            import redis  # optional dependency, only needed when this tier is configured
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(self.prefix + key)
+        if isinstance(value, bytes):
+            value = value.decode('utf-8')
+        return value
+
+    def get_with_ttl(self, key: str) -> Tuple[Optional[str], Optional[float]]:
+        """Return (value, seconds until it expires), the time None if the client cannot tell."""
+        value = self.get(key)
+        pttl = getattr(self.client, 'pttl', None)
+        if value is None or pttl is None:
+            return value, None
+        remaining = pttl(self.prefix + key)
+        return value, remaining / 1000 if remaining is not None and remaining >= 0 else None
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self.client.set(self.prefix + key, value, px=max(int(ttl * 1000), 1))
+
+    def add(self, key: str, value: str, ttl: float) -> bool:
+        """Store value only if key is absent. Returns True if it was stored."""
+        return bool(self.client.set(self.prefix + key, value, px=max(int(ttl * 1000), 1), nx=True))
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+
+class TieredCache:
+    """
+    Two-level cache: the in-process LRU is checked first, then the shared tier.
+
+    Hits from the shared tier are copied into the LRU for no longer than they have left in the
+    shared tier. Failures in the shared tier are logged and treated as misses so that the cache
+    can never take the app down.
+    """
+
+    def __init__(self, local: LRUCache, shared: Any = None):
+        self.local = local
+        self.shared = shared
+        self._stats = {}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, namespace: str, outcome: str) -> None:
+        with self._stats_lock:
+            counters = self._stats.setdefault(namespace, {'local_hits': 0, 'shared_hits': 0, 'misses': 0})
+            counters[outcome] += 1
+
+    def get(self, key: str, ttl: float, namespace: str = 'default') -> Tuple[bool, Any]:
+        """
+        Look up key in both tiers.
+
+        Args:
+            key: Cache key
+            ttl: Longest TTL used when promoting a shared-tier hit into the LRU
+            namespace: Name the hit/miss counters are recorded under
+
+        Returns:
+            Tuple of (found, value)
+        """
+        found, value = self.local.get(key)
+        if found:
+            self._count(namespace, 'local_hits')
+            return True, value
+
+        if self.shared is not None:
+            try:
+                raw, remaining = self.shared.get_with_ttl(key)
+            except Exception as e:
+                logger.warning(f"Shared cache read failed for {key}: {e}")
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self.local.set(key, value, ttl if remaining is None else min(ttl, remaining))
+                self._count(namespace, 'shared_hits')
+                return True, value
+
+        self._count(namespace, 'misses')
+        return False, None
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store value in both tiers for ttl seconds."""
+        self.local.set(key, value, ttl)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, json.dumps(value), ttl)
+            except Exception as e:
+                logger.warning(f"Shared cache write failed for {key}: {e}")
+
+    def add(self, key: str, value: Any, ttl: float) -> bool:
+        """
+        Atomically store value only if key is not already set, for use as a lock.
+
+        The shared tier is used when configured so that the lock holds across processes.
+
+        Returns:
+            True if the value was stored, False if key was already set
+        """
+        if self.shared is None:
+            return self.local.add(key, value, ttl)
+        try:
+            return self.shared.add(key, json.dumps(value), ttl)
+        except Exception as e:
+            logger.warning(f"Shared cache add failed for {key}: {e}")
+            return self.local.add(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        """Remove key from both tiers."""
+        self.local.delete(key)
+        if self.shared is not None:
+            try:
+                self.shared.delete(key)
+            except Exception as e:
+                logger.warning(f"Shared cache delete failed for {key}: {e}")
+
+    def get_or_set(self, key: str, ttl: float, compute: Callable[[], Any], namespace: str = 'default') -> Any:
+        """Return the cached value for key, calling compute and caching its result on a miss."""
+        found, value = self.get(key, ttl, namespace)
+        if found:
+            return value
+        value = compute()
+        self.set(key, value, ttl)
+        return value
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return a copy of the hit/miss counters per namespace."""
+        with self._stats_lock:
+            return {namespace: dict(counters) for namespace, counters in self._stats.items()}
+
+
+def make_key(namespace: str, params: Dict[str, Any]) -> str:
+    """
+    Build a canonical cache key from a namespace and call parameters.
+
+    Args:
+        namespace: Call type, e.g. 'geocode'
+        params: JSON-serializable parameters, already normalized by the caller
+
+    Returns:
+        Key of the form '<namespace>:<sha1 of the sorted parameters>'
+    """
+    encoded = json.dumps(params, sort_keys=True, separators=(',', ':'), default=str)
+    return f"{namespace}:{hashlib.sha1(encoded.encode('utf-8')).hexdigest()}"
+
+
+def build_cache(config: Optional[Dict[str, Any]] = None) -> TieredCache:
+    """
+    Create a TieredCache from a settings dictionary.
+
+    Args:
+        config: Dictionary with BACKEND ('sqlite', 'redis' or None), LOCATION and MAX_ENTRIES
+
+    Returns:
+        The configured cache. Falls back to in-process only if the shared tier cannot be opened.
+    """
+    config = config or {}
+    local = LRUCache(config.get('MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+
+    backend = config.get('BACKEND')
+    shared = None
+    try:
+        if backend == 'sqlite':
+            shared = SQLiteStore(config['LOCATION'])
+        elif backend == 'redis':
+            shared = RedisStore(config['LOCATION'])
+    except Exception as e:
+        logger.error(f"Failed to open {backend} cache tier, using in-process cache only: {e}")
+        shared = None
+
+    return TieredCache(local, shared)
+
+
+def _round_location(value: Any) -> Any:
+    """Round (lat, lng) pairs and 'lat,lng' strings to ~1 m so nearby calls share a key."""
+    if isinstance(value, (tuple, list)) and len(value) == 2:
+        try:
+            return [round(float(value[0]), 5), round(float(value[1]), 5)]
+        except (TypeError, ValueError):
+            return list(value)
+    if isinstance(value, dict) and 'lat' in value and 'lng' in value:
+        return [round(float(value['lat']), 5), round(float(value['lng']), 5)]
+    if isinstance(value, str):
+        return ' '.join(value.lower().split())
+    return value
+
+
+class CachedMapsClient:
+    """
+    Wraps a googlemaps.Client so that every lookup goes through a TieredCache first.
+
+    Only the methods the app uses are cached; anything else is passed straight through.
+    """
+
+    # seconds each endpoint's responses stay fresh
+    ENDPOINT_TTLS = {
+        'directions': 6 * 60 * 60,
+        'geocode': 30 * 24 * 60 * 60,
+        'places_nearby': 24 * 60 * 60,
+        'place': 24 * 60 * 60,
+        'distance_matrix': 60 * 60,
+    }
+
+    def __init__(self, client: Any, cache: TieredCache):
+        self.client = client
+        self.cache = cache
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.client, name)
+
+    def _cached(self, endpoint: str, params: Dict[str, Any], call: Callable[[], Any]) -> Any:
+        key = make_key(endpoint, params)
+        ttl = self.ENDPOINT_TTLS[endpoint]
+        with span(endpoint) as current:
+            found, value = self.cache.get(key, ttl, namespace=endpoint)
+            current.cache = CACHE_HIT if found else CACHE_MISS
+            if not found:
+                value = call()
+                self.cache.set(key, value, ttl)
+        return value
+
+    def directions(self, origin, destination, mode=None, **kwargs):
+        params = {'origin': _round_location(origin), 'destination': _round_location(destination),
+                  'mode': mode, **kwargs}
+        return self._cached('directions', params,
+                            lambda: self.client.directions(origin, destination, mode=mode, **kwargs))
+
+    def geocode(self, address=None, **kwargs):
+        params = {'address': _round_location(address), **kwargs}
+        return self._cached('geocode', params, lambda: self.client.geocode(address, **kwargs))
+
+    def places_nearby(self, location=None, radius=None, type=None, **kwargs):
+        params = {'location': _round_location(location), 'radius': radius, 'type': type, **kwargs}
+        return self._cached('places_nearby', params,
+                            lambda: self.client.places_nearby(location=location, radius=radius, type=type, **kwargs))
+
+    def place(self, place_id, **kwargs):
+        params = {'place_id': place_id, **kwargs}
+        return self._cached('place', params, lambda: self.client.place(place_id, **kwargs))
+
+    def distance_matrix(self, origins, destinations, mode=None, **kwargs):
+        params = {'origins': [_round_location(origin) for origin in origins],
+                  'destinations': [_round_location(destination) for destination in destinations],
+                  'mode': mode, **kwargs}
+        return self._cached('distance_matrix', params,
+                            lambda: self.client.distance_matrix(origins, destinations, mode=mode, **kwargs))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return hit/miss counters per endpoint."""
+        return self.cache.stats()
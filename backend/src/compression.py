@@ -0,0 +1,120 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+JSON route responses are highly repetitive, so they shrink several times with gzip and a bit
+more with brotli. Brotli is used when the client accepts it, gzip otherwise. brotli is pinned
+in requirements.txt, which both the Docker image and the Vercel build install. Where it is
+missing anyway, a warning is logged at startup and gzip is sent instead. Streamed responses
+are left alone: compressing them would buffer the events the stream exists to deliver early.
+"""
+
+import gzip
+import logging
+from typing import Optional
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import sync_and_async_middleware
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+    logger.warning("brotli is not installed, responses are compressed with gzip only (see requirements.txt)")
+
+ENCODING_BROTLI = 'br'
+ENCODING_GZIP = 'gzip'
+
+DEFAULT_COMPRESSION_MIN_BYTES = 512  # smaller bodies are not worth the CPU and headers
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # fast enough per request, the high qualities are meant for static assets
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'text/')
+
+
+def accepted_encodings(accept_encoding: str) -> dict:
+    """Parse an Accept-Encoding header into {coding: q}."""
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.strip()] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    The content coding to send: brotli if installed and accepted, else gzip if accepted.
+
+    Returns:
+        'br', 'gzip' or None to send the body as it is
+    """
+    accepted = accepted_encodings(accept_encoding)
+    wildcard = accepted.get('*', 0.0)
+    if brotli is not None and accepted.get(ENCODING_BROTLI, wildcard) > 0:
+        return ENCODING_BROTLI
+    if accepted.get(ENCODING_GZIP, wildcard) > 0:
+        return ENCODING_GZIP
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == ENCODING_BROTLI:
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(request, response):
+    """Compress the body of response in place if the request accepts it and it is worth it."""
+    if response.streaming or response.has_header('Content-Encoding'):
+        return response
+    if not response.get('Content-Type', '').startswith(COMPRESSIBLE_TYPES):
+        return response
+
+    patch_vary_headers(response, ('Accept-Encoding',))
+    min_bytes = getattr(settings, 'COMPRESSION_MIN_BYTES', DEFAULT_COMPRESSION_MIN_BYTES)
+    if len(response.content) < min_bytes:
+        return response
+    encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+    if encoding is None:
+        return response
+
+    compressed = compress(response.content, encoding)
+    if len(compressed) >= len(response.content):
+        return response
+
+    # the compressed bytes differ from the ones a strong ETag was computed over
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+    response.content = compressed
+    response['Content-Length'] = str(len(compressed))
+    response['Content-Encoding'] = encoding
+    return response
+
+
+@sync_and_async_middleware
+def compression_middleware(get_response):
+    """
+    Compress JSON and text responses with brotli or gzip, as negotiated with the client.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            response = await get_response(request)
+            return compress_response(request, response)
+    else:
+        def middleware(request):
+            response = get_response(request)
+            return compress_response(request, response)
+    return middleware
@@ -0,0 +1,40 @@
+"""
+Bounded-concurrency helpers for fanning out blocking upstream calls.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from typing import Callable, Iterable, List, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+DEFAULT_MAX_IN_FLIGHT = 8
+
+
+def run_bounded(func: Callable[[T], R], items: Iterable[T], max_in_flight: int = DEFAULT_MAX_IN_FLIGHT) -> List[R]:
+    """
+    Call func on every item using at most max_in_flight worker threads.
+
+    Each call runs in a copy of the caller's context, so context variables such as the
+    request trace of the instrumentation module are visible in the worker threads.
+
+    Args:
+        func: Function to call for each item. It should handle its own errors.
+        items: The inputs to fan out over
+        max_in_flight: Upper bound on the number of calls running at once
+
+    Returns:
+        List of results in the same order as items, regardless of completion order
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    workers = max(1, min(max_in_flight, len(items)))
+    if workers == 1:
+        return [func(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(copy_context().run, func, item) for item in items]
+        return [future.result() for future in futures]
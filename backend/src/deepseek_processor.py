@@ -1,11 +1,24 @@
 """
 Module to ask DeepSeek about the ideal order of Tasks and their splits.
+
+The module uses relative imports, so to chat with the model from a terminal run it as part of
+the package, from the backend directory:
+
+    python -m src.deepseek_processor
 """
 
 
 
+from typing import Tuple
+
 import requests
 
+from .async_http import in_thread
+from .cache import build_cache, make_key
+from .http_client import get_session, send_async
+from .instrumentation import CACHE_HIT, CACHE_MISS, record_span, span
+from .singleflight import AsyncSingleFlight, SingleFlight
+
 class APIException(Exception):
     """
     Exceptions for calls related to DeepSeek's API
@@ -13,14 +26,45 @@ class APIException(Exception):
     pass
 
 
-def ask_model(api_key: str, query: str) -> str | None:
+API_URL = 'https://openrouter.ai/api/v1/chat/completions'
+TAG_CACHE_TTL = 7 * 24 * 60 * 60  # seconds a classification stays cached
+
+# identical prompts in flight at the same time share one upstream call
+_inflight = SingleFlight()
+_inflight_async = AsyncSingleFlight()
+_tag_cache = None
+
+
+def get_tag_cache():
     """
-    Given an API Key and a formatted Task string query, ask the model for a plan to tackle all the tasks.
-    
-    Given this plan, return the result which should be a formatted sequence of tasks.
+    Return the classification cache. It shares the MAPS_CACHE tiers (in-process LRU and the
+    persistent SQLite/Redis store) when Django settings are configured.
     """
+    global _tag_cache
+    if _tag_cache is None:
+        try:
+            from django.conf import settings
+            config = getattr(settings, 'MAPS_CACHE', None)
+        except Exception:
+            config = None  # running standalone without Django settings
+        _tag_cache = build_cache(config)
+    return _tag_cache
+
+
+def normalize_prompt(query: str | None) -> str:
+    """Lowercase the prompt and collapse whitespace so equivalent prompts share a cache entry."""
+    return ' '.join((query or '').lower().split())
 
-    API_URL = 'https://openrouter.ai/api/v1/chat/completions'
+
+def tag_cache_key(query: str) -> str:
+    """Cache key for a normalized prompt, covering the model and system prompt too."""
+    return make_key('deepseek', build_request('', query)[1])
+
+
+def build_request(api_key: str, query: str) -> Tuple[dict, dict]:
+    """
+    Build the headers and JSON body of a chat completion request for the given query.
+    """
 
     # Define the headers for the API request
     headers = {
@@ -110,8 +154,92 @@ def ask_model(api_key: str, query: str) -> str | None:
                     {"role": "user", "content": query}]
     }
 
+    return headers, data
+
+
+def ask_model(api_key: str, query: str) -> str | None:
+    """
+    Given an API Key and a formatted Task string query, ask the model for a plan to tackle all the tasks.
+    
+    Given this plan, return the result which should be a formatted sequence of tasks.
+
+    Empty prompts return '' without calling the model, results are cached per normalized
+    prompt, and identical prompts in flight at the same time share one upstream call.
+    """
+    query = normalize_prompt(query)
+    if not query:
+        return ''
+
+    cache = get_tag_cache()
+    key = tag_cache_key(query)
+    found, result = cache.get(key, TAG_CACHE_TTL, namespace='deepseek')
+    if found:
+        record_span('deepseek', 0.0, cache=CACHE_HIT)
+        return result
+
+    def fetch():
+        result = request_model(api_key, query)
+        cache.set(key, result, TAG_CACHE_TTL)
+        return result
+
+    return _inflight.do(key, fetch)
+
+
+async def ask_model_async(api_key: str, query: str) -> str | None:
+    """
+    Async version of ask_model that sends the request over the shared httpx connection pool.
+    """
+    query = normalize_prompt(query)
+    if not query:
+        return ''
+
+    cache = get_tag_cache()
+    key = tag_cache_key(query)
+    # the shared tier is SQLite or Redis, so the cache is only used from worker threads
+    found, result = await in_thread(cache.get)(key, TAG_CACHE_TTL, namespace='deepseek')
+    if found:
+        record_span('deepseek', 0.0, cache=CACHE_HIT)
+        return result
+
+    async def fetch():
+        result = await request_model_async(api_key, query)
+        await in_thread(cache.set)(key, result, TAG_CACHE_TTL)
+        return result
+
+    return await _inflight_async.do(key, fetch)
+
+
+def request_model(api_key: str, query: str) -> str | None:
+    """
+    Send one uncached chat completion request and return the model's answer.
+    """
+    headers, data = build_request(api_key, query)
+
+    # Send the data to DeepSeek
+    with span('deepseek') as current:
+        current.cache = CACHE_MISS
+        # the 'llm' upstream times out after 30 s, so a hung OpenRouter connection cannot pin a worker
+        response = get_session('llm').post(API_URL, json = data, headers = headers)
+        current.status = response.status_code
+
+    # Return the response if the API call succeeded; otherwise, raise an exception
+    if response.status_code == 200:
+        return response.json()["choices"][0]["message"]["content"]
+    else:
+        raise APIException("Failed to fetch data from API. Status Code: " + str(response.status_code))
+
+
+async def request_model_async(api_key: str, query: str) -> str | None:
+    """
+    Async version of request_model.
+    """
+    headers, data = build_request(api_key, query)
+
     # Send the data to DeepSeek
-    response = requests.post(API_URL, json = data, headers = headers)
+    with span('deepseek') as current:
+        current.cache = CACHE_MISS
+        response = await send_async('llm', 'POST', API_URL, json = data, headers = headers)
+        current.status = response.status_code
 
     # Return the response if the API call succeeded; otherwise, raise an exception
     if response.status_code == 200:
@@ -122,6 +250,7 @@ def ask_model(api_key: str, query: str) -> str | None:
 
 
 if __name__ == "__main__":
+    # python -m src.deepseek_processor, see the module docstring
     key = input("API Key: ")
     while True:
 
@@ -132,5 +261,5 @@ if __name__ == "__main__":
 
         try:
             print(ask_model(key, msg))
-        except APIException as e:
+        except (APIException, requests.RequestException) as e:
             print(e)
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+Route geometry on NumPy arrays.
+
+A route is an (n, 2) float64 array of [lat, lng] rows. Polylines are decoded straight into
+that layout, and simplification, resampling by distance and point-to-route distances all work
+on whole arrays, so long routes with thousands of vertices never go through per-point loops.
+Flat distances are measured around the latitude of the part of the route they concern, so the
+east-west scale stays right on routes crossing many degrees of latitude.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+EARTH_RADIUS_METERS = 6371000.0
+METERS_PER_DEGREE = EARTH_RADIUS_METERS * np.pi / 180
+
+# bound on the (places x segments) matrices built by distance_to_route, in elements
+DISTANCE_CHUNK_ELEMENTS = 1 << 21
+
+
+def decode_polyline(encoded: str) -> np.ndarray:
+    """
+    Decode a Google encoded polyline.
+
+    Args:
+        encoded: Encoded polyline string
+
+    Returns:
+        (n, 2) array of [lat, lng]
+    """
+    if not encoded:
+        return np.empty((0, 2))
+
+    chunks = np.frombuffer(encoded.encode('ascii'), dtype=np.uint8).astype(np.int64) - 63
+    # every value is a run of 5-bit chunks, the last one without the 0x20 continuation bit
+    ends = np.flatnonzero((chunks & 0x20) == 0)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    value_of_chunk = np.repeat(np.arange(len(ends)), ends - starts + 1)
+    shifts = 5 * (np.arange(len(chunks)) - starts[value_of_chunk])
+    values = np.bitwise_or.reduceat((chunks & 0x1f) << shifts, starts)
+
+    # undo the zig-zag sign encoding, then the deltas
+    deltas = np.where(values & 1, ~(values >> 1), values >> 1)
+    return np.cumsum(deltas[:len(deltas) // 2 * 2].reshape(-1, 2), axis=0) / 1e5
+
+
+def to_points(route: np.ndarray) -> List[Dict[str, float]]:
+    """Convert [lat, lng] rows to the {'lat', 'lng'} dicts used by the views and googlemaps."""
+    return [{'lat': float(lat), 'lng': float(lng)} for lat, lng in route]
+
+
+def _project(route: np.ndarray, origin_lat: float) -> np.ndarray:
+    """Project [lat, lng] rows to flat [x, y] meters around origin_lat, fine near that latitude."""
+    return np.column_stack((route[:, 1] * METERS_PER_DEGREE * np.cos(np.radians(origin_lat)),
+                            route[:, 0] * METERS_PER_DEGREE))
+
+
+def cumulative_distances(route: np.ndarray) -> np.ndarray:
+    """
+    Distance along the route to every vertex in meters (haversine), starting at 0.
+    """
+    if len(route) == 0:
+        return np.empty(0)
+    lat = np.radians(route[:, 0])
+    lng = np.radians(route[:, 1])
+    a = (np.sin(np.diff(lat) / 2) ** 2
+         + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lng) / 2) ** 2)
+    segments = 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    return np.concatenate(([0.0], np.cumsum(segments)))
+
+
+def interpolate(route: np.ndarray, distances: np.ndarray, at: np.ndarray) -> np.ndarray:
+    """Points at the given distances along the route, given its cumulative_distances."""
+    return np.column_stack((np.interp(at, distances, route[:, 0]), np.interp(at, distances, route[:, 1])))
+
+
+def resample(route: np.ndarray, spacing: float, max_points: Optional[int] = None) -> np.ndarray:
+    """
+    Evenly spaced points along the route by cumulative distance, always including both ends.
+
+    Args:
+        route: (n, 2) array of [lat, lng]
+        spacing: Target distance between points in meters
+        max_points: Widen the spacing if needed so no more points than this are returned
+
+    Returns:
+        (m, 2) array of [lat, lng]
+    """
+    if len(route) < 2:
+        return route.copy()
+
+    distances = cumulative_distances(route)
+    total = distances[-1]
+    if total == 0:
+        return route[:1].copy()  # repeated vertices, e.g. start and destination are the same place
+    if max_points and max_points > 1:
+        spacing = max(spacing, total / (max_points - 1))
+    spacing = max(spacing, 1.0)
+
+    at = np.arange(0.0, total, spacing)
+    if total - at[-1] > 0:
+        at = np.append(at, total)
+    return interpolate(route, distances, at)
+
+
+def midpoint(route: np.ndarray) -> Optional[Dict[str, float]]:
+    """The point halfway along the route by distance, None for an empty route."""
+    if len(route) == 0:
+        return None
+    distances = cumulative_distances(route)
+    lat, lng = interpolate(route, distances, np.array([distances[-1] / 2]))[0]
+    return {'lat': float(lat), 'lng': float(lng)}
+
+
+def simplify(route: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Douglas-Peucker simplification.
+
+    Args:
+        route: (n, 2) array of [lat, lng]
+        tolerance: Largest distance in meters a dropped vertex may be from the simplified route
+
+    Returns:
+        The kept vertices, including both ends
+    """
+    if len(route) < 3:
+        return route.copy()
+
+    keep = np.zeros(len(route), dtype=bool)
+    keep[[0, -1]] = True
+
+    stack = [(0, len(route) - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        # each span is projected around the latitude of its ends, with its first vertex as the origin
+        x_scale = METERS_PER_DEGREE * np.cos(np.radians((route[first, 0] + route[last, 0]) / 2))
+        xy = (route[first:last + 1, ::-1] - route[first, ::-1]) * (x_scale, METERS_PER_DEGREE)
+        distances = _segment_distances(xy[1:-1], xy[0], xy[-1])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return route[keep]
+
+
+def _segment_distances(points: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Distances from many [x, y] points to one segment a-b."""
+    ab = b - a
+    length_squared = float(ab @ ab)
+    if length_squared == 0:
+        return np.hypot(*(points - a).T)
+    t = np.clip((points - a) @ ab / length_squared, 0, 1)
+    return np.hypot(*(points - (a + t[:, None] * ab)).T)
+
+
+def distance_to_route(points: np.ndarray, route: np.ndarray) -> np.ndarray:
+    """
+    Distance in meters from each point to the nearest segment of the route.
+
+    Args:
+        points: (m, 2) array of [lat, lng]
+        route: (n, 2) array of [lat, lng], simplify long routes first
+
+    Returns:
+        (m,) array of distances
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) == 0 or len(route) == 0:
+        return np.full(len(points), np.inf)
+
+    if len(route) == 1:
+        return np.hypot(*(_project(points, route[0, 0]) - _project(route, route[0, 0])[0]).T)
+
+    # every segment is measured in a flat projection around its own mid-latitude, with its
+    # first vertex as the origin
+    a = route[:-1]
+    x_scale = METERS_PER_DEGREE * np.cos(np.radians((route[:-1, 0] + route[1:, 0]) / 2))
+    ab = np.column_stack(((route[1:, 1] - a[:, 1]) * x_scale, (route[1:, 0] - a[:, 0]) * METERS_PER_DEGREE))
+    length_squared = np.maximum((ab * ab).sum(axis=1), 1e-12)
+
+    result = np.empty(len(points))
+    chunk = max(1, DISTANCE_CHUNK_ELEMENTS // len(a))
+    for start in range(0, len(points), chunk):
+        p = points[start:start + chunk, None, :]  # (chunk, 1, 2) against (segments, 2)
+        ap = np.stack(((p[..., 1] - a[:, 1]) * x_scale, (p[..., 0] - a[:, 0]) * METERS_PER_DEGREE), axis=-1)
+        t = np.clip((ap * ab).sum(axis=2) / length_squared, 0, 1)
+        result[start:start + chunk] = np.sqrt(((ap - t[..., None] * ab) ** 2).sum(axis=2)).min(axis=1)
+    return result
@@ -0,0 +1,256 @@
+"""
+Outbound HTTP layer shared by every upstream (Google Maps, Places API (New), Open-Meteo, OpenRouter).
+
+Each upstream gets one requests session with its own keep-alive connection pool, default
+timeouts, jittered exponential retry on connection errors, 429 and 5xx (except the statuses
+googlemaps already retries, for the 'maps' session), and a circuit breaker. Connection errors,
+429 and every 5xx count as failures for the breaker, whichever layer retries them.
+After failure_threshold failures in a row the breaker opens and calls fail at once with
+CircuitOpenError instead of tying up a worker on a degraded service. After reset_timeout seconds
+one trial call is let through, and its outcome closes or reopens the breaker. send_async applies
+the same policy to the shared httpx client of the async views.
+
+Per-upstream settings can be overridden with settings.UPSTREAM_HTTP, e.g.
+{'llm': {'read_timeout': 60}}.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import namedtuple
+from typing import Any, Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .async_http import get_async_client
+from .instrumentation import count_attempt
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+# statuses the circuit breaker counts as failures, including the ones only googlemaps retries
+FAILURE_STATUSES = frozenset([429, *range(500, 600)])
+# googlemaps retries these itself by sending the request again through the session
+GOOGLEMAPS_RETRY_STATUSES = frozenset([500, 503, 504])
+
+# timeouts and delays in seconds, pool_size is the number of keep-alive connections per host,
+# retry_statuses the HTTP statuses the session retries, failure_statuses the ones its breaker counts
+Upstream = namedtuple('Upstream', ['connect_timeout', 'read_timeout', 'retries', 'backoff', 'max_backoff',
+                                   'failure_threshold', 'reset_timeout', 'pool_size', 'retry_statuses',
+                                   'failure_statuses'],
+                      defaults=[RETRY_STATUSES, FAILURE_STATUSES])
+
+DEFAULT_UPSTREAMS = {
+    # only one layer retries a status, so a burst of 5xx costs retries + 1 attempts and not their product
+    'maps': Upstream(3.05, 10, 2, 0.25, 4, 5, 30, 32, RETRY_STATUSES - GOOGLEMAPS_RETRY_STATUSES),
+    'places': Upstream(3.05, 10, 2, 0.25, 4, 5, 30, 32),
+    'weather': Upstream(3.05, 5, 1, 0.2, 2, 5, 30, 16),
+    'llm': Upstream(5, 30, 1, 0.5, 4, 3, 60, 8),
+}
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """
+    Raised instead of calling an upstream whose circuit breaker is open.
+    """
+    pass
+
+
+class CircuitBreaker:
+    """
+    Counts consecutive failures of one upstream and opens after failure_threshold of them.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = STATE_CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go out now. While half open only a single trial call is let through."""
+        with self._lock:
+            if self.state == STATE_OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = STATE_HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == STATE_CLOSED:
+                return True
+            if self.state == STATE_HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != STATE_CLOSED:
+                logger.info(f"Circuit for {self.name} closed")
+            self.state = STATE_CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == STATE_HALF_OPEN or (self.state == STATE_CLOSED and self.failures >= self.failure_threshold):
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} failures")
+                self.state = STATE_OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def release(self) -> None:
+        """End a call that recorded no outcome, so a half-open breaker can let the next trial through."""
+        with self._lock:
+            if self.state == STATE_HALF_OPEN:
+                self._trial_in_flight = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {'state': self.state, 'failures': self.failures}
+
+
+def backoff_delay(upstream: Upstream, attempt: int, response: Any = None) -> float:
+    """
+    Seconds to wait before retrying: the server's Retry-After if it sent one, otherwise full
+    jitter over an exponential backoff. Never more than upstream.max_backoff.
+    """
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after:
+        try:
+            return min(float(retry_after), upstream.max_backoff)
+        except ValueError:
+            pass  # an HTTP date, fall back to the backoff
+    return random.uniform(0, min(upstream.max_backoff, upstream.backoff * 2 ** attempt))
+
+
+def record_status(breaker: CircuitBreaker, upstream: Upstream, status: int) -> None:
+    """Record a response on the breaker, independent of whether the status is retried here."""
+    if status in upstream.failure_statuses:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+class UpstreamSession(requests.Session):
+    """
+    requests session applying the timeouts, retries and circuit breaker of one upstream.
+
+    Args:
+        name: Upstream name, used for the breaker and in errors
+        upstream: The policy to apply
+    """
+
+    def __init__(self, name: str, upstream: Upstream):
+        super().__init__()
+        self.name = name
+        self.upstream = upstream
+        self.breaker = CircuitBreaker(name, upstream.failure_threshold, upstream.reset_timeout)
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=upstream.pool_size)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+        # every attempt is counted on the running span, so retries show up in the traces
+        self.hooks['response'].append(count_attempt)
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = (self.upstream.connect_timeout, self.upstream.read_timeout)
+
+        for attempt in range(self.upstream.retries + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"Circuit for {self.name} is open")
+            last_attempt = attempt == self.upstream.retries
+            try:
+                response = super().request(method, url, **kwargs)
+            except requests.RequestException as e:
+                self.breaker.record_failure()
+                if last_attempt or not isinstance(e, (requests.ConnectionError, requests.Timeout)):
+                    raise
+                response = None
+            else:
+                record_status(self.breaker, self.upstream, response.status_code)
+                if last_attempt or response.status_code not in self.upstream.retry_statuses:
+                    return response
+            finally:
+                # any other exception recorded nothing, it must not leave the breaker stuck half open
+                self.breaker.release()
+            time.sleep(backoff_delay(self.upstream, attempt, response))
+            if response is not None:
+                response.close()
+
+
+_sessions: Dict[str, UpstreamSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_upstream(name: str) -> Upstream:
+    """Policy of an upstream, DEFAULT_UPSTREAMS with settings.UPSTREAM_HTTP applied."""
+    upstream = DEFAULT_UPSTREAMS[name]
+    try:
+        from django.conf import settings
+        overrides = (getattr(settings, 'UPSTREAM_HTTP', None) or {}).get(name) or {}
+    except Exception:
+        overrides = {}  # running standalone without Django settings
+    return upstream._replace(**overrides)
+
+
+def get_session(name: str) -> UpstreamSession:
+    """Return the pooled session of an upstream ('maps', 'places', 'weather' or 'llm'), creating it on first use."""
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = _sessions[name] = UpstreamSession(name, get_upstream(name))
+        return session
+
+
+async def send_async(name: str, method: str, url: str, **kwargs) -> Any:
+    """
+    Send a request with the shared httpx client under the same policy as get_session(name).
+
+    Returns:
+        The httpx response
+
+    Raises:
+        CircuitOpenError if the breaker is open, httpx.TransportError if the last attempt failed
+    """
+    import httpx  # only needed by the async views
+
+    session = get_session(name)
+    upstream = session.upstream
+    kwargs.setdefault('timeout', httpx.Timeout(upstream.read_timeout, connect=upstream.connect_timeout))
+
+    for attempt in range(upstream.retries + 1):
+        if not session.breaker.allow():
+            raise CircuitOpenError(f"Circuit for {name} is open")
+        last_attempt = attempt == upstream.retries
+        try:
+            response = await get_async_client().request(method, url, **kwargs)
+        except httpx.TransportError:
+            session.breaker.record_failure()
+            if last_attempt:
+                raise
+            response = None
+        else:
+            count_attempt(response)
+            record_status(session.breaker, upstream, response.status_code)
+            if last_attempt or response.status_code not in upstream.retry_statuses:
+                return response
+        finally:
+            session.breaker.release()
+        await asyncio.sleep(backoff_delay(upstream, attempt, response))
+
+
+def circuit_states() -> Dict[str, Dict[str, Any]]:
+    """State and consecutive failures of every upstream's breaker, for the metrics view."""
+    with _sessions_lock:
+        sessions = dict(_sessions)
+    return {name: session.breaker.snapshot() for name, session in sessions.items()}
@@ -0,0 +1,310 @@
+"""
+Per-request accounting of upstream calls.
+
+Every outbound call (Google Maps, Open-Meteo, OpenRouter) is wrapped in a span recording its
+endpoint, duration, status, cache hit/miss and retries. Spans are collected on the trace of the
+request being served (a context variable, copied into the worker threads that fan calls out)
+and fed into process-wide histograms. server_timing_middleware turns each request's trace into a
+Server-Timing header and a structured log line, and the histograms are served by the
+/api/metrics/ view.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+logger = logging.getLogger(__name__)
+
+Span = namedtuple('Span', ['name', 'duration_ms', 'status', 'cache', 'retries'])
+
+CACHE_HIT = 'hit'
+CACHE_MISS = 'miss'
+STATUS_OK = 'ok'
+STATUS_ERROR = 'error'
+
+# upper bounds in milliseconds of the histogram buckets, the last one catches everything else
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float('inf'))
+
+
+def is_error(status: Any) -> bool:
+    """Whether a span status ('ok', 'error' or an HTTP status code) is a failure."""
+    return status == STATUS_ERROR or (isinstance(status, int) and status >= 400)
+
+
+class RequestTrace:
+    """
+    The spans recorded while serving one request. Spans may be added from several threads.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Aggregate the spans per endpoint.
+
+        Returns:
+            Dictionary of endpoint -> calls, duration_ms (summed), errors, cache_hits and retries
+        """
+        with self._lock:
+            spans = list(self.spans)
+        summary = {}
+        for span in spans:
+            entry = summary.setdefault(span.name, {'calls': 0, 'duration_ms': 0.0, 'errors': 0,
+                                                   'cache_hits': 0, 'retries': 0})
+            entry['calls'] += 1
+            entry['duration_ms'] += span.duration_ms
+            entry['errors'] += is_error(span.status)
+            entry['cache_hits'] += span.cache == CACHE_HIT
+            entry['retries'] += span.retries
+        return summary
+
+    def upstream_calls(self, name: Optional[str] = None) -> int:
+        """Number of spans that actually went upstream (not answered by a cache), optionally for one endpoint."""
+        with self._lock:
+            return sum(1 for span in self.spans
+                       if span.cache != CACHE_HIT and (name is None or span.name == name))
+
+    def server_timing(self) -> str:
+        """Format the trace as a Server-Timing header value, one metric per endpoint plus the total."""
+        metrics = []
+        for name, entry in self.summary().items():
+            desc = f"{entry['calls']} calls, {entry['cache_hits']} cached"
+            if entry['retries']:
+                desc += f", {entry['retries']} retries"
+            metrics.append(f'{name};dur={entry["duration_ms"]:.1f};desc="{desc}"')
+        metrics.append(f'total;dur={self.elapsed_ms():.1f}')
+        return ', '.join(metrics)
+
+
+class ActiveSpan:
+    """
+    Handle to a span while it is running, so the wrapped code can fill in what it learns.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.status: Any = STATUS_OK
+        self.cache: Optional[str] = None
+        self.attempts = 0
+
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram with counters for errors, cache hits and retries.
+    """
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.errors = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.retries = 0
+
+    def observe(self, span: Span) -> None:
+        self.count += 1
+        self.sum_ms += span.duration_ms
+        self.errors += is_error(span.status)
+        self.cache_hits += span.cache == CACHE_HIT
+        self.cache_misses += span.cache == CACHE_MISS
+        self.retries += span.retries
+        for i, bound in enumerate(self.buckets):
+            if span.duration_ms <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th quantile, None if nothing was observed."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound if bound != float('inf') else None
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'sum_ms': round(self.sum_ms, 1),
+            'mean_ms': round(self.sum_ms / self.count, 1) if self.count else None,
+            'p50_ms': self.quantile(0.5),
+            'p95_ms': self.quantile(0.95),
+            'p99_ms': self.quantile(0.99),
+            'errors': self.errors,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'retries': self.retries,
+            # cumulative counts keyed by upper bound, like Prometheus 'le' buckets
+            'buckets': {('+Inf' if bound == float('inf') else str(bound)): cumulative
+                        for bound, cumulative in zip(self.buckets, _cumulative(self.counts))},
+        }
+
+
+def _cumulative(counts: List[int]) -> Iterator[int]:
+    total = 0
+    for count in counts:
+        total += count
+        yield total
+
+
+class MetricsRegistry:
+    """
+    Process-wide histograms per upstream endpoint and per view.
+    """
+
+    def __init__(self):
+        self._upstream: Dict[str, Histogram] = {}
+        self._requests: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe_upstream(self, span: Span) -> None:
+        with self._lock:
+            self._upstream.setdefault(span.name, Histogram()).observe(span)
+
+    def observe_request(self, view: str, duration_ms: float, status_code: int) -> None:
+        span = Span(view, duration_ms, STATUS_ERROR if status_code >= 500 else STATUS_OK, None, 0)
+        with self._lock:
+            self._requests.setdefault(view, Histogram()).observe(span)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                'upstream': {name: histogram.snapshot() for name, histogram in self._upstream.items()},
+                'requests': {name: histogram.snapshot() for name, histogram in self._requests.items()},
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._upstream.clear()
+            self._requests.clear()
+
+
+metrics = MetricsRegistry()
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar('current_trace', default=None)
+_current_span: ContextVar[Optional[ActiveSpan]] = ContextVar('current_span', default=None)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """Return the trace of the request being served, or None outside a request."""
+    return _current_trace.get()
+
+
+def record_span(name: str, duration_ms: float, status: Any = STATUS_OK, cache: Optional[str] = None,
+                retries: int = 0) -> None:
+    """Record a finished span on the current request's trace and in the process metrics."""
+    span = Span(name, duration_ms, status, cache, retries)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(span)
+    metrics.observe_upstream(span)
+
+
+@contextmanager
+def span(name: str) -> Iterator[ActiveSpan]:
+    """
+    Time an upstream call. The status becomes 'error' if the block raises.
+
+    Args:
+        name: Endpoint name, e.g. 'places_nearby'
+
+    Yields:
+        ActiveSpan whose status, cache and attempts the block may set
+    """
+    active = ActiveSpan(name)
+    token = _current_span.set(active)
+    started = time.perf_counter()
+    try:
+        yield active
+    except BaseException:
+        active.status = STATUS_ERROR
+        raise
+    finally:
+        _current_span.reset(token)
+        record_span(name, (time.perf_counter() - started) * 1000, active.status, active.cache,
+                    max(active.attempts - 1, 0))
+
+
+def count_attempt(response, *args, **kwargs):
+    """
+    requests response hook counting HTTP attempts on the running span, so client-side retries
+    show up. Returns the response unchanged.
+    """
+    active = _current_span.get()
+    if active is not None:
+        active.attempts += 1
+    return response
+
+
+def _begin_request() -> Any:
+    return _current_trace.set(RequestTrace())
+
+
+def _finish_request(request, response, token) -> None:
+    trace = _current_trace.get()
+    _current_trace.reset(token)
+    duration_ms = trace.elapsed_ms()
+
+    view = request.resolver_match.url_name if request.resolver_match else request.path
+    metrics.observe_request(view, duration_ms, response.status_code)
+
+    if getattr(settings, 'SERVER_TIMING', True):
+        response['Server-Timing'] = trace.server_timing()
+        response['Timing-Allow-Origin'] = '*'
+
+    summary = trace.summary()
+    if summary:
+        logger.info(json.dumps({
+            'event': 'request',
+            'view': view,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 1),
+            'upstream_calls': trace.upstream_calls(),
+            'upstream': {name: dict(entry, duration_ms=round(entry['duration_ms'], 1))
+                         for name, entry in summary.items()},
+        }))
+
+
+@sync_and_async_middleware
+def server_timing_middleware(get_response):
+    """
+    Collect a trace for every request, then add its Server-Timing header, log it and record
+    its duration in the metrics. Streamed responses only cover the work done before streaming starts.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = _begin_request()
+            response = await get_response(request)
+            _finish_request(request, response, token)
+            return response
+    else:
+        def middleware(request):
+            token = _begin_request()
+            response = get_response(request)
+            _finish_request(request, response, token)
+            return response
+    return middleware
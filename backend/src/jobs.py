@@ -0,0 +1,137 @@
+"""
+Background jobs for long route requests.
+
+A cross-country route can take longer to resolve than a proxy or serverless gateway waits for
+a response. In job mode the request only creates a job and returns its id. A worker pool runs
+the pipeline and stores the job's status, progress and the places found so far in the cache
+tiers, and clients poll /api/jobs/<id>/ until it is done. With a shared tier (SQLite or Redis)
+configured, any process can answer the polls, not only the one running the job.
+
+The workers are threads of the process that took the request, so they need a process that
+outlives it. Serverless functions (Vercel) are frozen once they have responded, and there jobs
+run synchronously in the request instead, see settings.ROUTE_JOB_BACKGROUND.
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+DEFAULT_JOB_TTL = 60 * 60  # seconds a job and its result are kept
+DEFAULT_JOB_WORKERS = 2
+
+
+def snapshot(value: Any) -> Any:
+    """Deep copy of a JSON-serializable value, as it would come back from the shared tier."""
+    return json.loads(json.dumps(value))
+
+
+class JobStore:
+    """
+    Job records kept in a TieredCache.
+
+    Only the worker running a job writes its record, so updates are plain read-modify-writes.
+    Reads go to the shared tier first when there is one, because the in-process copy of a job
+    run by another process would never see its updates. Records are copied through JSON on
+    every write and read, like the shared tier stores them, so a poll never shares a dict with
+    the worker writing the next update.
+
+    Args:
+        cache: The cache holding the jobs
+        ttl: Seconds a job is kept after its last update
+    """
+
+    def __init__(self, cache: Any, ttl: float = DEFAULT_JOB_TTL):
+        self.cache = cache
+        self.ttl = ttl
+        self._create_lock = threading.Lock()
+
+    @staticmethod
+    def key(job_id: str) -> str:
+        return f"job:{job_id}"
+
+    def create(self, dedupe_key: Optional[str] = None, **fields) -> Dict[str, Any]:
+        """
+        Create a queued job, or return the queued or running job created for the same dedupe_key.
+
+        The lookup and the insert happen under one lock, so concurrent requests of this process
+        never both create a job for the same key. Between processes, a key nobody holds is
+        claimed with the cache's atomic add.
+
+        Returns:
+            The job record, with 'created' False if an existing job was returned
+        """
+        with self._create_lock:
+            existing = self._active_job(dedupe_key)
+            if existing is not None:
+                return dict(existing, created=False)
+
+            # the record is written before the key points to it, so a claimed key never dangles
+            now = time.time()
+            job = {'id': uuid.uuid4().hex, 'status': JOB_QUEUED, 'created_at': now, 'updated_at': now,
+                   'progress': None, 'result': None, 'error': None, **fields}
+            self.cache.set(self.key(job['id']), snapshot(job), self.ttl)
+            if dedupe_key is not None and not self.cache.add(f"job_for:{dedupe_key}", job['id'], self.ttl):
+                existing = self._active_job(dedupe_key)
+                if existing is not None:
+                    self.cache.delete(self.key(job['id']))
+                    return dict(existing, created=False)
+                self.cache.set(f"job_for:{dedupe_key}", job['id'], self.ttl)
+            return dict(job, created=True)
+
+    def _active_job(self, dedupe_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        """The queued or running job created for dedupe_key, if any."""
+        if dedupe_key is None:
+            return None
+        found, job_id = self.cache.get(f"job_for:{dedupe_key}", self.ttl, namespace='jobs')
+        job = self.get(job_id) if found else None
+        return job if job is not None and job['status'] in (JOB_QUEUED, JOB_RUNNING) else None
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job record, or None if it does not exist or has expired."""
+        if self.cache.shared is not None:
+            try:
+                raw = self.cache.shared.get(self.key(job_id))
+                return json.loads(raw) if raw is not None else None
+            except Exception as e:
+                logger.warning(f"Shared cache read failed for job {job_id}: {e}")
+        found, job = self.cache.get(self.key(job_id), self.ttl, namespace='jobs')
+        return snapshot(job) if found else None
+
+    def update(self, job_id: str, **fields) -> None:
+        """Set fields of a job, e.g. status, progress, result or error."""
+        job = self.get(job_id) or {'id': job_id}
+        job.update(fields, updated_at=time.time())
+        self.cache.set(self.key(job_id), snapshot(job), self.ttl)
+
+
+class JobQueue:
+    """
+    Runs jobs in a pool of background threads of this process.
+
+    Args:
+        workers: Number of jobs running at once, the rest wait in the pool's queue
+    """
+
+    def __init__(self, workers: int = DEFAULT_JOB_WORKERS):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='route-job')
+
+    def submit(self, func: Callable[..., Any], *args) -> None:
+        """Queue func(*args). It runs outside the submitting request, so not as part of its trace."""
+        def run():
+            try:
+                func(*args)
+            except Exception:
+                logger.exception(f"Job {getattr(func, '__name__', func)} crashed")
+        self._executor.submit(run)
@@ -0,0 +1,209 @@
+"""
+Backends for the nearby places searches.
+
+The legacy Places API (googlemaps.Client.places_nearby) takes a single type per request, so a
+sample point searched for 8 filters costs 8 calls. The Nearby Search of the Places API (New)
+takes several includedTypes in one request. Its results are converted to the legacy result
+shape and split back per requested type, so the rest of the app does not care which backend
+answered them.
+"""
+
+import logging
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import requests
+
+from .budget import RateBudget
+from .cache import CachedMapsClient, TieredCache, make_key
+from .http_client import get_session
+from .instrumentation import CACHE_HIT, CACHE_MISS, span
+
+logger = logging.getLogger(__name__)
+
+BACKEND_LEGACY = 'legacy'
+BACKEND_NEARBY_SEARCH = 'nearby_search'
+DEFAULT_PLACES_BACKEND = BACKEND_NEARBY_SEARCH
+
+NEARBY_SEARCH_URL = "https://places.googleapis.com/v1/places:searchNearby"
+NEARBY_SEARCH_FIELDS = ','.join([
+    'places.id', 'places.displayName', 'places.location', 'places.types',
+    'places.rating', 'places.userRatingCount', 'places.photos',
+])
+MAX_INCLUDED_TYPES = 8  # filters sent per request, the app queries at most MAX_FILTERS_TO_QUERY
+MAX_RESULT_COUNT = 20  # most places one Nearby Search returns, it has no further pages
+
+# per place type: (results, whether they are every match in the circle)
+SearchResults = Dict[str, Tuple[list, bool]]
+
+
+class LegacyPlacesBackend:
+    """
+    One places_nearby call per type through the (cached) googlemaps client.
+    """
+
+    name = BACKEND_LEGACY
+    max_types_per_call = 1
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    def search(self, center: Dict[str, float], radius: int, place_types: Sequence[str]) -> SearchResults:
+        """
+        Search the circle around center for each of place_types, one call per type.
+
+        Raises:
+            Whatever the googlemaps client raises
+        """
+        found = {}
+        for place_type in place_types:
+            nearby = self.client.places_nearby(location=(center['lat'], center['lng']), radius=radius,
+                                               type=place_type)
+            # Google only sends a next page token when there are more matches than one page
+            found[place_type] = (nearby.get('results') or [], 'next_page_token' not in nearby)
+        return found
+
+
+def to_legacy_result(place: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a Places API (New) place to the shape of a legacy places_nearby result."""
+    location = place.get('location')
+    return {
+        'place_id': place.get('id'),
+        'name': (place.get('displayName') or {}).get('text', ''),
+        'geometry': {'location': {'lat': location['latitude'], 'lng': location['longitude']}} if location else None,
+        'types': place.get('types') or [],
+        'rating': place.get('rating'),
+        'user_ratings_total': place.get('userRatingCount'),
+        # photos of the new API are addressed by resource name instead of photo_reference
+        'photos': [{'name': photo['name']} for photo in place.get('photos') or [] if photo.get('name')],
+    }
+
+
+def split_by_type(results: List[Dict[str, Any]], place_types: Sequence[str], complete: bool) -> SearchResults:
+    """Give each requested type the results listing it, keeping their order."""
+    return {place_type: ([place for place in results if place_type in place['types']], complete)
+            for place_type in place_types}
+
+
+class NearbySearchBackend:
+    """
+    Places API (New) Nearby Search, up to MAX_INCLUDED_TYPES types per call.
+
+    Responses are cached like the googlemaps calls. If the API is not enabled for the key
+    (HTTP 403), every later search goes to the fallback backend. A request the API rejects
+    (HTTP 400, e.g. a type it does not know) is retried on the fallback.
+
+    A search was budgeted as one call, but the fallback may need one call per type. The calls
+    beyond the first are taken from budget, and types it cannot pay for are left out of the
+    results, as if their search had failed.
+
+    Args:
+        api_key: Google Maps Platform key with the Places API (New) enabled
+        cache: Cache for the responses, None to always call the API
+        fallback: Backend used when the API refuses the request
+        budget: Budget charged for the extra calls of the fallback, None to not charge them
+    """
+
+    name = BACKEND_NEARBY_SEARCH
+
+    def __init__(self, api_key: str, cache: Optional[TieredCache] = None, fallback: Optional[Any] = None,
+                 budget: Optional[RateBudget] = None):
+        self.api_key = api_key
+        self.cache = cache
+        self.fallback = fallback
+        self.budget = budget
+        self.disabled = False
+
+    @property
+    def max_types_per_call(self) -> int:
+        # once disabled, searches are planned at the fallback's rate
+        return self.fallback.max_types_per_call if self.disabled else MAX_INCLUDED_TYPES
+
+    def _search_fallback(self, center: Dict[str, float], radius: int, place_types: Sequence[str]) -> SearchResults:
+        """Run a search budgeted as one call on the fallback, charging the budget for the rest."""
+        calls = math.ceil(len(place_types) / self.fallback.max_types_per_call)
+        if calls > 1 and self.budget is not None:
+            affordable = 1 + self.budget.take(calls - 1)
+            if affordable < calls:
+                logger.info(f"Search budget allows {affordable} of {calls} {self.fallback.name} calls")
+                place_types = place_types[:affordable * self.fallback.max_types_per_call]
+        return self.fallback.search(center, radius, place_types)
+
+    def _post(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        response = get_session('places').post(NEARBY_SEARCH_URL, json=body, headers={
+            'X-Goog-Api-Key': self.api_key,
+            'X-Goog-FieldMask': NEARBY_SEARCH_FIELDS,
+        })
+        response.raise_for_status()
+        return [to_legacy_result(place) for place in response.json().get('places') or []]
+
+    def _fetch(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        ttl = CachedMapsClient.ENDPOINT_TTLS['places_nearby']
+        key = make_key('places_search_nearby', body)
+        with span('places_search_nearby') as current:
+            found, results = self.cache.get(key, ttl, namespace='places_search_nearby') if self.cache else (False, None)
+            current.cache = CACHE_HIT if found else CACHE_MISS
+            if not found:
+                results = self._post(body)
+                if self.cache:
+                    self.cache.set(key, results, ttl)
+        return results
+
+    def search(self, center: Dict[str, float], radius: int, place_types: Sequence[str]) -> SearchResults:
+        """
+        Search the circle around center for all of place_types in one call.
+
+        Raises:
+            requests.RequestException if the call fails and no fallback applies
+        """
+        if self.disabled:
+            return self._search_fallback(center, radius, place_types)
+
+        body = {
+            'includedTypes': sorted(place_types),
+            'maxResultCount': MAX_RESULT_COUNT,
+            'rankPreference': 'POPULARITY',
+            'locationRestriction': {'circle': {
+                'center': {'latitude': round(center['lat'], 5), 'longitude': round(center['lng'], 5)},
+                'radius': float(radius),
+            }},
+        }
+        try:
+            results = self._fetch(body)
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            if self.fallback is None or status not in (400, 403):
+                raise
+            if status == 403:
+                logger.error(f"Places API (New) refused the key, using the {self.fallback.name} backend: {e}")
+                self.disabled = True
+            else:
+                logger.warning(f"Nearby Search rejected types {list(place_types)}, using the {self.fallback.name} backend: {e}")
+            return self._search_fallback(center, radius, place_types)
+
+        # one response is shared by all the types, a full page may have crowded some of them out
+        return split_by_type(results, place_types, len(results) < MAX_RESULT_COUNT)
+
+
+def build_places_backend(name: Optional[str], client: Any, api_key: str,
+                         cache: Optional[TieredCache] = None, budget: Optional[RateBudget] = None) -> Any:
+    """
+    Create the configured places backend.
+
+    Args:
+        name: 'nearby_search' (Places API (New), falling back to legacy) or 'legacy'
+        client: googlemaps client used by the legacy backend
+        api_key: Key for the Places API (New)
+        cache: Cache for Nearby Search responses
+        budget: Budget the searches are planned against, charged for extra fallback calls
+
+    Returns:
+        A backend with name, max_types_per_call and search(center, radius, place_types)
+    """
+    legacy = LegacyPlacesBackend(client)
+    if name == BACKEND_LEGACY or not api_key:
+        return legacy
+    if name != BACKEND_NEARBY_SEARCH:
+        logger.error(f"Unknown places backend {name}, using {BACKEND_LEGACY}")
+        return legacy
+    return NearbySearchBackend(api_key, cache, fallback=legacy, budget=budget)
@@ -0,0 +1,63 @@
+"""
+Per-user search preferences carried in a compact signed token.
+
+The token is returned by the preferences endpoint, stored in a cookie and may also be sent
+back explicitly (?prefs=<token> or an X-Preferences-Token header), so every route request
+carries its own filters and radius and concurrent users never share state.
+"""
+
+from collections import namedtuple
+from typing import Optional
+
+from django.core import signing
+
+Preferences = namedtuple('Preferences', ['filters', 'radius'])
+
+PREFERENCES_COOKIE = 'journey_prefs'
+PREFERENCES_HEADER = 'X-Preferences-Token'
+PREFERENCES_PARAM = 'prefs'
+PREFERENCES_MAX_AGE = 30 * 24 * 60 * 60  # seconds a token stays valid
+_SALT = 'journey.preferences'
+
+
+def encode_preferences(preferences: Preferences) -> str:
+    """
+    Sign preferences into a URL-safe token.
+
+    Args:
+        preferences: The filters and radius to store
+
+    Returns:
+        Compressed, signed token string
+    """
+    return signing.dumps({'f': list(preferences.filters), 'r': preferences.radius}, salt=_SALT, compress=True)
+
+
+def decode_preferences(token: Optional[str], default: Preferences) -> Preferences:
+    """
+    Read preferences back from a token.
+
+    Args:
+        token: Token produced by encode_preferences, or None
+        default: Preferences to use if the token is missing, expired or tampered with
+
+    Returns:
+        The decoded preferences
+    """
+    if not token:
+        return default
+    try:
+        data = signing.loads(token, salt=_SALT, max_age=PREFERENCES_MAX_AGE)
+        return Preferences(filters=[str(f) for f in data.get('f', [])], radius=int(data.get('r', default.radius)))
+    except (signing.BadSignature, TypeError, ValueError, AttributeError):
+        return default
+
+
+def get_request_preferences(request, default: Preferences) -> Preferences:
+    """
+    Get the preferences for a request from the query string, header or cookie, in that order.
+    """
+    token = (request.GET.get(PREFERENCES_PARAM)
+             or request.headers.get(PREFERENCES_HEADER)
+             or request.COOKIES.get(PREFERENCES_COOKIE))
+    return decode_preferences(token, default)
@@ -0,0 +1,94 @@
+"""
+Ranking of candidate places along a route.
+
+Every eligible place found along the route is scored on its rating (pulled towards a prior when
+it has few reviews), its number of reviews and how far it is off the route. The top K are then
+picked greedily from a heap, where each pick makes the remaining places of the same category a
+little less attractive, so one category cannot fill the whole list.
+"""
+
+import heapq
+import math
+from collections import namedtuple
+from typing import Any, Dict, Iterable, List
+
+# place: raw Places result, category: the filter that found it, detour_m: distance off the
+# route in meters, order: position along the route, used to return picks in route order
+Candidate = namedtuple('Candidate', ['place', 'category', 'detour_m', 'order'])
+
+PRIOR_RATING = 3.5  # rating assumed for places with no reviews
+PRIOR_REVIEWS = 25  # reviews needed before a place's own rating outweighs the prior
+POPULARITY_SATURATION = 5000  # reviews beyond which popularity stops adding to the score
+
+QUALITY_WEIGHT = 0.5
+POPULARITY_WEIGHT = 0.2
+DETOUR_WEIGHT = 0.3
+
+DIVERSITY_DECAY = 0.85  # score multiplier per place of the same category already picked
+
+
+def score_place(place: Dict[str, Any], detour_m: float, radius: float) -> float:
+    """
+    Score a place between 0 and 1.
+
+    Args:
+        place: Raw Places result
+        detour_m: Distance from the place to the route in meters
+        radius: Search radius in meters, places this far off the route get no detour credit
+
+    Returns:
+        Weighted sum of quality, popularity and closeness to the route
+    """
+    try:
+        rating = float(place.get('rating') or 0)
+        reviews = int(place.get('user_ratings_total') or 0)
+    except (TypeError, ValueError):
+        rating, reviews = 0.0, 0
+
+    quality = (rating * reviews + PRIOR_RATING * PRIOR_REVIEWS) / (reviews + PRIOR_REVIEWS) / 5
+    popularity = min(math.log1p(reviews) / math.log1p(POPULARITY_SATURATION), 1.0)
+    closeness = 1 - min(detour_m / radius, 1.0) if radius > 0 else 1.0
+    return QUALITY_WEIGHT * quality + POPULARITY_WEIGHT * popularity + DETOUR_WEIGHT * closeness
+
+
+def top_k(candidates: Iterable[Candidate], k: int, radius: float) -> List[Candidate]:
+    """
+    Pick the k best candidates, each distinct place at most once.
+
+    The best remaining candidate is picked repeatedly. A candidate's score is multiplied by
+    DIVERSITY_DECAY for every place of its category picked before it. The penalty only ever
+    grows, so stale heap entries are rescored lazily when they reach the top.
+
+    Args:
+        candidates: Places to choose from
+        k: Number of places to pick
+        radius: Search radius in meters
+
+    Returns:
+        The picked candidates in route order
+    """
+    heap = []
+    seen = set()
+    for i, candidate in enumerate(candidates):
+        place_id = candidate.place.get('place_id')
+        if place_id in seen:
+            continue
+        seen.add(place_id)
+        # (negated score, tie breaker, picks of the category when scored, base score, candidate)
+        base = score_place(candidate.place, candidate.detour_m, radius)
+        heap.append((-base, i, 0, base, candidate))
+    heapq.heapify(heap)
+
+    picked = []
+    category_picks: Dict[str, int] = {}
+    while heap and len(picked) < k:
+        _, i, scored_with, base, candidate = heapq.heappop(heap)
+        picks = category_picks.get(candidate.category, 0)
+        if picks != scored_with:
+            heapq.heappush(heap, (-base * DIVERSITY_DECAY ** picks, i, picks, base, candidate))
+            continue
+        picked.append(candidate)
+        category_picks[candidate.category] = picks + 1
+
+    picked.sort(key=lambda candidate: candidate.order)
+    return picked
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -25,6 +26,85 @@ ai_key_path = BASE_DIR / "src/api-deepseek_key.txt"
 with open(ai_key_path, 'r') as ai_api_key_file:
     DEEPSEEK_API_KEY = ai_api_key_file.readline().strip()
 
+# Maximum number of upstream API calls (Places, Details, weather, travel time)
+# that a single route request is allowed to have in flight at once
+ROUTE_MAX_IN_FLIGHT = 8
+
+# Cache for Google Maps responses: an in-process LRU in front of a shared tier.
+# BACKEND is 'sqlite' (LOCATION is a file path), 'redis' (LOCATION is a redis:// URL)
+# or None to only cache in-process.
+MAPS_CACHE = {
+    'BACKEND': 'sqlite',
+    'LOCATION': BASE_DIR / 'maps_cache.sqlite3',
+    'MAX_ENTRIES': 2048,
+}
+
+# Weather is fetched once per grid cell (size in degrees) and cached for WEATHER_CACHE_TTL seconds
+WEATHER_GRID_DEGREES = 0.05
+WEATHER_CACHE_TTL = 10 * 60
+
+# Serve the route, preferences and DeepSeek endpoints with the async views in async_views.py.
+# Turn this on when running under the ASGI entry point (src.asgi:application), e.g. with uvicorn.
+ASYNC_VIEWS = False
+
+# Budget of places_nearby searches per route request, and per minute for the whole process.
+# Routes needing more searches return the most useful ones and are flagged as partial.
+PLACES_BUDGET_PER_REQUEST = 120
+PLACES_BUDGET_PER_MINUTE = 1200
+
+# 'nearby_search' searches several filters per call with the Places API (New) Nearby Search,
+# falling back to 'legacy' (one places_nearby call per filter) if the key cannot use it
+PLACES_BACKEND = 'nearby_search'
+
+# Answer places_nearby lookups from tiles of results per (geohash cell, filter), kept in
+# MAPS_CACHE for PLACES_TILE_TTL seconds, so routes along the same corridor share searches
+PLACES_TILE_CACHE = True
+PLACES_TILE_TTL = 24 * 60 * 60
+
+# Number of places shown per route, picked by ranking.top_k from everything the searches found
+ROUTE_TOP_K = 40
+
+# Per-upstream overrides of the outbound HTTP policy in src/http_client.py, keyed by 'maps',
+# 'places', 'weather' or 'llm', e.g. {'llm': {'read_timeout': 60, 'retries': 0}}
+UPSTREAM_HTTP = {}
+
+# JSON route responses may be reused for ROUTE_MAX_AGE seconds, then revalidated with their
+# ETag; a revalidation is answered with 304 from the ETag recorded in MAPS_CACHE for
+# ROUTE_ETAG_TTL seconds, after that the route is resolved again
+ROUTE_MAX_AGE = 60
+ROUTE_ETAG_TTL = 10 * 60
+
+# Route requests with ?mode=job return a job id at once and are resolved by this many
+# background workers per process; jobs and their results are kept in MAPS_CACHE for
+# ROUTE_JOB_TTL seconds and polled at /api/jobs/<id>/
+ROUTE_JOB_WORKERS = 2
+ROUTE_JOB_TTL = 60 * 60
+# The workers are threads, so they need a process that outlives the request. Vercel freezes a
+# function once it has responded (and sets VERCEL), so there ?mode=job runs the job in the
+# request and returns the finished job instead
+ROUTE_JOB_BACKGROUND = not os.environ.get('VERCEL')
+
+# JSON and text responses of at least COMPRESSION_MIN_BYTES are sent with brotli or gzip,
+# whichever the client accepts (src/compression.py)
+COMPRESSION_MIN_BYTES = 512
+
+# Add a Server-Timing header with the upstream time per endpoint to every response
+SERVER_TIMING = True
+
+# One structured JSON log line per request with its upstream calls
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {'console': {'class': 'logging.StreamHandler'}},
+    'loggers': {'src.instrumentation': {'handlers': ['console'], 'level': 'INFO', 'propagate': False}},
+}
+
+# Identical route requests are always coalesced within a process. Turn this on to also
+# coalesce them across processes through a lock in the shared MAPS_CACHE tier; the result
+# is then kept there for ROUTE_RESULT_TTL seconds.
+ROUTE_SHARED_SINGLEFLIGHT = False
+ROUTE_RESULT_TTL = 30
+
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
@@ -50,6 +130,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'src.instrumentation.server_timing_middleware',
+    'src.compression.compression_middleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
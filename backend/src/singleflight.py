@@ -0,0 +1,193 @@
+"""
+Single-flight call coalescing.
+
+When several callers ask for the same key at the same time, only the first one runs the
+work and the others wait for and share its result (or its exception).
+"""
+
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class CallAbandoned(Exception):
+    """
+    Raised to a waiter when the leader of its call gave up without a result.
+    """
+    pass
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.abandoned = False
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls across the threads of one process.
+
+    do covers plain functions. Work that cannot run inside one call, like a streamed response
+    producing its result as it goes, leads with begin and finish instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def begin(self, key: str) -> Tuple[_Call, bool]:
+        """
+        Join the call in flight for key, or start one.
+
+        Returns:
+            Tuple of (call, whether this caller leads it). The leader must end the call with
+            finish, everybody else waits for it with wait.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+            call = self._calls[key] = _Call()
+            return call, True
+
+    def wait(self, call: _Call) -> Any:
+        """
+        Wait for a call led by another caller and return its result.
+
+        Raises:
+            The leader's exception, or CallAbandoned if the leader gave up
+        """
+        call.done.wait()
+        if call.abandoned:
+            raise CallAbandoned()
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def finish(self, key: str, call: _Call, result: Any = None, error: Optional[BaseException] = None,
+               abandoned: bool = False) -> None:
+        """End a call this caller leads with its result or error, or abandon it to its waiters."""
+        call.result = result
+        call.error = error
+        call.abandoned = abandoned
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.done.set()
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """
+        Run func for key unless a call for the same key is already running, in which case
+        wait for that call and return its result.
+
+        Args:
+            key: Identifies calls that can share a result
+            func: The work to run
+
+        Returns:
+            The result of func, possibly computed by another thread
+        """
+        while True:
+            call, leader = self.begin(key)
+            if leader:
+                break
+            try:
+                return self.wait(call)
+            except CallAbandoned:
+                continue  # run it again, possibly as the leader
+
+        try:
+            result = func()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result)
+        return result
+
+
+class SharedSingleFlight:
+    """
+    Coalesces calls across processes through a lock in a cache's shared tier.
+
+    The first process to take the lock runs the work and publishes the result under the key
+    for result_ttl seconds. Other processes poll for that result while the lock is held, and
+    run the work themselves if it never shows up (for example because the leader failed).
+    """
+
+    def __init__(self, cache: Any, lock_ttl: float, result_ttl: float, poll_interval: float = 0.1):
+        self.cache = cache
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.poll_interval = poll_interval
+
+    def published(self, key: str) -> Tuple[bool, Any]:
+        """Return (found, result) for the result published under key, without running anything."""
+        return self.cache.get(f"{key}:result", self.result_ttl, namespace='singleflight')
+
+    def publish(self, key: str, result: Any) -> None:
+        """Publish a result computed outside do, e.g. by a streamed response."""
+        self.cache.set(f"{key}:result", result, self.result_ttl)
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """Return the published result for key, or run func and publish its result."""
+        lock_key = f"{key}:lock"
+
+        found, result = self.published(key)
+        if found:
+            return result
+
+        if not self.cache.add(lock_key, True, self.lock_ttl):
+            deadline = time.monotonic() + self.lock_ttl
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                found, result = self.published(key)
+                if found:
+                    return result
+                # the leader gave up without publishing a result, so take over
+                if self.cache.add(lock_key, True, self.lock_ttl):
+                    break
+            else:
+                return func()
+
+        try:
+            result = func()
+            self.publish(key, result)
+            return result
+        finally:
+            self.cache.delete(lock_key)
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent coroutines on one event loop.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Await func() for key, or the result of an identical call already in flight."""
+        future = self._calls.get(key)
+        if future is not None and future.get_loop() is asyncio.get_running_loop():
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await func()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # mark the exception as retrieved in case nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
@@ -0,0 +1,133 @@
+"""
+Per-request spatial index of the search circles and places along a route.
+
+Sample points are spaced a little under a search radius apart, so on a straight road each
+circle reaches well beyond its neighbours'. Where the route winds or doubles back, a later
+sample point can fall in circles already searched, and its search would hardly return anything
+the earlier ones did not find. The index keeps the circles in a lat/lng grid to find those
+points, and remembers which places have already been picked so a place is only shown and
+enriched once.
+"""
+
+import math
+from typing import Dict, List, Optional, Set, Tuple
+
+EARTH_RADIUS_METERS = 6371000
+METERS_PER_DEGREE = 111320
+
+# directions (radians) and fractions of the radius of the points tested by PlaceIndex.covers
+COVERAGE_BEARINGS = [i * math.pi / 8 for i in range(16)]
+COVERAGE_RINGS = (0.5, 1.0)
+
+# a sample point is skipped when its circle out to this fraction of the radius was searched already;
+# the rim left out is the sliver a search on the same road at another point adds
+SKIP_COVERED_FRACTION = 0.85
+
+
+def distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in meters (haversine)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def offset(lat: float, lng: float, bearing: float, meters: float) -> Tuple[float, float]:
+    """Move a short distance along a bearing (radians from north), accurate enough within a search radius."""
+    dlat = meters * math.cos(bearing) / METERS_PER_DEGREE
+    dlng = meters * math.sin(bearing) / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+    return lat + dlat, lng + dlng
+
+
+class PlaceIndex:
+    """
+    Grid of the search circles of one route, and the places already shown on it.
+
+    Only used from the thread serving the request, so it is not locked.
+
+    Args:
+        cell_meters: Size of a grid cell, about the search radius works best
+    """
+
+    def __init__(self, cell_meters: float):
+        self.cell_degrees = max(cell_meters, 1.0) / METERS_PER_DEGREE
+        self._circles: Dict[Tuple[str, int, int], List[Tuple[float, float, float]]] = {}
+        self._max_radius = 0.0
+        self.selected: Set[str] = set()
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_degrees)), int(math.floor(lng / self.cell_degrees))
+
+    def add_circle(self, center: Dict[str, float], radius: float, place_type: str = '') -> None:
+        """
+        Remember a searched circle.
+
+        Args:
+            center: Search point with 'lat' and 'lng'
+            radius: Search radius in meters
+            place_type: The searched type, '' for searches of every type the route looks for
+        """
+        cell = self._cell(center['lat'], center['lng'])
+        self._circles.setdefault((place_type,) + cell, []).append((center['lat'], center['lng'], radius))
+        self._max_radius = max(self._max_radius, radius)
+
+    def _circles_near(self, center: Dict[str, float], reach: float, place_type: str) -> list:
+        # a degree of longitude shrinks away from the equator, so look further east and west
+        reach_lat = int(math.ceil(reach / METERS_PER_DEGREE / self.cell_degrees))
+        reach_lng = int(math.ceil(reach / (METERS_PER_DEGREE * max(math.cos(math.radians(center['lat'])), 1e-6))
+                                  / self.cell_degrees))
+        row, column = self._cell(center['lat'], center['lng'])
+        return [circle for i in range(row - reach_lat, row + reach_lat + 1)
+                for j in range(column - reach_lng, column + reach_lng + 1)
+                for circle in self._circles.get((place_type, i, j), [])]
+
+    def covers(self, center: Dict[str, float], radius: float, place_type: str = '') -> bool:
+        """
+        Whether the circles added for place_type already cover the circle around center.
+
+        Tested on the center and rings of points at half and the full radius, so a sliver thinner
+        than the gap between tested points may be missed.
+        """
+        circles = [circle for circle in self._circles_near(center, radius + self._max_radius, place_type)
+                   if distance_m(center['lat'], center['lng'], circle[0], circle[1]) < circle[2] + radius]
+        if not circles:
+            return False
+
+        points = [(center['lat'], center['lng'])]
+        for fraction in COVERAGE_RINGS:
+            points.extend(offset(center['lat'], center['lng'], bearing, radius * fraction)
+                          for bearing in COVERAGE_BEARINGS)
+        return all(any(distance_m(lat, lng, circle_lat, circle_lng) <= circle_radius
+                       for circle_lat, circle_lng, circle_radius in circles)
+                   for lat, lng in points)
+
+    def select(self, place_id: Optional[str]) -> None:
+        """Mark a place as shown so it is not picked again."""
+        if place_id:
+            self.selected.add(place_id)
+
+
+def uncovered_points(points: List[Dict[str, float]], radius: float) -> List[Dict[str, float]]:
+    """
+    Drop the sample points whose search circle, but for a thin rim (see SKIP_COVERED_FRACTION),
+    lies inside the circles of points kept before them.
+
+    Only the rim is not searched again, where places are the farthest off the route. The rest of
+    a dropped point's places are found by the earlier searches, unless one of them ran into
+    Google's cap on results per search.
+
+    Args:
+        points: Sample points ({'lat', 'lng'}) in route order
+        radius: Search radius in meters
+
+    Returns:
+        The points kept, in route order
+    """
+    index = PlaceIndex(radius)
+    kept = []
+    for point in points:
+        if not index.covers(point, radius * SKIP_COVERED_FRACTION):
+            index.add_circle(point, radius)
+            kept.append(point)
+    return kept
@@ -0,0 +1,157 @@
+"""
+Fast local classifier that maps free-text trip descriptions to Google Places tags.
+
+Prompts that plainly name known tags ("museums and bakeries") are answered here from a
+precompiled regex over the tag vocabulary, synonyms and plurals. Anything the matcher is not
+confident about is left to the LLM (deepseek_processor.ask_model).
+"""
+
+import re
+import threading
+from collections import namedtuple
+from typing import Any, Dict, Iterable, List, Optional
+
+ClassificationResult = namedtuple('ClassificationResult', ['tags', 'confidence', 'source'])
+
+SOURCE_EMPTY = 'empty'
+SOURCE_LOCAL = 'local'
+SOURCE_LLM = 'llm'
+
+# share of the meaningful words in a prompt that must be explained by matched tags
+CONFIDENCE_THRESHOLD = 0.75
+
+# extra phrases that name each tag, on top of the tag itself
+TAG_SYNONYMS = {
+    'restaurant': ['food', 'dining', 'dinner', 'lunch', 'breakfast', 'brunch', 'eatery', 'diner', 'place to eat'],
+    'bar': ['pub', 'brewery', 'drinks', 'cocktail', 'winery'],
+    'cafe': ['café', 'coffee', 'coffee shop', 'coffeehouse'],
+    'bakery': ['pastry', 'pastries', 'bread', 'donut'],
+    'shopping_mall': ['mall', 'shopping', 'outlet'],
+    'clothing_store': ['clothes', 'clothing', 'boutique', 'apparel'],
+    'department_store': [],
+    'convenience_store': ['snacks'],
+    'book_store': ['bookstore', 'books', 'bookshop'],
+    'jewelry_store': ['jewelry', 'jewellery', 'jeweler'],
+    'store': ['shop'],
+    'florist': ['flowers', 'flower shop'],
+    'amusement_park': ['theme park', 'rides', 'roller coaster'],
+    'aquarium': [],
+    'art_gallery': ['gallery', 'galleries', 'art'],
+    'bowling_alley': ['bowling'],
+    'casino': ['gambling'],
+    'movie_theater': ['movie theatre', 'cinema', 'movies'],
+    'museum': [],
+    'night_club': ['nightclub', 'clubbing', 'club'],
+    'park': ['nature', 'hiking', 'trails'],
+    'stadium': ['arena', 'sports game'],
+    'zoo': ['animals'],
+    'gym': ['fitness', 'workout'],
+    'tourist_attraction': ['attraction', 'sightseeing', 'landmark', 'sights'],
+    'spa': ['massage'],
+    'hotel': ['motel', 'resort'],
+    'lodging': ['place to stay', 'accommodation', 'stay overnight'],
+    'rv_park': ['rv'],
+    'campground': ['camping', 'campsite', 'camp'],
+}
+
+# words that carry no preference on their own and are ignored when scoring confidence
+STOPWORDS = frozenset("""
+a an and any are at be but by can could do for from get go going have i i'd i'm id im in
+is it like love maybe me my of on or our please places place see some stop stops that the
+then there to trip route road roadtrip way we visit want wanna would along also with you
+lots few find show hit check out good great nice best cool stuff things
+""".split())
+
+# words that change the meaning of the prompt in ways the matcher cannot handle
+NEGATIONS = frozenset("not no don't dont without except avoid never hate".split())
+
+WORD_RE = re.compile(r"[a-zà-ÿ']+")
+
+
+def _term_pattern(term: str) -> str:
+    """Regex for a term with flexible whitespace and simple plural forms of its last word."""
+    words = term.replace('_', ' ').split()
+    last = words[-1]
+    forms = [last, last + 's', last + 'es']
+    if last.endswith('y'):
+        forms.append(last[:-1] + 'ies')
+    last_pattern = '(?:' + '|'.join(re.escape(form) for form in sorted(set(forms), key=len, reverse=True)) + ')'
+    return r'\s+'.join([re.escape(word) for word in words[:-1]] + [last_pattern])
+
+
+class TagClassifier:
+    """
+    Keyword matcher over a tag vocabulary, compiled once into a single regex.
+    """
+
+    def __init__(self, vocabulary: Iterable[str], synonyms: Optional[Dict[str, List[str]]] = None):
+        synonyms = TAG_SYNONYMS if synonyms is None else synonyms
+        terms = []
+        for tag in vocabulary:
+            for term in [tag] + list(synonyms.get(tag, [])):
+                terms.append((term, tag))
+
+        # longest terms first so 'rv park' wins over 'park' and 'shopping mall' over 'mall'
+        terms.sort(key=lambda item: len(item[0]), reverse=True)
+        self._group_tags = {}
+        alternatives = []
+        for i, (term, tag) in enumerate(terms):
+            self._group_tags[f't{i}'] = tag
+            alternatives.append(f'(?P<t{i}>{_term_pattern(term)})')
+        self._pattern = re.compile(r'\b(?:' + '|'.join(alternatives) + r')\b')
+
+        self._stats = {SOURCE_EMPTY: 0, SOURCE_LOCAL: 0, SOURCE_LLM: 0}
+        self._stats_lock = threading.Lock()
+
+    def classify(self, text: Optional[str]) -> ClassificationResult:
+        """
+        Match tags named in text.
+
+        Args:
+            text: Free-text description of the trip
+
+        Returns:
+            ClassificationResult with the matched tags in order of first mention, a confidence
+            between 0 and 1, and source 'empty' for blank input or 'local' otherwise
+        """
+        text = (text or '').lower()
+        if not text.strip():
+            return ClassificationResult(tags=[], confidence=1.0, source=SOURCE_EMPTY)
+
+        tags = []
+        covered = []
+        for match in self._pattern.finditer(text):
+            tag = self._group_tags[match.lastgroup]
+            if tag not in tags:
+                tags.append(tag)
+            covered.append(match.span())
+
+        content_words = 0
+        explained_words = 0
+        for word in WORD_RE.finditer(text):
+            if word.group() in NEGATIONS:
+                return ClassificationResult(tags=tags, confidence=0.0, source=SOURCE_LOCAL)
+            if word.group() in STOPWORDS:
+                continue
+            content_words += 1
+            if any(start <= word.start() and word.end() <= end for start, end in covered):
+                explained_words += 1
+
+        if not tags:
+            confidence = 0.0
+        else:
+            confidence = explained_words / content_words if content_words else 1.0
+        return ClassificationResult(tags=tags, confidence=confidence, source=SOURCE_LOCAL)
+
+    def record(self, source: str) -> None:
+        """Count which path answered a prompt."""
+        with self._stats_lock:
+            self._stats[source] = self._stats.get(source, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return how often each path answered, and the share of prompts that skipped the LLM."""
+        with self._stats_lock:
+            counts = dict(self._stats)
+        answered = counts[SOURCE_LOCAL] + counts[SOURCE_LLM]
+        counts['llm_bypass_rate'] = counts[SOURCE_LOCAL] / answered if answered else None
+        return counts
@@ -0,0 +1,7 @@
+import os
+
+import django
+
+# the view tests import src.views, which needs the settings; manage.py test has set them up already
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'src.settings')
+django.setup()
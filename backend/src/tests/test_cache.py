@@ -0,0 +1,58 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.cache import LRUCache, RedisStore, SQLiteStore, TieredCache
+
+
+class LRUCacheTests(unittest.TestCase):
+
+    def test_add_evicts_like_set(self):
+        cache = LRUCache(max_entries=2)
+        cache.set('a', 1, 60)
+        self.assertTrue(cache.add('b', 2, 60))
+        self.assertTrue(cache.add('c', 3, 60))
+        self.assertEqual(cache.get('a'), (False, None))
+        self.assertEqual(cache.get('c'), (True, 3))
+        self.assertEqual(len(cache._entries), 2)
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, px=None, nx=False):
+        self.values[key] = value
+        return True
+
+    def pttl(self, key):
+        return 5000
+
+
+class PromotionTests(unittest.TestCase):
+
+    def promoted_ttl(self, shared) -> float:
+        cache = TieredCache(LRUCache(), shared)
+        shared.set('key', '"value"', 5)
+        with mock.patch.object(cache.local, 'set') as local_set:
+            self.assertEqual(cache.get('key', 3600), (True, 'value'))
+        return local_set.call_args.args[2]
+
+    def test_sqlite_hit_keeps_its_remaining_ttl(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.assertLessEqual(self.promoted_ttl(SQLiteStore(os.path.join(directory.name, 'cache.sqlite3'))), 5)
+
+    def test_redis_hit_keeps_its_remaining_ttl(self):
+        self.assertEqual(self.promoted_ttl(RedisStore(client=FakeRedis())), 5)
+
+    def test_ttl_is_capped_by_the_callers(self):
+        cache = TieredCache(LRUCache(), RedisStore(client=FakeRedis()))
+        cache.shared.set('key', '"value"', 5)
+        with mock.patch.object(cache.local, 'set') as local_set:
+            cache.get('key', 2)
+        self.assertEqual(local_set.call_args.args[2], 2)
@@ -0,0 +1,41 @@
+import gzip
+import json
+import unittest
+from unittest import mock
+
+import brotli
+from django.http import JsonResponse
+from django.test import RequestFactory
+
+from src.compression import choose_encoding, compress_response
+
+BODY = {'places': [{'name': 'Cafe', 'rating': 4.5}] * 100}
+
+
+class CompressionTests(unittest.TestCase):
+
+    def compressed(self, accept_encoding: str):
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return compress_response(request, JsonResponse(BODY))
+
+    def test_choose_encoding(self):
+        self.assertEqual(choose_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(choose_encoding('gzip, br;q=0'), 'gzip')
+        self.assertEqual(choose_encoding('*'), 'br')
+        self.assertIsNone(choose_encoding('identity'))
+
+    def test_gzip_without_brotli(self):
+        with mock.patch('src.compression.brotli', None):
+            self.assertEqual(choose_encoding('gzip, deflate, br'), 'gzip')
+            self.assertEqual(self.compressed('br, gzip')['Content-Encoding'], 'gzip')
+
+    def test_brotli_response(self):
+        response = self.compressed('br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(json.loads(brotli.decompress(response.content)), BODY)
+
+    def test_gzip_response(self):
+        response = self.compressed('gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content)), BODY)
+        self.assertIn('Accept-Encoding', response['Vary'])
@@ -0,0 +1,93 @@
+import unittest
+
+import numpy as np
+
+from src.geometry import (cumulative_distances, decode_polyline, distance_to_route, midpoint, resample,
+                          simplify, to_points)
+from src.spatial import offset
+
+# the example of Google's encoded polyline documentation
+EXAMPLE_POLYLINE = '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+EXAMPLE_POINTS = [[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]]
+
+
+def straight_route(length_m: float, vertices: int = 50) -> np.ndarray:
+    """A route due north along the 10th meridian east."""
+    return np.column_stack((np.linspace(0, length_m / 111195, vertices), np.full(vertices, 10.0)))
+
+
+class DecodePolylineTests(unittest.TestCase):
+
+    def test_decodes_the_documented_example(self):
+        np.testing.assert_allclose(decode_polyline(EXAMPLE_POLYLINE), EXAMPLE_POINTS)
+
+    def test_empty_polyline(self):
+        self.assertEqual(decode_polyline('').shape, (0, 2))
+
+    def test_to_points(self):
+        self.assertEqual(to_points(decode_polyline(EXAMPLE_POLYLINE))[0], {'lat': 38.5, 'lng': -120.2})
+
+
+class ResampleTests(unittest.TestCase):
+
+    def test_even_spacing_including_both_ends(self):
+        route = straight_route(10000)
+        points = resample(route, 1000)
+        np.testing.assert_allclose(points[[0, -1]], route[[0, -1]])
+        np.testing.assert_allclose(np.diff(cumulative_distances(points)), 1000, rtol=1e-3)
+
+    def test_max_points_widens_the_spacing(self):
+        self.assertEqual(len(resample(straight_route(100000), 100, max_points=20)), 20)
+
+    def test_zero_length_route(self):
+        route = np.array([[45.0, 7.0], [45.0, 7.0], [45.0, 7.0]])
+        np.testing.assert_array_equal(resample(route, 1000), [[45.0, 7.0]])
+
+    def test_single_point_and_empty_routes(self):
+        np.testing.assert_array_equal(resample(np.array([[45.0, 7.0]]), 1000), [[45.0, 7.0]])
+        self.assertEqual(resample(np.empty((0, 2)), 1000).shape, (0, 2))
+
+    def test_midpoint(self):
+        self.assertAlmostEqual(midpoint(straight_route(10000))['lat'], 5000 / 111195, places=6)
+        self.assertEqual(midpoint(np.array([[45.0, 7.0], [45.0, 7.0]])), {'lat': 45.0, 'lng': 7.0})
+        self.assertIsNone(midpoint(np.empty((0, 2))))
+
+
+class SimplifyTests(unittest.TestCase):
+
+    def test_straight_route_keeps_its_ends(self):
+        route = straight_route(10000)
+        np.testing.assert_array_equal(simplify(route, 25), route[[0, -1]])
+
+    def test_keeps_a_corner(self):
+        route = np.array([[0.0, 0.0], [0.0, 0.005], [0.0, 0.01], [0.005, 0.01], [0.01, 0.01]])
+        np.testing.assert_array_equal(simplify(route, 25), route[[0, 2, 4]])
+
+    def test_repeated_vertices(self):
+        route = np.array([[45.0, 7.0]] * 4)
+        np.testing.assert_array_equal(simplify(route, 25), route[[0, -1]])
+
+
+class DistanceToRouteTests(unittest.TestCase):
+
+    def test_distance_to_nearest_segment(self):
+        route = straight_route(10000)
+        points = np.array([[0.02, 10.0], [0.02, 10.0 + 1000 / 111195]])
+        np.testing.assert_allclose(distance_to_route(points, route), [0, 1000], atol=1)
+
+    def test_beyond_the_ends(self):
+        route = straight_route(10000)
+        np.testing.assert_allclose(distance_to_route(np.array([[-1000 / 111195, 10.0]]), route), [1000], rtol=1e-3)
+
+    def test_long_route_keeps_the_local_east_west_scale(self):
+        # 1700 km due north, the mean latitude is far from the ends
+        route = np.column_stack((np.linspace(30, 45, 200), np.full(200, 10.0)))
+        points = np.array([offset(lat, 10.0, np.pi / 2, 4000) for lat in (31.0, 44.0)])
+        np.testing.assert_allclose(distance_to_route(points, route), [4000, 4000], rtol=0.005)
+
+    def test_degenerate_routes(self):
+        point = np.array([[0.0, 1000 / 111195]])
+        np.testing.assert_allclose(distance_to_route(point, np.array([[0.0, 0.0]])), [1000], rtol=1e-3)
+        np.testing.assert_allclose(distance_to_route(point, np.array([[0.0, 0.0]] * 3)), [1000], rtol=1e-3)
+        self.assertTrue(np.isinf(distance_to_route(point, np.empty((0, 2)))).all())
+        self.assertEqual(distance_to_route(np.empty((0, 2)), straight_route(100)).shape, (0,))
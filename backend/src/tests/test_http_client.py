@@ -0,0 +1,48 @@
+import io
+import unittest
+from unittest import mock
+
+import requests
+
+from src.http_client import (STATE_CLOSED, STATE_OPEN, CircuitOpenError, UpstreamSession, get_upstream)
+
+
+def response(status: int) -> requests.Response:
+    result = requests.Response()
+    result.status_code = status
+    result.raw = io.BytesIO()
+    return result
+
+
+class UpstreamSessionTests(unittest.TestCase):
+
+    def session(self, name: str, *statuses: int):
+        session = UpstreamSession(name, get_upstream(name))
+        sent = mock.patch.object(requests.Session, 'request', side_effect=[response(s) for s in statuses])
+        self.addCleanup(sent.stop)
+        self.addCleanup(session.close)
+        return session, sent.start()
+
+    def test_maps_5xx_is_not_retried_but_opens_the_breaker(self):
+        threshold = get_upstream('maps').failure_threshold
+        session, sent = self.session('maps', *[503] * threshold)
+        for _ in range(threshold):
+            self.assertEqual(session.get('https://maps.example/').status_code, 503)
+        self.assertEqual(sent.call_count, threshold)  # googlemaps does the retrying
+        self.assertEqual(session.breaker.state, STATE_OPEN)
+        with self.assertRaises(CircuitOpenError):
+            session.get('https://maps.example/')
+
+    @mock.patch('src.http_client.time.sleep')
+    def test_places_5xx_is_retried(self, sleep):
+        session, sent = self.session('places', 503, 503, 200)
+        self.assertEqual(session.get('https://places.example/').status_code, 200)
+        self.assertEqual(sent.call_count, 3)
+        self.assertEqual(session.breaker.state, STATE_CLOSED)
+        self.assertEqual(session.breaker.failures, 0)
+
+    def test_client_errors_are_not_failures(self):
+        session, _ = self.session('maps', 404)
+        session.breaker.failures = 2
+        self.assertEqual(session.get('https://maps.example/').status_code, 404)
+        self.assertEqual(session.breaker.failures, 0)
@@ -0,0 +1,82 @@
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+from django.test import override_settings
+
+from src import views
+from src.cache import LRUCache, TieredCache
+from src.jobs import JOB_DONE, JOB_RUNNING, JobStore
+from src.preferences import Preferences
+
+
+class JobStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.store = JobStore(TieredCache(LRUCache()))
+        self.job_id = self.store.create(status=JOB_RUNNING)['id']
+
+    def test_polled_job_is_not_changed_by_later_updates(self):
+        self.store.update(self.job_id, result={'places': {0: ['first']}})
+        polled = self.store.get(self.job_id)
+        self.store.update(self.job_id, result={'places': {0: ['first'], 1: ['second']}},
+                          progress={'segments_done': 2})
+        self.assertEqual(polled['result'], {'places': {'0': ['first']}})
+        self.assertIsNone(polled['progress'])
+
+    def test_written_fields_are_copied(self):
+        result = {'places': {}}
+        self.store.update(self.job_id, result=result)
+        result['places'][0] = ['added after the update']
+        self.assertEqual(self.store.get(self.job_id)['result'], {'places': {}})
+
+    def test_changing_a_polled_job_does_not_change_the_store(self):
+        self.store.get(self.job_id)['status'] = 'changed'
+        self.assertEqual(self.store.get(self.job_id)['status'], JOB_RUNNING)
+
+    def test_concurrent_creates_share_one_job(self):
+        barrier = threading.Barrier(8)
+        jobs = []
+        # a slow shared tier widens the window between finding no job and storing one
+        set_value = self.store.cache.set
+        self.store.cache.set = lambda *args: (time.sleep(0.01), set_value(*args))
+
+        def create():
+            barrier.wait()
+            jobs.append(self.store.create(dedupe_key='route'))
+
+        threads = [threading.Thread(target=create) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(len({job['id'] for job in jobs}), 1)
+        self.assertEqual(sum(job['created'] for job in jobs), 1)
+
+    def test_finished_job_is_replaced(self):
+        first = self.store.create(dedupe_key='route')
+        self.store.update(first['id'], status=JOB_DONE)
+        second = self.store.create(dedupe_key='route')
+        self.assertTrue(second['created'])
+        self.assertNotEqual(second['id'], first['id'])
+        self.assertEqual(self.store.create(dedupe_key='route')['id'], second['id'])
+
+
+class InlineJobTests(unittest.TestCase):
+
+    @override_settings(ROUTE_JOB_BACKGROUND=False)
+    def test_job_runs_in_the_request_without_background_workers(self):
+        def run(job_id, *args):
+            views.job_store.update(job_id, status=JOB_DONE)
+
+        store = JobStore(TieredCache(LRUCache()))
+        with mock.patch.object(views, 'job_store', store), mock.patch.object(views, 'run_route_job', run), \
+                mock.patch.object(views.job_queue, 'submit') as submit:
+            response = views.start_route_job('A', 'B', Preferences(filters=['cafe'], radius=5000))
+        submit.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        job = json.loads(response.content)
+        self.assertEqual(job['status'], JOB_DONE)
+        self.assertNotIn('created', job)
@@ -0,0 +1,65 @@
+import unittest
+from unittest import mock
+
+import requests
+
+from src.budget import RateBudget
+from src.places_backend import NearbySearchBackend
+
+CENTER = {'lat': 48.2, 'lng': 16.37}
+TYPES = ['cafe', 'museum', 'park', 'restaurant']
+
+
+class FakeLegacy:
+    name = 'legacy'
+    max_types_per_call = 1
+
+    def __init__(self):
+        self.calls = []
+
+    def search(self, center, radius, place_types):
+        self.calls.extend(place_types)
+        return {place_type: ([], True) for place_type in place_types}
+
+
+def rejected(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+class FallbackBudgetTests(unittest.TestCase):
+
+    def backend(self, budget: RateBudget, status: int = 400) -> NearbySearchBackend:
+        backend = NearbySearchBackend('key', fallback=FakeLegacy(), budget=budget)
+        fetch = mock.patch.object(backend, '_fetch', side_effect=rejected(status))
+        fetch.start()
+        self.addCleanup(fetch.stop)
+        return backend
+
+    def test_fallback_calls_are_charged(self):
+        budget = RateBudget(100)
+        backend = self.backend(budget)
+        found = backend.search(CENTER, 5000, TYPES)
+        self.assertEqual(backend.fallback.calls, TYPES)
+        self.assertEqual(set(found), set(TYPES))
+        # the search itself was budgeted by the caller, the other 3 legacy calls are taken here
+        self.assertEqual(budget.available(), 97)
+
+    def test_fallback_is_cut_to_the_budget(self):
+        budget = RateBudget(100)
+        budget.take(99)
+        backend = self.backend(budget)
+        found = backend.search(CENTER, 5000, TYPES)
+        self.assertEqual(backend.fallback.calls, TYPES[:2])
+        self.assertEqual(set(found), set(TYPES[:2]))
+        self.assertEqual(budget.available(), 0)
+
+    def test_disabled_backend_plans_at_the_fallback_rate(self):
+        budget = RateBudget(100)
+        backend = self.backend(budget, status=403)
+        self.assertEqual(backend.max_types_per_call, 8)
+        backend.search(CENTER, 5000, TYPES)
+        self.assertTrue(backend.disabled)
+        self.assertEqual(backend.max_types_per_call, 1)
+        self.assertEqual(budget.available(), 97)
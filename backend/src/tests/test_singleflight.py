@@ -0,0 +1,33 @@
+import unittest
+
+from src.singleflight import CallAbandoned, SingleFlight
+
+
+class SingleFlightTests(unittest.TestCase):
+
+    def test_waiter_shares_the_leaders_result(self):
+        flights = SingleFlight()
+        call, leader = flights.begin('key')
+        joined, joined_leader = flights.begin('key')
+        self.assertTrue(leader)
+        self.assertIs(joined, call)
+        self.assertFalse(joined_leader)
+        flights.finish('key', call, 'computed by the leader')
+        self.assertEqual(flights.wait(joined), 'computed by the leader')
+
+    def test_waiter_runs_the_work_when_the_leader_abandons(self):
+        flights = SingleFlight()
+        call, _ = flights.begin('key')
+        joined, _ = flights.begin('key')
+        flights.finish('key', call, abandoned=True)
+        with self.assertRaises(CallAbandoned):
+            flights.wait(joined)
+        self.assertEqual(flights.do('key', lambda: 'computed by the waiter'), 'computed by the waiter')
+
+    def test_leader_error_is_raised_to_waiters(self):
+        flights = SingleFlight()
+        call, _ = flights.begin('key')
+        joined, _ = flights.begin('key')
+        flights.finish('key', call, error=ValueError('failed'))
+        with self.assertRaises(ValueError):
+            flights.wait(joined)
@@ -0,0 +1,79 @@
+import unittest
+
+from src.spatial import PlaceIndex, distance_m, offset, uncovered_points
+
+RADIUS = 5000
+SPACING = 0.9 * RADIUS
+
+
+def points_along(lat: float, lng: float, bearing: float, count: int) -> list:
+    """count points SPACING apart, starting at (lat, lng) and heading along bearing (radians)."""
+    points = []
+    for _ in range(count):
+        points.append({'lat': lat, 'lng': lng})
+        lat, lng = offset(lat, lng, bearing, SPACING)
+    return points
+
+
+class CoversTests(unittest.TestCase):
+
+    def test_circle_inside_a_searched_circle(self):
+        index = PlaceIndex(RADIUS)
+        index.add_circle({'lat': 45.0, 'lng': 7.0}, 2 * RADIUS)
+        self.assertTrue(index.covers({'lat': 45.01, 'lng': 7.0}, RADIUS))
+
+    def test_neighbours_on_a_straight_road_do_not_cover(self):
+        before, point, after = points_along(45.0, 7.0, 0.0, 3)
+        index = PlaceIndex(RADIUS)
+        index.add_circle(before, RADIUS)
+        index.add_circle(after, RADIUS)
+        self.assertFalse(index.covers(point, RADIUS))
+
+    def test_circles_are_kept_per_type(self):
+        index = PlaceIndex(RADIUS)
+        index.add_circle({'lat': 45.0, 'lng': 7.0}, RADIUS, 'cafe')
+        self.assertTrue(index.covers({'lat': 45.0, 'lng': 7.0}, RADIUS, 'cafe'))
+        self.assertFalse(index.covers({'lat': 45.0, 'lng': 7.0}, RADIUS, 'museum'))
+
+
+class UncoveredPointsTests(unittest.TestCase):
+
+    def test_straight_route_keeps_every_point(self):
+        points = points_along(45.0, 7.0, 0.0, 20)
+        self.assertEqual(uncovered_points(points, RADIUS), points)
+
+    def test_out_and_back_route_skips_the_way_back(self):
+        out = points_along(45.0, 7.0, 0.0, 10)
+        back = [dict(point) for point in reversed(out)]
+        kept = uncovered_points(out + back, RADIUS)
+        self.assertEqual(kept, out)
+
+    def test_way_back_is_skipped_whatever_the_sampling_phase(self):
+        out = points_along(45.0, 7.0, 0.0, 10)
+        last = out[-1]
+        back = points_along(*offset(last['lat'], last['lng'], 3.1416, SPACING / 2), 3.1416, 9)
+        self.assertEqual(uncovered_points(out + back, RADIUS), out)
+
+    def test_parallel_road_is_searched(self):
+        up = points_along(45.0, 7.0, 0.0, 8)
+        top = up[-1]
+        down = points_along(*offset(top['lat'], top['lng'], 1.5708, 2 * RADIUS), 3.1416, 8)
+        self.assertEqual(uncovered_points(up + down, RADIUS), up + down)
+
+    def test_every_skipped_point_is_near_a_kept_one(self):
+        out = points_along(45.0, 7.0, 0.0, 10)
+        back = points_along(*offset(out[-1]['lat'], out[-1]['lng'], 1.5708, 300), 3.1416, 10)
+        kept = uncovered_points(out + back, RADIUS)
+        self.assertLess(len(kept), len(out + back))
+        for point in out + back:
+            self.assertTrue(any(distance_m(point['lat'], point['lng'], k['lat'], k['lng']) <= RADIUS / 2
+                                for k in kept))
+
+
+class SelectTests(unittest.TestCase):
+
+    def test_select_ignores_missing_ids(self):
+        index = PlaceIndex(RADIUS)
+        index.select('a')
+        index.select(None)
+        self.assertEqual(index.selected, {'a'})
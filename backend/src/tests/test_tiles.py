@@ -0,0 +1,126 @@
+import random
+import unittest
+from unittest import mock
+
+import numpy as np
+from django.test import override_settings
+
+from src import views
+from src.budget import RateBudget
+from src.cache import LRUCache, TieredCache
+from src.preferences import Preferences
+from src.spatial import distance_m, offset
+from src.tiles import (PlaceTiles, bounds, cells_covering, encode, merge_tiles, precision_for_radius,
+                       search_circle)
+
+RADIUS = 5000
+
+
+def place(place_id: str, lat: float, lng: float) -> dict:
+    return {'place_id': place_id, 'name': place_id, 'geometry': {'location': {'lat': lat, 'lng': lng}},
+            'types': ['restaurant'], 'rating': 4.5, 'user_ratings_total': 100,
+            'photos': [{'photo_reference': f"photo_{place_id}"}]}
+
+
+class CellTests(unittest.TestCase):
+
+    def test_encode_and_bounds(self):
+        self.assertEqual(encode(57.64911, 10.40744, 9), 'u4pruydqq')
+        south, north, west, east = bounds('u4pruydqq')
+        self.assertTrue(south <= 57.64911 <= north and west <= 10.40744 <= east)
+
+    def test_search_circle_contains_its_cell(self):
+        cell = encode(45.0, 7.0, precision_for_radius(RADIUS))
+        center, radius = search_circle(cell)
+        south, north, west, east = bounds(cell)
+        for lat, lng in ((south, west), (south, east), (north, west), (north, east)):
+            self.assertLessEqual(distance_m(center['lat'], center['lng'], lat, lng), radius)
+
+    def test_cells_cover_every_point_of_the_circle(self):
+        rng = random.Random(1)
+        for center in ({'lat': 45.0, 'lng': 7.0}, {'lat': -33.9, 'lng': 151.2}, {'lat': 0.01, 'lng': 179.99}):
+            precision = precision_for_radius(RADIUS)
+            cells = set(cells_covering(center, RADIUS, precision))
+            for _ in range(500):
+                lat, lng = offset(center['lat'], center['lng'], rng.uniform(0, 2 * np.pi),
+                                  RADIUS * rng.random() ** 0.5 * 0.999)
+                lng = (lng + 180) % 360 - 180
+                self.assertIn(encode(lat, lng, precision), cells)
+
+    def test_merge_flags_missing_tiles(self):
+        center = {'lat': 45.0, 'lng': 7.0}
+        tile = {'results': [place('a', 45.0, 7.0), place('far', 46.0, 7.0)], 'complete': True}
+        results, complete = merge_tiles([tile, tile], center, RADIUS)
+        self.assertEqual([p['place_id'] for p in results], ['a'])
+        self.assertTrue(complete)
+        self.assertFalse(merge_tiles([tile, None], center, RADIUS)[1])
+
+
+class FakeBackend:
+    """Places backend answering every search with one place at its center, or failing."""
+
+    name = 'fake'
+    max_types_per_call = 8
+
+    def __init__(self, fail_tiles: bool = False):
+        self.fail_tiles = fail_tiles
+        self.calls = []
+
+    def search(self, center, radius, place_types):
+        tile_search = radius != RADIUS
+        self.calls.append('tile' if tile_search else 'point')
+        if tile_search and self.fail_tiles:
+            raise RuntimeError('upstream down')
+        found = place(f"{center['lat']:.5f},{center['lng']:.5f}", center['lat'], center['lng'])
+        return {place_type: ([found], True) for place_type in place_types}
+
+
+class CorridorSearchTests(unittest.TestCase):
+    """search_corridor_tiles and the partial flag, against a fake backend and fresh caches."""
+
+    route = np.column_stack((np.linspace(45.0, 45.2, 40), np.full(40, 7.0)))  # about 22 km
+
+    def setUp(self):
+        self.backend = FakeBackend()
+        patches = [
+            mock.patch.object(views, 'places_backend', self.backend),
+            mock.patch.object(views, 'place_tiles', PlaceTiles(TieredCache(LRUCache()))),
+            mock.patch.object(views, 'places_budget', RateBudget(10000)),
+            mock.patch.object(views, 'gmaps_client', object()),
+            mock.patch.object(views, 'get_weather_for_points', lambda points: [None] * len(points)),
+            mock.patch.object(views, 'calculate_travel_times', lambda origin, points: [None] * len(points)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.preferences = Preferences(filters=['restaurant'], radius=RADIUS)
+
+    def resolve(self, per_request: int):
+        with override_settings(PLACES_BUDGET_PER_REQUEST=per_request, PLACES_TILE_CACHE=True):
+            plan = views.plan_place_searches(self.route, self.preferences)
+            places = views.get_places_along_route(self.route, self.preferences, plan=plan)
+        return plan, places
+
+    def test_cold_corridor_is_filled_with_tiles_when_the_budget_allows(self):
+        plan, places = self.resolve(per_request=120)
+        self.assertFalse(plan.partial)
+        self.assertNotIn('point', self.backend.calls)
+        self.assertTrue(places)
+
+        # the same corridor again is served from the tiles
+        self.backend.calls.clear()
+        plan, _ = self.resolve(per_request=120)
+        self.assertEqual(self.backend.calls, [])
+        self.assertFalse(plan.partial)
+
+    def test_lookups_without_budget_for_their_tiles_are_searched_directly(self):
+        plan, places = self.resolve(per_request=len(views.sample_route_points(self.route, 0.9 * RADIUS)))
+        self.assertFalse(plan.partial)
+        self.assertIn('point', self.backend.calls)
+        self.assertLessEqual(len(self.backend.calls), len(plan.sample_points))
+        self.assertTrue(places)
+
+    def test_failed_tile_searches_make_the_result_partial(self):
+        self.backend.fail_tiles = True
+        plan, _ = self.resolve(per_request=120)
+        self.assertTrue(plan.partial)
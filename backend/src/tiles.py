@@ -0,0 +1,197 @@
+"""
+Corridor tile cache of places_nearby results.
+
+Routes along the same corridor sample slightly different points, so caching searches by their
+exact location rarely hits. Instead the map is cut into geohash cells sized after the search
+radius, and each (cell, place type) tile is searched once with a circle around the whole cell.
+A lookup is answered by the union of the tiles its circle touches, so only tiles nobody has
+searched yet go to Google and the hit rate grows with traffic.
+"""
+
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .spatial import METERS_PER_DEGREE, distance_m
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+MAX_PRECISION = 9
+MAX_SEARCH_RADIUS = 50000  # largest radius places_nearby accepts, in meters
+
+DEFAULT_TILE_TTL = 24 * 60 * 60
+
+
+def cell_degrees(precision: int) -> Tuple[float, float]:
+    """Height and width in degrees of a geohash cell, longitude gets the odd bit."""
+    bits = 5 * precision
+    return 180 / 2 ** (bits // 2), 360 / 2 ** ((bits + 1) // 2)
+
+
+def precision_for_radius(radius: float) -> int:
+    """
+    Geohash precision whose cells are closest in size to a search circle of radius meters.
+
+    Sizes are compared on a log scale, using the larger side of a cell at the equator, so the
+    precision only depends on the radius.
+    """
+    diameter = max(2 * radius, 1.0)
+
+    def mismatch(precision):
+        height, width = cell_degrees(precision)
+        return abs(math.log(max(height, width) * METERS_PER_DEGREE / diameter))
+    return min(range(1, MAX_PRECISION + 1), key=mismatch)
+
+
+def encode(lat: float, lng: float, precision: int) -> str:
+    """Geohash of a point."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = value = 0
+    even = True
+    while len(chars) < precision:
+        span, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (span[0] + span[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            span[0] = middle
+        else:
+            span[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = value = 0
+    return ''.join(chars)
+
+
+def bounds(cell: str) -> Tuple[float, float, float, float]:
+    """South, north, west and east edges of a geohash cell in degrees."""
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in cell:
+        value = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            span = lng_range if even else lat_range
+            middle = (span[0] + span[1]) / 2
+            if value >> shift & 1:
+                span[0] = middle
+            else:
+                span[1] = middle
+            even = not even
+    return lat_range[0], lat_range[1], lng_range[0], lng_range[1]
+
+
+def search_circle(cell: str) -> Tuple[Dict[str, float], int]:
+    """
+    Circle around a whole cell, for the search that fills its tile.
+
+    Returns:
+        Tuple of (center point with 'lat' and 'lng', radius in meters)
+    """
+    south, north, west, east = bounds(cell)
+    center = {'lat': (south + north) / 2, 'lng': (west + east) / 2}
+    # the corners nearer the equator are the farther ones
+    radius = max(distance_m(center['lat'], center['lng'], lat, lng) for lat in (south, north) for lng in (west, east))
+    return center, min(int(math.ceil(radius)), MAX_SEARCH_RADIUS)
+
+
+def cells_covering(center: Dict[str, float], radius: float, precision: int) -> List[str]:
+    """
+    Cells that overlap the circle of radius meters around center.
+
+    Args:
+        center: Point with 'lat' and 'lng'
+        radius: Circle radius in meters
+        precision: Geohash precision of the cells
+
+    Returns:
+        Geohashes of the cells, south to north and west to east
+    """
+    height, width = cell_degrees(precision)
+    lat, lng = center['lat'], center['lng']
+    dlat = radius / METERS_PER_DEGREE
+    dlng = radius / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+
+    cells = []
+    for row in range(int(math.floor((max(lat - dlat, -90) + 90) / height)),
+                     int(math.floor((min(lat + dlat, 90 - 1e-9) + 90) / height)) + 1):
+        south = -90 + row * height
+        for column in range(int(math.floor((lng - dlng + 180) / width)),
+                            int(math.floor((lng + dlng + 180) / width)) + 1):
+            west = -180 + column * width
+            # skip cells only touched by the bounding box, not by the circle
+            nearest_lat = min(max(lat, south), south + height)
+            nearest_lng = min(max(lng, west), west + width)
+            if distance_m(lat, lng, nearest_lat, nearest_lng) > radius:
+                continue
+            cell_lng = (west + width / 2 + 180) % 360 - 180
+            cells.append(encode(south + height / 2, cell_lng, precision))
+    return cells
+
+
+def merge_tiles(tiles: Iterable[Optional[Dict[str, Any]]], center: Dict[str, float],
+                radius: float) -> Tuple[list, bool]:
+    """
+    Answer a search of the circle around center from the tiles covering it.
+
+    Places keep the rank they had in their tile, so the merged list interleaves the tiles best
+    first, much like one search of the circle would order them.
+
+    Args:
+        tiles: Tiles ({'results', 'complete'}) of the cells covering the circle, None for missing ones
+        center: Point with 'lat' and 'lng'
+        radius: Circle radius in meters
+
+    Returns:
+        Tuple of (places within the circle, whether every tile was present and complete)
+    """
+    ranked = []
+    complete = True
+    for order, tile in enumerate(tiles):
+        if tile is None:
+            complete = False
+            continue
+        complete = complete and tile['complete']
+        for rank, place in enumerate(tile['results']):
+            location = (place.get('geometry') or {}).get('location')
+            if location and distance_m(center['lat'], center['lng'], location['lat'], location['lng']) <= radius:
+                ranked.append((rank, order, place))
+    ranked.sort(key=lambda item: item[:2])
+
+    results = []
+    seen = set()
+    for _, _, place in ranked:
+        if place.get('place_id') in seen:
+            continue
+        seen.add(place.get('place_id'))
+        results.append(place)
+    return results, complete
+
+
+class PlaceTiles:
+    """
+    Store of (cell, place type) tiles in a TieredCache, shared by every route.
+
+    Args:
+        cache: The cache holding the tiles, its shared tier makes them survive restarts
+        ttl: Seconds a tile stays fresh
+    """
+
+    def __init__(self, cache: Any, ttl: float = DEFAULT_TILE_TTL):
+        self.cache = cache
+        self.ttl = ttl
+
+    @staticmethod
+    def key(cell: str, place_type: str) -> str:
+        return f"places_tile:{place_type}:{cell}"
+
+    def get(self, cell: str, place_type: str) -> Optional[Dict[str, Any]]:
+        """Return the tile ({'results', 'complete'}), or None if it is not cached."""
+        found, tile = self.cache.get(self.key(cell, place_type), self.ttl, namespace='places_tile')
+        return tile if found else None
+
+    def put(self, cell: str, place_type: str, results: list, complete: bool) -> Dict[str, Any]:
+        """Store the results of the search of a cell and return the tile."""
+        tile = {'results': results, 'complete': complete}
+        self.cache.set(self.key(cell, place_type), tile, self.ttl)
+        return tile
@@ -14,14 +14,24 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path
 
-from .views import index, set_user_preferences, deepseek_api
+from .views import (index, set_user_preferences, deepseek_api, cache_stats, place_details, upstream_metrics,
+                    route_job, place_photo)
+
+if getattr(settings, 'ASYNC_VIEWS', False):
+    from .async_views import index, set_user_preferences, deepseek_api
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', index, name='index'),
     path('api/preferences/', set_user_preferences, name='set_user_preferences'),
     path('api/deepseek/', deepseek_api, name='deepseek_api'),
+    path('api/place/<str:place_id>/', place_details, name='place_details'),
+    path('api/cache/stats/', cache_stats, name='cache_stats'),
+    path('api/metrics/', upstream_metrics, name='upstream_metrics'),
+    path('api/jobs/<str:job_id>/', route_job, name='route_job'),
+    path('api/photo/', place_photo, name='place_photo'),
 ]
@@ -1,33 +1,77 @@
-from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.http import (HttpResponse, HttpResponseNotModified, HttpResponseRedirect, JsonResponse,
+                         StreamingHttpResponse)
 from django.template.loader import render_to_string, get_template
 from django.shortcuts import render
+from django.urls import reverse
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
 
+import hashlib
 import json
 import logging
+import math
+import re
 import yaml
 import googlemaps
+import numpy as np
 import requests
 import random
 from datetime import datetime
-from typing import Tuple, Dict, Any, Optional
-from geographiclib.geodesic import Geodesic
-from googlemaps.convert import decode_polyline
+from typing import Tuple, Dict, Any, Iterator, List, Optional, Union
 from django.views.decorators.csrf import csrf_exempt
 
-from collections import namedtuple
-
-from .deepseek_processor import ask_model
+from itertools import groupby
+
+from .budget import FilterYield, RateBudget, allocate
+from .cache import CachedMapsClient, build_cache, make_key
+from .concurrency import run_bounded, DEFAULT_MAX_IN_FLIGHT
+from .deepseek_processor import ask_model, get_tag_cache
+from .geometry import decode_polyline, distance_to_route, midpoint, resample, simplify, to_points
+from .http_client import circuit_states, get_session
+from .instrumentation import metrics
+from .jobs import (DEFAULT_JOB_TTL, DEFAULT_JOB_WORKERS, JOB_DONE, JOB_FAILED, JOB_RUNNING, JobQueue,
+                   JobStore)
+from .places_backend import DEFAULT_PLACES_BACKEND, SearchResults, build_places_backend
+from .preferences import (Preferences, PREFERENCES_COOKIE, PREFERENCES_HEADER, PREFERENCES_MAX_AGE, PREFERENCES_PARAM,
+                          encode_preferences, get_request_preferences)
+from .ranking import Candidate, top_k
+from .singleflight import CallAbandoned, SharedSingleFlight, SingleFlight
+from .spatial import PlaceIndex, distance_m, uncovered_points
+from .tag_classifier import (ClassificationResult, TagClassifier, CONFIDENCE_THRESHOLD, SOURCE_EMPTY,
+                             SOURCE_LLM)
+from .tiles import (DEFAULT_TILE_TTL, PlaceTiles, cells_covering, encode, merge_tiles, precision_for_radius,
+                    search_circle)
+from .weather import get_weather_for_points
+from .wire import compact_route_payload
 
 logger = logging.getLogger(__name__)
 
 # Constants
 SEARCH_RADIUS_METERS = 5000
-PLACES_PER_COORDINATE = 3
-POLYLINE_STEP = 35  # increased step size to reduce API calls
+CANDIDATES_PER_LOOKUP = 10  # top results of each lookup that compete in the ranking
+DEFAULT_ROUTE_TOP_K = 40  # places shown per route
+SAMPLE_SPACING_FRACTION = 0.9  # distance between search points as a fraction of the search radius
+ROUTE_SIMPLIFY_TOLERANCE = 25  # meters, detours are measured against the simplified route
+MAX_SAMPLE_POINTS = 200  # cap on sample points per route, the search budget decides which are searched
+DEFAULT_PLACES_BUDGET_PER_REQUEST = 120
+DEFAULT_PLACES_BUDGET_PER_MINUTE = 1200
+ROUTE_LOCK_TTL = 120  # seconds another process waits on a route being computed elsewhere
+STREAM_SEGMENT_POINTS = 8  # sample points resolved per streamed segment, their places are enriched at the end
+JOB_SEGMENT_POINTS = 8  # sample points resolved between two saves of a route job's partial result
+DEFAULT_ROUTE_MAX_AGE = 60  # seconds browsers and CDNs may reuse a route response without revalidating
+DEFAULT_ROUTE_ETAG_TTL = 10 * 60  # seconds a route response's ETag is vouched for without recomputing it
 DEFAULT_PLACE_TYPE = 'restaurant'
 MAX_FILTERS_TO_QUERY = 8  # reduced max filters to decrease API calls
+MAPS_RETRY_TIMEOUT = 10  # seconds googlemaps keeps retrying the statuses it retries itself
+DISTANCE_MATRIX_MAX_DESTINATIONS = 25  # Distance Matrix allows at most 25 destinations per request
+PLACE_DETAILS_FIELDS = ['website', 'formatted_phone_number', 'opening_hours']
+PLACE_DETAILS_MAX_AGE = 60 * 60  # seconds browsers may reuse a place details response
+PHOTO_MAX_WIDTH = 800
+PHOTO_REDIRECT_MAX_AGE = 24 * 60 * 60  # seconds a photo redirect may be cached, photo references are long lived
+PHOTO_REF_PATTERN = re.compile(r'^(places/[\w-]+/photos/)?[\w-]+$')
 
 FOOD_AND_DRINK = "Food & Drink"
 LODGING = "Lodging"
@@ -160,18 +204,47 @@ ALL_FILTER_OPTIONS = {
     # 'medical_clinic': HEALTH
 }
 
-# module-level user filters (simple prototype storage)
-USER_FILTERS = []
-LAST_APPLIED_FILTERS = []
-SEARCH_RADIUS = SEARCH_RADIUS_METERS  # dynamic radius with default
+# compiled once at import: answers prompts that plainly name known tags without the LLM
+tag_classifier = TagClassifier(ALL_FILTER_OPTIONS)
+
+
+# preferences used when a request carries no (valid) preferences token
+DEFAULT_PREFERENCES = Preferences(filters=[], radius=SEARCH_RADIUS_METERS)
+
+# Initialize Google Maps client, with every lookup going through the response cache
+maps_cache = build_cache(getattr(settings, 'MAPS_CACHE', None))
+
+# places_nearby searches left this minute across all requests, and how often each filter finds a place
+places_budget = RateBudget(getattr(settings, 'PLACES_BUDGET_PER_MINUTE', DEFAULT_PLACES_BUDGET_PER_MINUTE))
+filter_yield = FilterYield()
+
+# places_nearby results per (geohash cell, filter), shared by every route through the cache tiers
+place_tiles = PlaceTiles(maps_cache, getattr(settings, 'PLACES_TILE_TTL', DEFAULT_TILE_TTL))
 
-# Initialize Google Maps client
+# long routes requested with ?mode=job run in these background workers, their records live in the cache tiers
+job_store = JobStore(maps_cache, getattr(settings, 'ROUTE_JOB_TTL', DEFAULT_JOB_TTL))
+job_queue = JobQueue(getattr(settings, 'ROUTE_JOB_WORKERS', DEFAULT_JOB_WORKERS))
+
+# identical route requests in flight at the same time share one pipeline run
+route_flights = SingleFlight()
+shared_route_flights = SharedSingleFlight(maps_cache, lock_ttl=ROUTE_LOCK_TTL,
+                                          result_ttl=getattr(settings, 'ROUTE_RESULT_TTL', 30))
 try:
-    gmaps_client = googlemaps.Client(key=settings.GOOGLE_MAPS_API_KEY)
+    # the 'maps' session pools connections and counts every HTTP attempt. It retries connection
+    # errors, 429 and 502 while googlemaps retries 500, 503, 504 and OVER_QUERY_LIMIT answers
+    # for at most MAPS_RETRY_TIMEOUT seconds, so no status is retried by both layers
+    gmaps_client = CachedMapsClient(googlemaps.Client(key=settings.GOOGLE_MAPS_API_KEY,
+                                                      requests_session=get_session('maps'),
+                                                      retry_timeout=MAPS_RETRY_TIMEOUT),
+                                    maps_cache)
 except Exception as e:
     logger.error(f"Failed to initialize Google Maps client: {e}")
     gmaps_client = None
 
+# nearby searches go to the Places API (New) when configured, several filters per call
+places_backend = build_places_backend(getattr(settings, 'PLACES_BACKEND', DEFAULT_PLACES_BACKEND), gmaps_client,
+                                      settings.GOOGLE_MAPS_API_KEY, maps_cache, places_budget)
+
 
 def get_coordinates_from_address(address: str) -> Optional[Tuple[float, float]]:
     """
@@ -200,16 +273,31 @@ def get_coordinates_from_address(address: str) -> Optional[Tuple[float, float]]:
         logger.error(f"Error geocoding address {address}: {e}")
         return None
 
-def get_route_data(start: str, destination: str) -> Optional[Dict[str, Any]]:
+def summarize_leg(leg: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep the parts of a Directions leg the frontend uses."""
+    return {
+        'start_address': leg.get('start_address'),
+        'end_address': leg.get('end_address'),
+        'distance_meters': leg.get('distance', {}).get('value'),
+        'duration_seconds': leg.get('duration', {}).get('value'),
+    }
+
+
+def get_route_data(start: Union[str, Tuple[float, float]],
+                   destination: Union[str, Tuple[float, float]]) -> Optional[Dict[str, Any]]:
     """
-    Get route data including polyline and center coordinates.
-    
+    Get route data including polyline, endpoints and center coordinates.
+
+    The endpoints come from the first and last leg of the route, so no separate geocoding
+    is needed when directions succeed.
+
     Args:
-        start: Starting address
-        destination: Destination address
-    
+        start: Starting address or (lat, lng)
+        destination: Destination address or (lat, lng)
+
     Returns:
-        Dictionary containing route data or None if error occurs
+        Dictionary with 'polyline', 'decoded_points', 'center' (midpoint by distance),
+        'start_coords', 'dest_coords' and 'legs', or None if error occurs
     """
     if not gmaps_client:
         return None
@@ -220,37 +308,119 @@ def get_route_data(start: str, destination: str) -> Optional[Dict[str, Any]]:
             logger.warning(f"No route found between {start} and {destination}")
             return None
 
-        route_polyline = directions[0]['overview_polyline']['points']
-        decoded_poly = decode_polyline(route_polyline)
+        route = directions[0]
+        route_polyline = route['overview_polyline']['points']
+        decoded_poly = decode_polyline(route_polyline)  # (n, 2) array of [lat, lng]
 
-        # Calculate center point (could be improved to find actual center)
-        center_coord = decoded_poly[len(decoded_poly)//2]
+        legs = route.get('legs') or []
+        start_coords = dest_coords = None
+        if legs:
+            start_location = legs[0]['start_location']
+            end_location = legs[-1]['end_location']
+            start_coords = (start_location['lat'], start_location['lng'])
+            dest_coords = (end_location['lat'], end_location['lng'])
 
         return {
             'polyline': route_polyline,
             'decoded_points': decoded_poly,
-            'center': center_coord
+            'center': midpoint(decoded_poly),
+            'start_coords': start_coords,
+            'dest_coords': dest_coords,
+            'legs': [summarize_leg(leg) for leg in legs],
         }
     except Exception as e:
         logger.error(f"Error getting route data: {e}")
         return None
 
-def get_users_preferences() -> list:
-    """Return the current list of place-type filters to apply.
+def get_users_preferences(request) -> Preferences:
+    """Return the filters and search radius to apply for this request.
 
-    This reads the module-level USER_FILTERS which can be updated via
-    the set_user_preferences view.
+    These are read from the signed preferences token issued by the
+    set_user_preferences view, so concurrent users never share state.
     """
-    return USER_FILTERS
+    return get_request_preferences(request, DEFAULT_PREFERENCES)
+
+
+def get_applied_filters(filters_selected: list) -> list:
+    """Return the filters that are actually queried (sliced to a manageable size)."""
+    return list(filters_selected)[:MAX_FILTERS_TO_QUERY]
+
+
+def parse_search_radius(search_radius: Any) -> int:
+    """Return the requested search radius in meters, or the default if it is empty or invalid."""
+    if not search_radius:
+        return SEARCH_RADIUS_METERS  # default if empty
+    try:
+        radius = int(search_radius)
+    except (TypeError, ValueError):
+        return SEARCH_RADIUS_METERS  # reset to default if not a number
+    return radius if radius > 0 else SEARCH_RADIUS_METERS  # reset to default if invalid
+
+
+def get_category_filters(categories: list) -> list:
+    """Convert human category labels into the place types they contain, in random order."""
+    filters = []
+    for place_type, category in ALL_FILTER_OPTIONS.items():
+        if category in categories:
+            filters.append(place_type)
+    random.shuffle(filters)
+    return filters
+
+
+def classify_locally(custom_input: str) -> Optional[ClassificationResult]:
+    """
+    Classify the user's free-text input with the local matcher.
+
+    Returns:
+        The result if the input is empty or the matcher is confident, otherwise None so the
+        caller falls back to ask_model
+    """
+    result = tag_classifier.classify(custom_input)
+    if result.source == SOURCE_EMPTY or result.confidence >= CONFIDENCE_THRESHOLD:
+        tag_classifier.record(result.source)
+        return result
+    return None
+
+
+def llm_classification(deepseekTags: Optional[str]) -> ClassificationResult:
+    """Wrap the comma-separated tags returned by ask_model in a ClassificationResult."""
+    tag_classifier.record(SOURCE_LLM)
+    tags = [tag.strip() for tag in (deepseekTags or '').split(',') if tag.strip()]
+    return ClassificationResult(tags=tags, confidence=None, source=SOURCE_LLM)
+
+
+def classify_custom_input(custom_input: str) -> ClassificationResult:
+    """
+    Turn the user's free-text input into place tags, only asking the LLM when the local
+    matcher is not confident.
+    """
+    return classify_locally(custom_input) or llm_classification(ask_model(settings.DEEPSEEK_API_KEY, custom_input))
+
+
+def preferences_response(filters: list, radius: int, deepseek_input: str,
+                         tag_source: Optional[str] = None) -> JsonResponse:
+    """Build the preferences JSON response and set the signed preferences token as a cookie."""
+    token = encode_preferences(Preferences(filters=filters, radius=radius))
+    response = JsonResponse({
+        'status': 'ok',
+        'filters_count': len(filters),
+        'filters': filters,
+        'deepseek_input': deepseek_input,
+        'search_radius': radius,
+        'tag_source': tag_source,  # which classifier path answered the custom input
+        'preferences_token': token,
+    })
+    response.set_cookie(PREFERENCES_COOKIE, token, max_age=PREFERENCES_MAX_AGE, samesite='Lax')
+    return response
 
 
 @csrf_exempt
 def set_user_preferences(request):
     """Accept POST JSON { categories: [..] } where categories are human labels
     (e.g. "Food and Drink", "Health", etc.). Convert those to place types
-    using ALL_FILTER_OPTIONS and store in USER_FILTERS.
+    using ALL_FILTER_OPTIONS and return them, with the search radius, as a
+    signed preferences token (also set as a cookie).
     """
-    global USER_FILTERS
     if request.method != 'POST':
         return JsonResponse({'error': 'POST required'}, status=405)
 
@@ -264,50 +434,81 @@ def set_user_preferences(request):
             return JsonResponse({'error': 'categories must be a list'}, status=400)
             
         # Handle search radius
-        global SEARCH_RADIUS
-        if search_radius:
-            try:
-                radius = int(search_radius)
-                if radius > 0:
-                    SEARCH_RADIUS = radius
-                else:
-                    SEARCH_RADIUS = SEARCH_RADIUS_METERS  # reset to default if invalid
-            except ValueError:
-                SEARCH_RADIUS = SEARCH_RADIUS_METERS  # reset to default if not a number
-        else:
-            SEARCH_RADIUS = SEARCH_RADIUS_METERS  # reset to default if empty
+        radius = parse_search_radius(search_radius)
 
         # print(categories)
         # print(f"deepseek_input: {deepseek_input}")
-        # print(f"search_radius: {SEARCH_RADIUS}")
-
-        USER_FILTERS = []
-        for place_type, category in ALL_FILTER_OPTIONS.items():
-            if category in categories:
-                USER_FILTERS.append(place_type)
-        random.shuffle(USER_FILTERS)
-        # print(USER_FILTERS)
-
-        deepseekTags = ask_model(settings.DEEPSEEK_API_KEY, deepseek_input)
-        # print(deepseekTags)
-        if deepseekTags: # not empty
-            USER_FILTERS = deepseekTags.split(',') + USER_FILTERS
-        # print(USER_FILTERS)
-
-        return JsonResponse({
-            'status': 'ok',
-            'filters_count': len(USER_FILTERS),
-            'filters': USER_FILTERS,
-            'deepseek_input': deepseek_input,
-            'search_radius': SEARCH_RADIUS
-        })
+        # print(f"search_radius: {radius}")
+
+        filters = get_category_filters(categories)
+        # print(filters)
+
+        classification = classify_custom_input(deepseek_input)
+        # print(classification)
+        if classification.tags: # not empty
+            filters = classification.tags + filters
+        # print(filters)
+
+        return preferences_response(filters, radius, deepseek_input, classification.source)
     except Exception as e:
         logger.error(f"Failed to set preferences: {e}")
         return JsonResponse({'error': str(e)}, status=500)
 
+def calculate_travel_times(origin_coords: Tuple[float, float],
+                           dest_coords_list: list) -> list:
+    """
+    Calculate travel times in minutes from one origin to many points using the Distance Matrix API.
+
+    Destinations are sent in batches of DISTANCE_MATRIX_MAX_DESTINATIONS, and the batches run
+    concurrently.
+
+    Args:
+        origin_coords: (lat, lng) of starting point
+        dest_coords_list: List of (lat, lng) destinations
+
+    Returns:
+        List of travel times in minutes, aligned with dest_coords_list. Entries are None where
+        the calculation failed.
+    """
+    if not gmaps_client or not dest_coords_list:
+        return [None] * len(dest_coords_list)
+
+    origin = f"{origin_coords[0]},{origin_coords[1]}"
+
+    def fetch_batch(batch: list) -> list:
+        try:
+            matrix = gmaps_client.distance_matrix(
+                origins=[origin],
+                destinations=[f"{lat},{lng}" for lat, lng in batch],
+                mode="driving"
+            )
+            elements = matrix['rows'][0]['elements']
+        except Exception as e:
+            logger.error(f"Error calculating travel times: {e}")
+            return [None] * len(batch)
+
+        minutes = []
+        for element in elements:
+            if element.get('status') == 'OK' and element.get('duration'):
+                # Get duration in seconds and convert to minutes
+                minutes.append(round(element['duration']['value'] / 60))
+            else:
+                minutes.append(None)
+        return minutes
+
+    batches = [dest_coords_list[i:i + DISTANCE_MATRIX_MAX_DESTINATIONS]
+               for i in range(0, len(dest_coords_list), DISTANCE_MATRIX_MAX_DESTINATIONS)]
+    max_in_flight = getattr(settings, 'ROUTE_MAX_IN_FLIGHT', DEFAULT_MAX_IN_FLIGHT)
+
+    travel_times = []
+    for batch_times in run_bounded(fetch_batch, batches, max_in_flight):
+        travel_times.extend(batch_times)
+    return travel_times
+
+
 def calculate_travel_time(origin_coords: Tuple[float, float], dest_coords: Tuple[float, float]) -> Optional[int]:
     """
-    Calculate the travel time in minutes between two points using Google Directions API.
+    Calculate the travel time in minutes between two points using the Distance Matrix API.
     
     Args:
         origin_coords: (lat, lng) of starting point
@@ -316,26 +517,7 @@ def calculate_travel_time(origin_coords: Tuple[float, float], dest_coords: Tuple
     Returns:
         Travel time in minutes, or None if calculation fails
     """
-    if not gmaps_client:
-        return None
-        
-    try:
-        directions = gmaps_client.directions(
-            origin=f"{origin_coords[0]},{origin_coords[1]}", 
-            destination=f"{dest_coords[0]},{dest_coords[1]}", 
-            mode="driving"
-        )
-        
-        if not directions or not directions[0].get('legs'):
-            return None
-            
-        # Get duration in seconds and convert to minutes
-        duration_seconds = directions[0]['legs'][0]['duration']['value']
-        return round(duration_seconds / 60)
-        
-    except Exception as e:
-        logger.error(f"Error calculating travel time: {e}")
-        return None
+    return calculate_travel_times(origin_coords, [dest_coords])[0]
 
 def get_place_color(place_type: str, filters_selected: list) -> str:
     """
@@ -354,170 +536,1096 @@ def get_place_color(place_type: str, filters_selected: list) -> str:
             return FILTER_COLORS[ALL_FILTER_OPTIONS[each_place_type]]
     return DEFAULT_COLOR
 
-def get_place_website(place_id: str, gmaps_client) -> Optional[str]:
+def get_place_details(place_id: str) -> Optional[Dict[str, Any]]:
     """
-    Get place website. If no website present, returns None
+    Get the details shown when a place is opened. Only PLACE_DETAILS_FIELDS are requested.
 
     Args:
         place_id: ID of inputted place
 
     Returns:
-        Place website.
+        Dictionary with 'place_id', 'website', 'phone', 'open_now' and 'opening_hours'
+        (one line per weekday), or None if the place was not found
+    """
+    place_details = gmaps_client.place(place_id, fields=PLACE_DETAILS_FIELDS)
+    result = place_details.get('result')
+    if not result:
+        return None
+
+    opening_hours = result.get('opening_hours') or {}
+    return {
+        'place_id': place_id,
+        'website': result.get('website'),
+        'phone': result.get('formatted_phone_number'),
+        'open_now': opening_hours.get('open_now'),
+        'opening_hours': opening_hours.get('weekday_text', []),
+    }
+
+
+def sample_route_points(decoded_points: np.ndarray, spacing: float) -> list:
+    """
+    Emit evenly spaced search points by cumulative distance along the route.
+
+    Polyline vertices are dense in cities and sparse on highways, so sampling by vertex index
+    over-queries some segments and leaves gaps on others. Sampling by distance keeps the gap
+    between neighbouring search circles constant. The first and last points are always included.
+
+    Args:
+        decoded_points: (n, 2) array of [lat, lng] from geometry.decode_polyline
+        spacing: Target distance between search points in meters
+
+    Returns:
+        List of points ({'lat', 'lng'}) in route order
+    """
+    # keep the number of search points bounded on very long routes
+    return to_points(resample(decoded_points, spacing, MAX_SAMPLE_POINTS))
+
+
+def group_searches(lookups: list) -> List[Tuple[Dict[str, float], List[str]]]:
+    """
+    Group (sample point, filter) lookups into the searches that answer them: the filters of a
+    point, at most places_backend.max_types_per_call per search.
+
+    Returns:
+        List of (sample point, filters) in the order the points first appear
+    """
+    by_point = {}
+    for point, place_type in lookups:
+        by_point.setdefault((point['lat'], point['lng']), (point, []))[1].append(place_type)
+    per_call = places_backend.max_types_per_call
+    return [(point, place_types[i:i + per_call]) for point, place_types in by_point.values()
+            for i in range(0, len(place_types), per_call)]
+
+
+def search_nearby_places(point: Dict[str, float], place_types: List[str], radius: int) -> SearchResults:
+    """
+    Run one places search for one sample point and some filters.
+
+    Args:
+        point: Decoded polyline point with 'lat' and 'lng'
+        place_types: Google Places types to search for, at most places_backend.max_types_per_call
+        radius: Search radius in meters
+
+    Returns:
+        Dictionary of filter -> (raw Places results, whether they are every match in the circle),
+        empty if the search failed
+    """
+    try:
+        return places_backend.search(point, radius, place_types)
+    except Exception as e:
+        logger.error(f"Error finding {', '.join(place_types)} near ({point['lat']}, {point['lng']}): {e}")
+        return {}
+
+
+def fetch_place_tiles(cell: str, place_types: List[str]) -> Dict[str, Dict[str, Any]]:
     """
-    place_details = gmaps_client.place(place_id)
+    Search the circle around a geohash cell for some filters and store the results as their tiles.
 
+    Returns:
+        Dictionary of filter -> tile, empty if the search failed (failures are not cached)
+    """
+    center, radius = search_circle(cell)
     try:
-        return place_details.get('result').get('website')
+        found = places_backend.search(center, radius, place_types)
     except Exception as e:
-        print(f"Error fetching place website: {e}")
+        logger.error(f"Error finding {', '.join(place_types)} in tile {cell}: {e}")
+        return {}
+    return {place_type: place_tiles.put(cell, place_type, results, complete)
+            for place_type, (results, complete) in found.items()}
+
+
+def search_corridor_tiles(lookups: list, radius: int, granted: int, max_in_flight: int,
+                          spare: int = 0) -> Tuple[list, int, int]:
+    """
+    Answer places_nearby lookups from the corridor tile cache, or by direct searches.
+
+    Every lookup circle is covered by geohash cells sized after the radius, and each (cell,
+    filter) tile is filled by one search of a circle around the cell. Lookups whose tiles are
+    all cached cost nothing. On a cold corridor a lookup needs several tiles, so the budget is
+    sized in tiles: up to spare more searches are taken from places_budget on top of the
+    granted ones. Sample points are then served in route order, from tiles if the searches for
+    their missing tiles (shared with the points before them) fit in the budget, otherwise by
+    direct searches of their circle. The budget always keeps a direct search for every later
+    point. Unused searches are given back to places_budget.
+
+    Args:
+        lookups: (sample point, filter) pairs to answer, in route order
+        radius: Search radius in meters
+        granted: Searches already taken from places_budget for these lookups, one per
+            (sample point, group of places_backend.max_types_per_call filters)
+        max_in_flight: Maximum number of concurrent searches
+        spare: Most searches that may be taken from places_budget in addition
+
+    Returns:
+        Tuple of (list of (raw Places results, whether they are every match in the circle)
+        aligned with lookups, number of lookups that could not be answered for their whole
+        circle because a search failed, number of the spare searches made)
+    """
+    per_call = places_backend.max_types_per_call
+    precision = precision_for_radius(radius)
+    cells = [cells_covering(point, radius, precision) for point, _ in lookups]
+
+    tiles = {}
+    for (_, place_type), lookup_cells in zip(lookups, cells):
+        for cell in lookup_cells:
+            if (cell, place_type) not in tiles:
+                tiles[(cell, place_type)] = place_tiles.get(cell, place_type)
+
+    # lookups some cached tile is missing for, by sample point
+    pending = {}
+    for i, ((point, place_type), lookup_cells) in enumerate(zip(lookups, cells)):
+        if any(tiles[(cell, place_type)] is None for cell in lookup_cells):
+            pending.setdefault((point['lat'], point['lng']), []).append(i)
+
+    def direct_cost(indices):
+        return math.ceil(len(indices) / per_call)
+
+    def tile_searches(place_types):
+        return math.ceil(len(place_types) / per_call)
+
+    missing = {}  # cell -> filters without a tile, for every pending lookup
+    for indices in pending.values():
+        for i in indices:
+            for cell in cells[i]:
+                if tiles[(cell, lookups[i][1])] is None:
+                    missing.setdefault(cell, set()).add(lookups[i][1])
+    wanted = sum(tile_searches(place_types) for place_types in missing.values())
+    extra = places_budget.take(min(max(0, wanted - granted), spare))
+    budget = granted + extra
+
+    scheduled = {}  # cell -> filters whose tile is searched
+    direct = []  # lookup indices of each sample point searched directly
+    reserve = sum(direct_cost(indices) for indices in pending.values())
+    for indices in pending.values():
+        reserve -= direct_cost(indices)
+        needed = {}
+        for i in indices:
+            for cell in cells[i]:
+                if tiles[(cell, lookups[i][1])] is None:
+                    needed.setdefault(cell, set()).add(lookups[i][1])
+        cost = sum(tile_searches(scheduled.get(cell, set()) | place_types) - tile_searches(scheduled.get(cell, set()))
+                   for cell, place_types in needed.items())
+        if cost <= budget - reserve:
+            budget -= cost
+            for cell, place_types in needed.items():
+                scheduled.setdefault(cell, set()).update(place_types)
+        else:
+            budget -= direct_cost(indices)
+            direct.append(indices)
+    places_budget.give_back(budget)
+
+    searches = [('tile', cell, sorted(place_types)[i:i + per_call]) for cell, place_types in scheduled.items()
+                for i in range(0, len(place_types), per_call)]
+    for indices in direct:
+        point = lookups[indices[0]][0]
+        place_types = [lookups[i][1] for i in indices]
+        searches.extend(('point', point, place_types[i:i + per_call]) for i in range(0, len(place_types), per_call))
+
+    fetched = run_bounded(lambda search: fetch_place_tiles(search[1], search[2]) if search[0] == 'tile'
+                          else search_nearby_places(search[1], search[2], radius), searches, max_in_flight)
+    answers = {}
+    for (kind, where, _), found in zip(searches, fetched):
+        if kind == 'tile':
+            tiles.update(((where, place_type), tile) for place_type, tile in found.items())
+        else:
+            answers.update(((where['lat'], where['lng'], place_type), answer) for place_type, answer in found.items())
+
+    searched_directly = {i for indices in direct for i in indices}
+    results = []
+    uncovered = 0
+    for i, ((point, place_type), lookup_cells) in enumerate(zip(lookups, cells)):
+        if i in searched_directly:
+            answer = answers.get((point['lat'], point['lng'], place_type))
+            answered = answer is not None
+            answer = answer or ([], False)
+        else:
+            lookup_tiles = [tiles.get((cell, place_type)) for cell in lookup_cells]
+            answered = None not in lookup_tiles  # a tile is only missing if its search failed
+            answer = merge_tiles(lookup_tiles, point, radius)
+        uncovered += not answered
+        results.append(answer)
+    return results, uncovered, max(0, extra - budget)
+
+
+def eligible_places(results: list, exclude: Optional[set] = None) -> list:
+    """
+    Return the places of one (sample point, filter) lookup that may be shown.
+
+    Of the top CANDIDATES_PER_LOOKUP results, those with a location and a photo that are not
+    already shown qualify.
+
+    Args:
+        results: Raw Places results in the order Google returned them
+        exclude: IDs of places already shown for this route
+
+    Returns:
+        The qualifying places, in the order Google returned them
+    """
+    eligible = []
+    for place in results[:CANDIDATES_PER_LOOKUP]:
+        if not place.get('geometry') or (exclude and place.get('place_id') in exclude):
+            continue
+        photos = place.get('photos')
+        if photos and isinstance(photos, list) and len(photos) > 0:
+            eligible.append(place)
+    return eligible
+
+
+def build_place_entry(place: Dict[str, Any], filters_selected: list) -> list:
+    """
+    Build the entry for a selected place from its nearby search result. Weather and travel time
+    are left as None and filled in for all places at once by get_weather_for_points and
+    calculate_travel_times. Website, phone and hours are fetched by the client from
+    /api/place/<place_id>/ when the place is opened.
+
+    Args:
+        place: Raw Places result
+        filters_selected: All the filters selected by the user, used for the marker color
+
+    Returns:
+        [lat, lng, name, color, rating, user_ratings_total, photo_ref, weather, travel_time, place_id]
+    """
+    coords = [float(place['geometry']['location']['lat']), float(place['geometry']['location']['lng'])]
+    place_types = place.get('types', [])
+    place_color = get_place_color(place_types, filters_selected) # get the color of the marker
+
+    # try to get rating information from the nearby result
+    rating = place.get('rating')
+    user_ratings_total = place.get('user_ratings_total')
+
+    # normalize rating fields
+    try:
+        rating = float(rating) if rating is not None else None
+    except (TypeError, ValueError):
+        rating = None
+
+    try:
+        user_ratings_total = int(user_ratings_total) if user_ratings_total is not None else None
+    except (TypeError, ValueError):
+        user_ratings_total = None
+
+    # keep the photo reference, it is turned into a URL by photo_url when the response is built
+    # (the Places API (New) addresses photos by resource name instead)
+    photo_ref = place['photos'][0].get('photo_reference') or place['photos'][0].get('name')
+
+    return [coords[0], coords[1], place['name'], place_color,
+            rating, user_ratings_total, photo_ref, None, None, place['place_id']]
+
+
+def photo_url(photo_ref: Optional[str]) -> Optional[str]:
+    """
+    URL of the Google Places photo with the given reference, None without a reference or API key.
+
+    References of the Places API (New) are resource names (places/<id>/photos/<ref>). Entries
+    cached before photo references were introduced already hold a URL, which is returned as is.
+    """
+    if not photo_ref or not settings.GOOGLE_MAPS_API_KEY:
         return None
+    if photo_ref.startswith('https://'):
+        return photo_ref
+    if photo_ref.startswith('places/'):
+        return f"https://places.googleapis.com/v1/{photo_ref}/media?maxWidthPx={PHOTO_MAX_WIDTH}&key={settings.GOOGLE_MAPS_API_KEY}"
+    return f"https://maps.googleapis.com/maps/api/place/photo?maxwidth={PHOTO_MAX_WIDTH}&photoreference={photo_ref}&key={settings.GOOGLE_MAPS_API_KEY}"
+
+
+def with_photo_url(entry: list) -> list:
+    """Copy of a place entry with its photo reference replaced by the photo URL."""
+    return entry[:6] + [photo_url(entry[6])] + entry[7:]
+
+
+class SearchPlan:
+    """
+    The places_nearby searches chosen for a route, updated while the route is resolved.
+
+    Args:
+        sample_points: Points ({'lat', 'lng'}) along the route
+        lookups: (sample point index, filter) pairs to search, in route order
+        requested: Number of lookups a full search of the route would need
+        partial: True if the budget left lookups out. Also set later if lookups could not be
+            answered for the whole circle, e.g. because searches failed.
+        spare: Searches the request may still take from places_budget on top of its lookups,
+            spent on filling corridor tiles
+    """
+
+    def __init__(self, sample_points: list, lookups: list, requested: int, partial: bool, spare: int = 0):
+        self.sample_points = sample_points
+        self.lookups = lookups
+        self.requested = requested
+        self.partial = partial
+        self.spare = spare
+
+
+def plan_place_searches(decoded_points: np.ndarray, preferences: Preferences) -> SearchPlan:
+    """
+    Decide which places_nearby searches to run for a route.
+
+    The route is sampled every radius * SAMPLE_SPACING_FRACTION meters and every sample point
+    could be searched for every applied filter, places_backend.max_types_per_call filters per
+    search. At most settings.PLACES_BUDGET_PER_REQUEST searches are run, fewer if the
+    process-wide settings.PLACES_BUDGET_PER_MINUTE is running out. When that is not enough for
+    every search, the ones covering the most route with the filters most likely to find a
+    place are kept (see budget.allocate). What the request may still spend under
+    settings.PLACES_BUDGET_PER_REQUEST is the plan's spare, used to fill corridor tiles (see
+    search_corridor_tiles).
+
+    Args:
+        decoded_points: (n, 2) array of [lat, lng] from geometry.decode_polyline
+        preferences: The filters and search radius of the requesting user
 
+    Returns:
+        SearchPlan whose lookups are (sample point index, filter) pairs in route order
+    """
+    filters_selected = preferences.filters
+
+    # Determine filters to actually query (slice to manageable size)
+    applied_filters = get_applied_filters(filters_selected) if filters_selected else []
+    if not applied_filters or not gmaps_client:
+        return SearchPlan(sample_points=[], lookups=[], requested=0, partial=False)
+
+    # where the route winds or doubles back, some sample points search nothing new
+    sample_points = uncovered_points(sample_route_points(decoded_points, preferences.radius * SAMPLE_SPACING_FRACTION),
+                                     preferences.radius)
+    requested = len(sample_points) * len(applied_filters)
+
+    # the filters searched together in one call, allocate treats each group like a single filter
+    per_call = places_backend.max_types_per_call
+    groups = [tuple(applied_filters[i:i + per_call]) for i in range(0, len(applied_filters), per_call)]
+    expected_yield = {group: 1 - math.prod(1 - filter_yield.expected(each_filter) for each_filter in group)
+                      for group in groups}
+
+    per_request = getattr(settings, 'PLACES_BUDGET_PER_REQUEST', DEFAULT_PLACES_BUDGET_PER_REQUEST)
+    granted = places_budget.take(min(len(sample_points) * len(groups), per_request))
+    searches = allocate(len(sample_points), groups, granted, expected_yield)
+    lookups = [(point, each_filter) for point, group in searches for each_filter in group]
+
+    if len(lookups) < requested:
+        logger.info(f"Search budget allows {len(searches)} of {len(sample_points) * len(groups)} place "
+                    f"searches for this route")
+    return SearchPlan(sample_points=sample_points, lookups=lookups, requested=requested,
+                      partial=len(lookups) < requested, spare=max(0, per_request - granted))
+
+
+def resolve_segment_places(lookups: list, filters_selected: list, radius: int,
+                           start_coords: Optional[Tuple[float, float]] = None, fetch_weather: bool = True,
+                           index: Optional[PlaceIndex] = None, route: Optional[np.ndarray] = None,
+                           max_places: Optional[int] = None, plan: Optional[SearchPlan] = None) -> list:
+    """
+    Find, rank and enrich the places for one stretch of the route.
+
+    The places_nearby lookups run concurrently, with at most settings.ROUTE_MAX_IN_FLIGHT
+    upstream calls in flight at once, and are answered from the corridor tile cache (see
+    search_corridor_tiles) unless settings.PLACES_TILE_CACHE is off. Every eligible place found
+    that is not shown yet competes in ranking.top_k and only the max_places picked are enriched,
+    so weather and travel-time work does not grow with the route length.
+
+    Args:
+        lookups: (sample point, filter) pairs to search, in route order
+        filters_selected: All the filters selected by the user, used for the marker color
+        radius: Search radius in meters
+        start_coords: Optional tuple of (lat, lng) for calculating travel times
+        fetch_weather: Whether to fill in the weather, callers with their own weather stage pass False
+        index: The places shown so far along this route, updated in place
+        route: Simplified route polyline ((n, 2) array of [lat, lng]) for detour distances.
+            Without it, the distance to the sample point that found a place is used.
+        max_places: Number of places to pick, settings.ROUTE_TOP_K if None
+        plan: The route's SearchPlan, its spare searches may be spent on corridor tiles and it
+            is marked partial if lookups cannot be answered in full
+
+    Returns:
+        List of place entries in route order
+    """
+    max_in_flight = getattr(settings, 'ROUTE_MAX_IN_FLIGHT', DEFAULT_MAX_IN_FLIGHT)
+    if index is None:
+        index = PlaceIndex(radius)
+
+    searches = group_searches(lookups)
+
+    if getattr(settings, 'PLACES_TILE_CACHE', True):
+        searched, uncovered, spent = search_corridor_tiles(lookups, radius, len(searches), max_in_flight,
+                                                           plan.spare if plan else 0)
+        if plan:
+            plan.spare -= spent
+    else:
+        answers = {}
+        for (point, _), found in zip(searches, run_bounded(lambda search: search_nearby_places(
+                search[0], search[1], radius), searches, max_in_flight)):
+            answers.update(((point['lat'], point['lng'], place_type), answer) for place_type, answer in found.items())
+        searched = [answers.get((point['lat'], point['lng'], place_type), ([], False))
+                    for point, place_type in lookups]
+        uncovered = sum(1 for point, place_type in lookups if (point['lat'], point['lng'], place_type) not in answers)
+    if uncovered and plan:
+        logger.info(f"{uncovered} of {len(lookups)} place lookups could not be answered in full")
+        plan.partial = True
+
+    found = []  # (place, filter, lookup index)
+    for i, ((point, place_type), (results, _)) in enumerate(zip(lookups, searched)):
+        eligible = eligible_places(results, index.selected)
+        filter_yield.record(place_type, bool(eligible))
+        found.extend((place, place_type, i) for place in eligible)
+
+    # how far each place is off the route, for every candidate at once
+    locations = np.array([[place['geometry']['location']['lat'], place['geometry']['location']['lng']]
+                          for place, _, _ in found]).reshape(-1, 2)
+    if route is not None:
+        detours = distance_to_route(locations, route)
+    else:
+        detours = [distance_m(lookups[i][0]['lat'], lookups[i][0]['lng'], lat, lng)
+                   for (_, _, i), (lat, lng) in zip(found, locations)]
+    candidates = [Candidate(place, place_type, float(detour), i)
+                  for (place, place_type, i), detour in zip(found, detours)]
+
+    if max_places is None:
+        max_places = getattr(settings, 'ROUTE_TOP_K', DEFAULT_ROUTE_TOP_K)
+
+    entries = []
+    for candidate in top_k(candidates, max_places, radius):
+        place = candidate.place
+        index.select(place['place_id'])
+        try:
+            entries.append(build_place_entry(place, filters_selected))
+        except Exception as e:
+            logger.error(f"Error building place {place.get('name')}: {e}")
 
-def get_places_along_route(decoded_points: list, start_coords: Optional[Tuple[float, float]] = None) -> Dict[int, list]:
+    enrich_places(entries, start_coords, fetch_weather)
+    return entries
+
+
+def enrich_places(entries: list, start_coords: Optional[Tuple[float, float]] = None,
+                  fetch_weather: bool = True) -> None:
+    """
+    Fill in the weather and the travel time from the start of place entries, in place.
+
+    Args:
+        entries: Place entries from build_place_entry
+        start_coords: Optional tuple of (lat, lng) for calculating travel times
+        fetch_weather: Whether to fill in the weather
+    """
+    # get current weather for every place in one pass (snapped to a grid and batched)
+    if fetch_weather:
+        weather = get_weather_for_points([(entry[0], entry[1]) for entry in entries])
+        for entry, place_weather in zip(entries, weather):
+            entry[7] = place_weather
+
+    # Calculate travel times from the start point for every place in bulk
+    if start_coords:
+        travel_times = calculate_travel_times(start_coords, [(entry[0], entry[1]) for entry in entries])
+        for entry, travel_time in zip(entries, travel_times):
+            entry[8] = travel_time
+
+
+def iter_places_along_route(decoded_points: np.ndarray, preferences: Preferences,
+                            start_coords: Optional[Tuple[float, float]] = None,
+                            segment_size: Optional[int] = None, fetch_weather: bool = True,
+                            plan: Optional[SearchPlan] = None) -> Iterator[list]:
+    """
+    Find places of interest along the route, one segment of sample points at a time.
+
+    Args:
+        decoded_points: (n, 2) array of [lat, lng] from geometry.decode_polyline
+        preferences: The filters and search radius of the requesting user
+        start_coords: Optional tuple of (lat, lng) for calculating travel times
+        segment_size: Number of searched sample points resolved per segment. None resolves the
+            whole route as a single segment, which batches the most calls together.
+        fetch_weather: Whether to fill in the weather for each place
+        plan: Result of plan_place_searches, planned here if not given
+
+    Yields:
+        List of place entries for each segment, in route order
+    """
+    if plan is None:
+        plan = plan_place_searches(decoded_points, preferences)
+    if not plan.lookups:
+        return
+
+    # lookups are in route order, so consecutive runs share a sample point
+    points = [[(plan.sample_points[index], place_type) for index, place_type in group]
+              for _, group in groupby(plan.lookups, key=lambda lookup: lookup[0])]
+    segment_size = segment_size or len(points)
+    index = PlaceIndex(preferences.radius)
+    route = simplify(decoded_points, ROUTE_SIMPLIFY_TOLERANCE)
+
+    # each segment may pick its share of the route's places plus whatever earlier segments left
+    max_places = getattr(settings, 'ROUTE_TOP_K', DEFAULT_ROUTE_TOP_K)
+    picked = 0
+
+    resolved = 0  # sample points whose searches were started
+    try:
+        for i in range(0, len(points), segment_size):
+            segment = [lookup for point_lookups in points[i:i + segment_size] for lookup in point_lookups]
+            share = math.ceil(max_places * min(i + segment_size, len(points)) / len(points)) - picked
+            resolved = i + segment_size
+            entries = resolve_segment_places(segment, preferences.filters, preferences.radius, start_coords,
+                                             fetch_weather, index, route, share, plan)
+            picked += len(entries)
+            yield entries
+    finally:
+        # the budget for segments never resolved, because the consumer stopped early or a
+        # segment failed, goes back to places_budget
+        rest = [lookup for point_lookups in points[resolved:] for lookup in point_lookups]
+        if rest:
+            places_budget.give_back(len(group_searches(rest)))
+
+
+def get_places_along_route(decoded_points: np.ndarray, preferences: Preferences,
+                           start_coords: Optional[Tuple[float, float]] = None,
+                           fetch_weather: bool = True, plan: Optional[SearchPlan] = None) -> Dict[int, list]:
     """
     Find places of interest along the route.
     
     Args:
-        decoded_points: List of decoded polyline points
+        decoded_points: (n, 2) array of [lat, lng] from geometry.decode_polyline
+        preferences: The filters and search radius of the requesting user
         start_coords: Optional tuple of (lat, lng) for calculating travel times
+        fetch_weather: Whether to fill in the weather for each place
+        plan: Result of plan_place_searches, planned here if not given
     
     Returns:
         Dictionary mapping point indices to place information
     """
     places = {}
-    filters_selected = get_users_preferences()
+    for entries in iter_places_along_route(decoded_points, preferences, start_coords,
+                                           fetch_weather=fetch_weather, plan=plan):
+        for entry in entries:
+            places[len(places)] = entry
+    return places
 
-    # Protect against extremely large filter lists which can cause many external API calls
-    if not filters_selected:
-        return places
 
-    # Determine filters to actually query (slice to manageable size)
-    applied_filters = list(filters_selected)[:MAX_FILTERS_TO_QUERY]
-    global LAST_APPLIED_FILTERS
-    LAST_APPLIED_FILTERS = applied_filters
-    if len(applied_filters) < 1:
-        return places
-
-    # If the user requested many filters, widen polyline step to reduce number of search points
-    step_multiplier = 1
-    if len(filters_selected) > MAX_FILTERS_TO_QUERY:
-        step_multiplier = 1 + (len(filters_selected) // MAX_FILTERS_TO_QUERY)
-    effective_step = POLYLINE_STEP * step_multiplier
-    # print(filters_selected)
+def get_stream_format(request) -> Optional[str]:
+    """
+    Return 'sse' or 'ndjson' if the client asked for a streamed route response, otherwise None.
+    """
+    requested = request.GET.get('format')
+    if requested in ('sse', 'ndjson'):
+        return requested
+    if 'text/event-stream' in request.headers.get('Accept', ''):
+        return 'sse'
+    if 'application/x-ndjson' in request.headers.get('Accept', ''):
+        return 'ndjson'
+    return None
+
+
+STREAM_CONTENT_TYPES = {'sse': 'text/event-stream', 'ndjson': 'application/x-ndjson'}
+
+
+def encode_event(event: Dict[str, Any], stream_format: str) -> str:
+    """One event as an NDJSON line, or as a Server-Sent Event named after its type."""
+    data = json.dumps(event, cls=DjangoJSONEncoder)
+    if stream_format == 'sse':
+        return f"event: {event['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+def route_event(route: Dict[str, Any]) -> Dict[str, Any]:
+    """The first event of a stream, for a route result or the route part of one."""
+    return {
+        "type": "route",
+        "route_polyline": route["polyline"],
+        "center": route["center"],
+        "destination": route["dest_coords"],
+        "start_coords": route["start_coords"],
+        "dest_coords": route["dest_coords"],
+        "legs": route["legs"],
+    }
 
-    if not gmaps_client:
-        return places
 
-    dict_index = 0
-    for i in range(0, len(decoded_points), effective_step):
-        point = decoded_points[i]
-        try:
-            # loop through each filter, I don't think there is a way to put multiple filters into places_nearby()
-            for each_filter in applied_filters:
-                nearby = gmaps_client.places_nearby(
-                    location=(point['lat'], point['lng']),
-                    radius=SEARCH_RADIUS,  # Use dynamic radius
-                    type=each_filter,
-                )
-
-                if not nearby.get('results'):
-                    continue
-
-                for place in nearby['results'][:(PLACES_PER_COORDINATE)]:
-                    # Use the nearby search result directly to avoid an extra place() call (speeds up queries)
-                    if not place.get('geometry'):
-                        continue
-                    coords = [float(place['geometry']['location']['lat']), float(place['geometry']['location']['lng'])]
-                    place_types = place.get('types', [])
-                    place_color = get_place_color(place_types, filters_selected) # get the color of the marker
-
-                    website = get_place_website(place['place_id'], gmaps_client)
-
-                    # try to get rating information from the nearby result
-                    rating = place.get('rating')
-                    user_ratings_total = place.get('user_ratings_total')
-
-                    # normalize rating fields
-                    try:
-                        rating = float(rating) if rating is not None else None
-                    except (TypeError, ValueError):
-                        rating = None
-
-                    try:
-                        user_ratings_total = int(user_ratings_total) if user_ratings_total is not None else None
-                    except (TypeError, ValueError):
-                        user_ratings_total = None
-
-                    # get a photo URL if available (use Google Places Photo endpoint)
-                    photo_url = None
-                    photos = place.get('photos')
-                    if photos and isinstance(photos, list) and len(photos) > 0:
-                        photo_ref = photos[0].get('photo_reference')
-                        if photo_ref and settings.GOOGLE_MAPS_API_KEY:
-                            photo_url = f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=800&photoreference={photo_ref}&key={settings.GOOGLE_MAPS_API_KEY}"
-
-                        # get current weather for the place coordinates using Open-Meteo (no API key required)
-                        weather = None
-                        try:
-                            lat, lng = coords[0], coords[1]
-                            weather_resp = requests.get(
-                                f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lng}"
-                                f"&current=temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,weather_code,wind_speed_10m"
-                                f"&timezone=America%2FLos_Angeles",
-                                timeout=5
-                            )
-                            if weather_resp.status_code == 200:
-                                weather_json = weather_resp.json()
-                                current = weather_json.get('current')
-                                if current:
-                                    weather = {
-                                        'temperature_c': current.get('temperature_2m'),
-                                        'feels_like': current.get('apparent_temperature'),
-                                        'humidity': current.get('relative_humidity_2m'),
-                                        'precipitation': current.get('precipitation'),
-                                        'weather_code': current.get('weather_code'),
-                                        'wind_speed': current.get('wind_speed_10m'),
-                                        'time': current.get('time')
-                                    }
-                                    '''
-                                    weather code:
-                                        0: Clear sky
-                                        1: Mainly clear
-                                        2: Partly cloudy
-                                        3: Overcast
-                                        45/48: Foggy
-                                        51-55: Drizzle
-                                        61-65: Rain
-                                        71-75: Snow
-                                        80-82: Rain showers
-                                        95+: Thunderstorms
-                                    '''
-                        except Exception as e:
-                            logger.debug(f"Weather fetch failed for {place.get('name')}: {e}")
-
-                        if coords:
-                            # Calculate travel time from start point
-                            travel_time = None
-                            if 'start_coords' in locals():
-                                travel_time = calculate_travel_time(start_coords, (coords[0], coords[1]))
-                            
-                            # Append rating, user_ratings_total, photo_url, weather and travel_time to the place entry
-                            places[dict_index] = [coords[0], coords[1], place['name'], place_color,
-                                                rating, user_ratings_total, photo_url, weather, travel_time, website]
-                            dict_index += 1
-                            break
+def done_event(places_count: int, partial: bool, preferences: Preferences) -> Dict[str, Any]:
+    """The last event of a stream."""
+    return {
+        "type": "done",
+        "places_count": places_count,
+        "partial": partial,
+        "filters_used": preferences.filters,
+        "applied_filters": get_applied_filters(preferences.filters),
+    }
+
 
+def iter_result_events(stream_format: str, result: Dict[str, Any], preferences: Preferences,
+                       include_route: bool = True) -> Iterator[str]:
+    """
+    Yield the events of a finished route result, its places already enriched.
 
+    Args:
+        stream_format: 'ndjson' or 'sse'
+        result: Result of compute_route_result
+        preferences: The filters and search radius of the requesting user
+        include_route: Whether to start with the route event
 
-        except Exception as e:
-            logger.error(f"Error finding places near point {i}: {e}")
+    Yields:
+        Encoded events
+    """
+    if include_route:
+        yield encode_event(route_event(result), stream_format)
+    for place_id, entry in enumerate(result['places'].values()):
+        yield encode_event({"type": "place", "id": place_id, "place": with_photo_url(entry)}, stream_format)
+    yield encode_event(done_event(len(result['places']), result['partial'], preferences), stream_format)
+
+
+def iter_route_events(stream_format: str, route_data: Dict[str, Any], preferences: Preferences,
+                      start_coords: Tuple[float, float], dest_coords: Tuple[float, float],
+                      key: Optional[str] = None) -> Iterator[str]:
+    """
+    Yield the encoded route event first, then each place as soon as its segment is resolved.
+
+    Every event is a JSON object with a 'type' of 'route', 'place', 'details', 'error' or
+    'done'. For 'ndjson' each event is one line, for 'sse' each event is a Server-Sent Event
+    named after its type. Places are sent without their weather and travel time, which are
+    fetched for all of them at once when the last segment is resolved and sent in a single
+    'details' event mapping place ids to {'weather', 'travel_time'}.
+
+    With a key, the stream shares route_flights with get_route_result: if an identical request
+    is already resolving the route, its places are sent when it finishes instead of resolving
+    them again, and a stream resolving the route hands its result to the requests waiting on it.
+
+    Args:
+        stream_format: 'ndjson' or 'sse'
+        route_data: Result of get_route_data
+        preferences: The filters and search radius of the requesting user
+        start_coords: (lat, lng) of the start
+        dest_coords: (lat, lng) of the destination
+        key: route_request_key of the request
+
+    Yields:
+        Encoded events
+    """
+    route = {
+        'polyline': route_data['polyline'],
+        'center': route_data['center'],
+        'start_coords': start_coords,
+        'dest_coords': dest_coords,
+        'legs': route_data['legs'],
+    }
+    yield encode_event(route_event(route), stream_format)
+
+    call = None
+    while key is not None:
+        call, leader = route_flights.begin(key)
+        if leader:
+            break
+        try:
+            shared = route_flights.wait(call)
+        except CallAbandoned:
             continue
+        except Exception as e:
+            logger.error(f"Error resolving places along route: {e}")
+            yield encode_event({"type": "error", "error": str(e)}, stream_format)
+            yield encode_event(done_event(0, True, preferences), stream_format)
+            return
+        yield from iter_result_events(stream_format, shared, preferences, include_route=False)
+        return
+
+    # the headers are sent by now, so every failure has to end the stream with events
+    found = {}
+    plan = None
+    places = None
+    result = None
+    try:
+        plan = plan_place_searches(route_data['decoded_points'], preferences)
+        places = iter_places_along_route(route_data['decoded_points'], preferences, segment_size=STREAM_SEGMENT_POINTS,
+                                         fetch_weather=False, plan=plan)
+        for entries in places:
+            for entry in entries:
+                yield encode_event({"type": "place", "id": len(found), "place": with_photo_url(entry)}, stream_format)
+                found[len(found)] = entry
+
+        # one weather batch and one set of Distance Matrix requests for the whole route
+        enrich_places(list(found.values()), start_coords)
+        result = dict(route, places=found, partial=plan.partial)
+        yield encode_event({"type": "details",
+                            "places": {place_id: {"weather": entry[7], "travel_time": entry[8]}
+                                       for place_id, entry in found.items()}}, stream_format)
+    except Exception as e:
+        logger.error(f"Error streaming places along route: {e}")
+        yield encode_event({"type": "error", "error": str(e)}, stream_format)
+    finally:
+        # a client that disconnects closes this generator, which gives back the unmade searches
+        if places is not None:
+            places.close()
+        if call is not None:
+            if result is not None:
+                route_flights.finish(key, call, result)
+                if getattr(settings, 'ROUTE_SHARED_SINGLEFLIGHT', False):
+                    shared_route_flights.publish(key, result)
+            else:
+                # whoever waits on this stream resolves the route itself
+                route_flights.finish(key, call, abandoned=True)
+
+    yield encode_event(done_event(len(found), plan.partial if plan is not None else True, preferences),
+                       stream_format)
+
+
+def make_stream_response(events: Any, stream_format: str) -> StreamingHttpResponse:
+    """Wrap a (sync or async) iterator of encoded events in a StreamingHttpResponse."""
+    response = StreamingHttpResponse(events, content_type=STREAM_CONTENT_TYPES[stream_format])
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # stop nginx-style proxies from buffering the stream
+    return response
+
+
+def replay_route_stream(request, start: str, destination: str, preferences: Preferences,
+                        stream_format: str) -> Optional[HttpResponse]:
+    """
+    Answer a streamed route request with the result an identical request already published.
+
+    Unlike a live stream, the whole body is known before it is sent, so the response carries
+    an ETag and caching headers like a JSON route response, and its revalidations are answered
+    by route_not_modified.
+
+    Returns:
+        The response, or None if the route has to be streamed live
+    """
+    if not getattr(settings, 'ROUTE_SHARED_SINGLEFLIGHT', False):
+        return None
+    found, result = shared_route_flights.published(route_request_key(start, destination, preferences))
+    if not found:
+        return None
+    response = HttpResponse(''.join(iter_result_events(stream_format, result, preferences)),
+                            content_type=STREAM_CONTENT_TYPES[stream_format])
+    return with_route_etag(request, response, preferences, stream_format)
+
+
+class RouteError(Exception):
+    """
+    Raised when a route cannot be resolved. The message is returned to the client.
+    """
+    pass
+
+
+def resolve_route_endpoints(start: str, destination: str) -> Tuple[Dict[str, Any], Tuple[float, float], Tuple[float, float]]:
+    """
+    Get the route data and the start/destination coordinates from one Directions request.
+
+    The addresses are only geocoded on their own if directions fail, in which case the
+    route is retried between the geocoded coordinates.
+
+    Returns:
+        Tuple of (route data, start coordinates, destination coordinates)
+
+    Raises:
+        RouteError: If the route or either address cannot be resolved
+    """
+    # Get route information
+    route_data = get_route_data(start, destination)
+    if not route_data:
+        start_coords = get_coordinates_from_address(start)
+        dest_coords = get_coordinates_from_address(destination)
+        if not start_coords or not dest_coords:
+            raise RouteError("Unable to geocode addresses")
+        route_data = get_route_data(start_coords, dest_coords)
+        if not route_data:
+            raise RouteError("Unable to calculate route")
+
+    # Legs always carry their endpoints, but geocode rather than fail if one is missing
+    start_coords = route_data['start_coords'] or get_coordinates_from_address(start)
+    dest_coords = route_data['dest_coords'] or get_coordinates_from_address(destination)
+    if not start_coords or not dest_coords:
+        raise RouteError("Unable to geocode addresses")
+
+    return route_data, start_coords, dest_coords
+
+
+def compute_route_result(start: str, destination: str, preferences: Preferences,
+                         fetch_weather: bool = True) -> Dict[str, Any]:
+    """
+    Run the whole route pipeline for one request.
+
+    Returns:
+        JSON-serializable dictionary with the polyline, center, start/destination coordinates, legs,
+        places and whether they are partial
+
+    Raises:
+        RouteError: If the route or either address cannot be resolved
+    """
+    route_data, start_coords, dest_coords = resolve_route_endpoints(start, destination)
+
+    # Find places along the route, within this request's search budget
+    plan = plan_place_searches(route_data['decoded_points'], preferences)
+    places = get_places_along_route(route_data['decoded_points'], preferences, start_coords, fetch_weather, plan)
+    # print(places)
+
+    return {
+        'polyline': route_data['polyline'],
+        'center': route_data['center'],
+        'start_coords': start_coords,
+        'dest_coords': dest_coords,
+        'legs': route_data['legs'],
+        'places': places,
+        'partial': plan.partial,
+    }
+
+
+def route_request_key(start: str, destination: str, preferences: Preferences, fetch_weather: bool = True) -> str:
+    """Canonical key of a route request: normalized addresses, filters, radius and pipeline options."""
+    return make_key('route', {
+        'start': ' '.join(start.lower().split()),
+        'destination': ' '.join(destination.lower().split()),
+        'filters': list(preferences.filters),
+        'radius': preferences.radius,
+        'weather': fetch_weather,
+    })
+
+
+def get_route_result(start: str, destination: str, preferences: Preferences,
+                     fetch_weather: bool = True) -> Dict[str, Any]:
+    """
+    Return the result of compute_route_result, sharing one pipeline run between identical
+    requests in flight at the same time.
+
+    Requests are always coalesced across the threads of this process. With
+    settings.ROUTE_SHARED_SINGLEFLIGHT they are also coalesced across processes through a lock
+    in the shared cache tier, and the result is kept there for settings.ROUTE_RESULT_TTL seconds.
+    """
+    key = route_request_key(start, destination, preferences, fetch_weather)
+
+    def compute():
+        return compute_route_result(start, destination, preferences, fetch_weather)
+
+    if getattr(settings, 'ROUTE_SHARED_SINGLEFLIGHT', False):
+        return route_flights.do(key, lambda: shared_route_flights.do(key, compute))
+    return route_flights.do(key, compute)
+
+
+def route_payload(result: Dict[str, Any], preferences: Preferences) -> Dict[str, Any]:
+    """The JSON body sent to the React frontend for a result of compute_route_result."""
+    return {
+        "route_polyline": result["polyline"],
+        "center": result["center"],
+        "places": {key: with_photo_url(entry) for key, entry in result["places"].items()},
+        "partial": result["partial"],  # True if the search budget ran out before the whole route was searched
+        "destination": result["dest_coords"],
+        "start_coords": result["start_coords"], # return start and end coords for frontend zoom in/out
+        "dest_coords": result["dest_coords"],
+        "legs": result["legs"],
+        "filters_used": preferences.filters,
+        "applied_filters": get_applied_filters(preferences.filters),
+    }
+
+
+def get_response_format(request) -> Optional[str]:
+    """
+    Return 'compact' or 'json' if the client asked for a JSON route response, otherwise None.
+    """
+    requested = request.GET.get('format')
+    if requested in ('compact', 'json'):
+        return requested
+    if request.headers.get("Accept") == "application/json":
+        return 'json'
+    return None
+
+
+def format_route_payload(result: Dict[str, Any], preferences: Preferences, response_format: str) -> Dict[str, Any]:
+    """The JSON body for a result of compute_route_result in the 'json' or 'compact' format."""
+    if response_format == 'compact':
+        return compact_route_payload(result, preferences.filters, get_applied_filters(preferences.filters),
+                                     reverse('place_photo') + '?ref=')
+    return route_payload(result, preferences)
+
+
+def route_json_response(payload: Dict[str, Any], response_format: str, **kwargs) -> JsonResponse:
+    """JsonResponse for a route payload, without whitespace in the compact format."""
+    if response_format == 'compact':
+        kwargs['json_dumps_params'] = {'separators': (',', ':')}
+    return JsonResponse(payload, **kwargs)
+
+
+def route_etag_key(start: str, destination: str, preferences: Preferences, response_format: str) -> str:
+    """Cache key of the ETag of the last route response sent for a request in a format."""
+    return f"route_etag:{response_format}:{route_request_key(start, destination, preferences)}"
+
+
+def fingerprint(content: bytes) -> str:
+    """
+    ETag of a response body, the same for the same bytes in every process. It is weak, since
+    the compressed and uncompressed bodies carry the same route.
+    """
+    return f'W/"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(request, etag: str) -> bool:
+    """Whether If-None-Match lists etag, using the weak comparison of RFC 9110."""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    tags = parse_etags(header)
+    return '*' in tags or etag.removeprefix('W/') in {tag.removeprefix('W/') for tag in tags}
+
+
+def set_route_cache_headers(request, response: HttpResponse, etag: str) -> HttpResponse:
+    """
+    Add the ETag and caching headers of a route response.
+
+    Preferences passed in the query string make the URL identify the response, so shared
+    caches may keep it. Preferences from the cookie or header only allow the browser to.
+    """
+    scope = 'public' if PREFERENCES_PARAM in request.GET else 'private'
+    max_age = getattr(settings, 'ROUTE_MAX_AGE', DEFAULT_ROUTE_MAX_AGE)
+    response['ETag'] = etag
+    response['Cache-Control'] = f'{scope}, max-age={max_age}'
+    patch_vary_headers(response, ('Accept', 'Cookie', PREFERENCES_HEADER))
+    return response
+
+
+def route_not_modified(request, start: str, destination: str, preferences: Preferences) -> Optional[HttpResponse]:
+    """
+    Answer a conditional JSON or streamed route request with 304 if it revalidates the latest response.
+
+    Only the ETag recorded when that response was sent is looked up, normally in the
+    in-process tier of the cache, so revalidations never touch the pipeline.
+
+    Returns:
+        The 304 response, or None if the route has to be resolved
+    """
+    response_format = get_response_format(request) or get_stream_format(request)
+    if not response_format or not request.headers.get('If-None-Match'):
+        return None
+    found, etag = maps_cache.get(route_etag_key(start, destination, preferences, response_format),
+                                 getattr(settings, 'ROUTE_ETAG_TTL', DEFAULT_ROUTE_ETAG_TTL), namespace='route_etag')
+    if not found or not etag_matches(request, etag):
+        return None
+    return set_route_cache_headers(request, HttpResponseNotModified(), etag)
+
+
+def with_route_etag(request, response: HttpResponse, preferences: Preferences, response_format: str) -> HttpResponse:
+    """
+    Fingerprint a complete route response, record its ETag for route_not_modified and answer
+    with 304 if the client already holds it.
+    """
+    etag = fingerprint(response.content)
+    maps_cache.set(route_etag_key(request.GET['start'], request.GET['destination'], preferences, response_format),
+                   etag, getattr(settings, 'ROUTE_ETAG_TTL', DEFAULT_ROUTE_ETAG_TTL))
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    return set_route_cache_headers(request, response, etag)
+
+
+def route_response(request, result: Dict[str, Any], preferences: Preferences) -> HttpResponse:
+    """
+    Return the resolved route as JSON for the React frontend, or as the rendered HTML page.
+
+    JSON responses carry an ETag fingerprinting their body, which is recorded for
+    route_not_modified, and are answered with 304 if the client already holds them.
+    """
+    # If this request comes from React (expects JSON)
+    response_format = get_response_format(request)
+    if response_format:
+        response = route_json_response(format_route_payload(result, preferences, response_format), response_format)
+        return with_route_etag(request, response, preferences, response_format)
+
+    # Otherwise, render the HTML template
+    context = {
+        'google_api_key': settings.GOOGLE_MAPS_API_KEY,
+        'route_polyline': result['polyline'],
+        'center_lat': result['center']['lat'],
+        'center_long': result['center']['lng'],
+        'destination': result['dest_coords'],
+        'all_coords': {key: with_photo_url(entry) for key, entry in result['places'].items()},
+    }
+
+    return render(request, 'index.html', context)
+
+
+def run_route_job(job_id: str, start: str, destination: str, preferences: Preferences) -> None:
+    """
+    Run the route pipeline for a job in a background worker.
+
+    The route is saved as soon as it is known, then the places found so far after every
+    JOB_SEGMENT_POINTS sample points, so polling clients can show partial results.
+    """
+    job_store.update(job_id, status=JOB_RUNNING)
+    try:
+        route_data, start_coords, dest_coords = resolve_route_endpoints(start, destination)
+        plan = plan_place_searches(route_data['decoded_points'], preferences)
+        route = {
+            'polyline': route_data['polyline'],
+            'center': route_data['center'],
+            'start_coords': start_coords,
+            'dest_coords': dest_coords,
+            'legs': route_data['legs'],
+        }
+        segments = math.ceil(len({point for point, _ in plan.lookups}) / JOB_SEGMENT_POINTS)
+        job_store.update(job_id, result=dict(route, places={}, partial=plan.partial),
+                         progress={'segments_done': 0, 'segments_total': segments})
+
+        # every update publishes a new result, the job store never sees the worker's own dicts
+        places = {}
+        for done, entries in enumerate(iter_places_along_route(route_data['decoded_points'], preferences,
+                                                               start_coords, segment_size=JOB_SEGMENT_POINTS,
+                                                               plan=plan), start=1):
+            for entry in entries:
+                places[len(places)] = entry
+            job_store.update(job_id, result=dict(route, places=dict(places), partial=plan.partial),
+                             progress={'segments_done': done, 'segments_total': segments})
+        job_store.update(job_id, status=JOB_DONE)
+    except RouteError as e:
+        job_store.update(job_id, status=JOB_FAILED, error=str(e))
+    except Exception as e:
+        logger.error(f"Route job {job_id} failed: {e}")
+        job_store.update(job_id, status=JOB_FAILED, error="Unable to find places along the route")
+
+
+def start_route_job(start: str, destination: str, preferences: Preferences,
+                    response_format: str = 'json') -> JsonResponse:
+    """
+    Queue a route job and answer 202 with its id and status URL. An identical route request
+    already queued or running gets the existing job instead of a new one.
+
+    With settings.ROUTE_JOB_BACKGROUND off, e.g. on serverless deployments where nothing runs
+    after the response is sent, the job is run in this request instead and the finished job
+    is returned like route_job returns it, in response_format.
+    """
+    job = job_store.create(dedupe_key=route_request_key(start, destination, preferences),
+                           filters=preferences.filters, radius=preferences.radius)
+    if not getattr(settings, 'ROUTE_JOB_BACKGROUND', True):
+        if job['created']:
+            run_route_job(job['id'], start, destination, preferences)
+        return job_response(job_store.get(job['id']) or job, response_format)
+    if job['created']:
+        job_queue.submit(run_route_job, job['id'], start, destination, preferences)
+
+    status_url = reverse('route_job', args=[job['id']])
+    response = JsonResponse({'job_id': job['id'], 'status': job['status'], 'status_url': status_url}, status=202)
+    response['Location'] = status_url
+    return response
+
+
+def route_job(request, job_id):
+    """
+    GET endpoint returning a route job: its status ('queued', 'running', 'done' or 'failed'),
+    progress, error, and the result so far in the same shape as the JSON route response, or in
+    the compact format with ?format=compact.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'GET required'}, status=405)
+    job = job_store.get(job_id)
+    if job is None:
+        return JsonResponse({'error': 'Job not found'}, status=404)
+    return job_response(job, get_job_format(request))
+
+
+def get_job_format(request) -> str:
+    """Return 'compact' if the client asked for a compact job result, otherwise 'json'."""
+    return 'compact' if request.GET.get('format') == 'compact' else 'json'
+
+
+def job_response(job: Dict[str, Any], response_format: str) -> JsonResponse:
+    """The JSON response for a job record, its result formatted in response_format."""
+    # the job keeps the raw result and the preferences it was run with, it is formatted per poll
+    job = dict(job)
+    job.pop('created', None)
+    preferences = Preferences(filters=job.pop('filters', None) or [],
+                              radius=job.pop('radius', None) or SEARCH_RADIUS_METERS)
+    if job['result'] is not None:
+        job['result'] = format_route_payload(job['result'], preferences, response_format)
+    response = route_json_response(job, response_format)
+    response['Cache-Control'] = 'no-store'
+    return response
 
-    return places
 
 def index(request):
     """
     Main view for rendering the route map with nearby places.
+
+    With ?mode=job the route is resolved by a background job instead and the response is a
+    202 with the job id, see start_route_job and route_job.
     """
     # Get the user's input from the query parameters
     start = request.GET.get('start')
@@ -531,45 +1639,89 @@ def index(request):
     # Debug print to verify it works
     # print(f"Received start: {start}, destination: {destination}")
 
-    # Get route information
-    route_data = get_route_data(start, destination)
-    if not route_data:
-        return HttpResponse("Unable to calculate route", status=500)
+    preferences = get_users_preferences(request)
 
-    # Get coordinates for start and destination
-    start_coords = get_coordinates_from_address(start)
-    dest_coords = get_coordinates_from_address(destination)
-    if not start_coords or not dest_coords:
-        return HttpResponse("Unable to geocode addresses", status=500)
+    # Long routes can outlast gateway timeouts, so clients may ask for a job to poll instead
+    if request.GET.get('mode') == 'job':
+        return start_route_job(start, destination, preferences, get_job_format(request))
 
-    # Find places along the route
-    places = get_places_along_route(route_data['decoded_points'], start_coords)
-    # print(places)
+    # Repeat views of a route the client already holds are answered without resolving it
+    not_modified = route_not_modified(request, start, destination, preferences)
+    if not_modified is not None:
+        return not_modified
 
-    # If this request comes from React (expects JSON)
-    if request.headers.get("Accept") == "application/json" or request.GET.get("format") == "json":
-        return JsonResponse({
-            "route_polyline": route_data["polyline"],
-            "center": route_data["center"],
-            "places": places,
-            "destination": dest_coords,
-            "start_coords": start_coords, # return start and end coords for frontend zoom in/out
-            "dest_coords": dest_coords,
-            "filters_used": get_users_preferences(),
-            "applied_filters": LAST_APPLIED_FILTERS,
-        })
+    try:
+        # Stream the route and places as they resolve if the client asked for it
+        stream_format = get_stream_format(request)
+        if stream_format:
+            replay = replay_route_stream(request, start, destination, preferences, stream_format)
+            if replay is not None:
+                return replay
+            route_data, start_coords, dest_coords = resolve_route_endpoints(start, destination)
+            events = iter_route_events(stream_format, route_data, preferences, start_coords, dest_coords,
+                                       key=route_request_key(start, destination, preferences))
+            return make_stream_response(events, stream_format)
+
+        result = get_route_result(start, destination, preferences)
+    except RouteError as e:
+        return HttpResponse(str(e), status=500)
+
+    return route_response(request, result, preferences)
+
+def place_details(request, place_id):
+    """
+    GET endpoint returning the website, phone number and opening hours of a place.
 
-    # Otherwise, render the HTML template
-    context = {
-        'google_api_key': settings.GOOGLE_MAPS_API_KEY,
-        'route_polyline': route_data['polyline'],
-        'center_lat': route_data['center']['lat'],
-        'center_long': route_data['center']['lng'],
-        'destination': dest_coords,
-        'all_coords': places,
-    }
+    Details are only needed when a user opens a place, so they are fetched lazily here rather
+    than for every place on the route. Responses come from the maps cache when possible and
+    may be cached by the browser.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'GET required'}, status=405)
+    if not gmaps_client:
+        return JsonResponse({'error': 'Google Maps client not initialized'}, status=503)
+
+    try:
+        details = get_place_details(place_id)
+    except Exception as e:
+        logger.error(f"Error fetching details for place {place_id}: {e}")
+        return JsonResponse({'error': str(e)}, status=500)
+    if details is None:
+        return JsonResponse({'error': 'Place not found'}, status=404)
+
+    response = JsonResponse(details)
+    response['Cache-Control'] = f'private, max-age={PLACE_DETAILS_MAX_AGE}'
+    return response
+
+
+def place_photo(request):
+    """
+    GET endpoint redirecting to the Google photo with the reference given as ?ref=.
+
+    The compact route response sends photo references instead of URLs, which keeps the API key
+    and the long URLs out of the payload. The redirect may be cached by browsers and CDNs.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'GET required'}, status=405)
+    photo_ref = request.GET.get('ref', '')
+    if not PHOTO_REF_PATTERN.match(photo_ref):
+        return JsonResponse({'error': 'Invalid photo reference'}, status=400)
+    url = photo_url(photo_ref)
+    if url is None:
+        return JsonResponse({'error': 'Google Maps API key not configured'}, status=503)
+
+    response = HttpResponseRedirect(url)
+    response['Cache-Control'] = f'public, max-age={PHOTO_REDIRECT_MAX_AGE}'
+    return response
+
+
+def upstream_metrics(request):
+    """
+    GET endpoint returning latency histograms, error, cache and retry counts per upstream endpoint
+    and per view, and the circuit breaker state of every upstream.
+    """
+    return JsonResponse({**metrics.snapshot(), 'circuits': circuit_states()})
 
-    return render(request, 'index.html', context)
 
 @csrf_exempt
 def deepseek_api(request):
@@ -586,4 +1738,13 @@ def deepseek_api(request):
         return JsonResponse({'result': result})
     except Exception as e:
         logger.error(f"DeepSeek API error: {e}")
-        return JsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+def cache_stats(request):
+    """GET endpoint returning cache hit/miss counters and how often each tag classifier path answered."""
+    return JsonResponse({
+        'maps_cache': maps_cache.stats(),
+        'tag_cache': get_tag_cache().stats(),
+        'tag_classifier': tag_classifier.stats(),
+    })
@@ -0,0 +1,193 @@
+"""
+Current weather for places along a route, using Open-Meteo (no API key required).
+
+Coordinates are snapped to a grid so that places a few hundred metres apart share one
+forecast, and every uncached grid cell of a route is fetched in a single multi-location
+request per batch.
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+
+from .cache import LRUCache, TieredCache
+from .concurrency import run_bounded, DEFAULT_MAX_IN_FLIGHT
+from .http_client import get_session, send_async
+from .instrumentation import CACHE_MISS, span
+
+logger = logging.getLogger(__name__)
+
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+CURRENT_FIELDS = "temperature_2m,relative_humidity_2m,apparent_temperature,precipitation,weather_code,wind_speed_10m"
+WEATHER_TIMEZONE = "America/Los_Angeles"
+DEFAULT_GRID_DEGREES = 0.05  # ~5 km cells
+DEFAULT_CACHE_TTL = 10 * 60  # seconds
+DEFAULT_BATCH_SIZE = 50  # locations per Open-Meteo request, keeps the URL a sane length
+
+# one keep-alive session for every Open-Meteo call, with the timeouts and retries of http_client
+session = get_session('weather')
+weather_cache = TieredCache(LRUCache(4096))
+
+
+def snap_to_grid(lat: float, lng: float, grid: float) -> Tuple[float, float]:
+    """
+    Snap a coordinate to the nearest grid point.
+
+    Args:
+        lat: Latitude
+        lng: Longitude
+        grid: Cell size in degrees
+
+    Returns:
+        (lat, lng) of the grid point, rounded so it can be used as a cache key
+    """
+    return round(round(lat / grid) * grid, 4), round(round(lng / grid) * grid, 4)
+
+
+def parse_current_weather(forecast: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Turn one Open-Meteo forecast object into the weather dict sent to the frontend.
+
+    weather code:
+        0: Clear sky
+        1: Mainly clear
+        2: Partly cloudy
+        3: Overcast
+        45/48: Foggy
+        51-55: Drizzle
+        61-65: Rain
+        71-75: Snow
+        80-82: Rain showers
+        95+: Thunderstorms
+    """
+    current = forecast.get('current') if forecast else None
+    if not current:
+        return None
+
+    return {
+        'temperature_c': current.get('temperature_2m'),
+        'feels_like': current.get('apparent_temperature'),
+        'humidity': current.get('relative_humidity_2m'),
+        'precipitation': current.get('precipitation'),
+        'weather_code': current.get('weather_code'),
+        'wind_speed': current.get('wind_speed_10m'),
+        'time': current.get('time')
+    }
+
+
+def _weather_params(cells: List[Tuple[float, float]]) -> Dict[str, str]:
+    return {
+        'latitude': ','.join(str(lat) for lat, _ in cells),
+        'longitude': ','.join(str(lng) for _, lng in cells),
+        'current': CURRENT_FIELDS,
+        'timezone': WEATHER_TIMEZONE,
+    }
+
+
+def _parse_batch(status_code: int, body: Any, count: int) -> List[Optional[Dict[str, Any]]]:
+    if status_code != 200:
+        logger.debug(f"Weather fetch failed with status {status_code}")
+        return [None] * count
+
+    # Open-Meteo returns a single object for one location and a list for several
+    forecasts = [body] if isinstance(body, dict) else body
+    weather = [parse_current_weather(forecast) for forecast in forecasts]
+    return (weather + [None] * count)[:count]
+
+
+def fetch_weather_batch(cells: List[Tuple[float, float]]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Fetch the current weather for several grid cells with one Open-Meteo request.
+
+    Args:
+        cells: List of (lat, lng) coordinates
+
+    Returns:
+        List of weather dicts aligned with cells, None where the fetch failed
+    """
+    try:
+        with span('weather') as current:
+            current.cache = CACHE_MISS
+            response = session.get(OPEN_METEO_URL, params=_weather_params(cells))
+            current.status = response.status_code
+        return _parse_batch(response.status_code, response.json() if response.status_code == 200 else None, len(cells))
+    except Exception as e:
+        logger.debug(f"Weather fetch failed for {len(cells)} locations: {e}")
+        return [None] * len(cells)
+
+
+async def fetch_weather_batch_async(cells: List[Tuple[float, float]]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Async version of fetch_weather_batch that uses the shared httpx connection pool.
+    """
+    try:
+        with span('weather') as current:
+            current.cache = CACHE_MISS
+            response = await send_async('weather', 'GET', OPEN_METEO_URL, params=_weather_params(cells))
+            current.status = response.status_code
+        return _parse_batch(response.status_code, response.json() if response.status_code == 200 else None, len(cells))
+    except Exception as e:
+        logger.debug(f"Weather fetch failed for {len(cells)} locations: {e}")
+        return [None] * len(cells)
+
+
+def _lookup_cached_cells(coords_list: List[Tuple[float, float]]) -> Tuple[list, dict, list]:
+    """
+    Snap coordinates to the grid and split the cells into cached and missing ones.
+
+    Returns:
+        Tuple of (cell per coordinate, weather by cached cell, batches of missing cells)
+    """
+    grid = getattr(settings, 'WEATHER_GRID_DEGREES', DEFAULT_GRID_DEGREES)
+    ttl = getattr(settings, 'WEATHER_CACHE_TTL', DEFAULT_CACHE_TTL)
+    cells = [snap_to_grid(lat, lng, grid) for lat, lng in coords_list]
+
+    weather_by_cell = {}
+    missing = []
+    for cell in dict.fromkeys(cells):
+        found, weather = weather_cache.get(f"weather:{cell[0]},{cell[1]}", ttl, namespace='weather')
+        if found:
+            weather_by_cell[cell] = weather
+        else:
+            missing.append(cell)
+
+    batches = [missing[i:i + DEFAULT_BATCH_SIZE] for i in range(0, len(missing), DEFAULT_BATCH_SIZE)]
+    return cells, weather_by_cell, batches
+
+
+def _store_batches(batches: list, batch_results: list, weather_by_cell: dict) -> None:
+    ttl = getattr(settings, 'WEATHER_CACHE_TTL', DEFAULT_CACHE_TTL)
+    for batch, batch_weather in zip(batches, batch_results):
+        for cell, weather in zip(batch, batch_weather):
+            weather_by_cell[cell] = weather
+            # failed lookups are not cached so the next route retries them
+            if weather is not None:
+                weather_cache.set(f"weather:{cell[0]},{cell[1]}", weather, ttl)
+
+
+def get_weather_for_points(coords_list: List[Tuple[float, float]]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Get the current weather for many coordinates with as few Open-Meteo calls as possible.
+
+    Args:
+        coords_list: List of (lat, lng) coordinates
+
+    Returns:
+        List of weather dicts aligned with coords_list, None where unavailable
+    """
+    cells, weather_by_cell, batches = _lookup_cached_cells(coords_list)
+    max_in_flight = getattr(settings, 'ROUTE_MAX_IN_FLIGHT', DEFAULT_MAX_IN_FLIGHT)
+    _store_batches(batches, run_bounded(fetch_weather_batch, batches, max_in_flight), weather_by_cell)
+    return [weather_by_cell.get(cell) for cell in cells]
+
+
+async def get_weather_for_points_async(coords_list: List[Tuple[float, float]]) -> List[Optional[Dict[str, Any]]]:
+    """
+    Async version of get_weather_for_points. The batches are fetched concurrently.
+    """
+    cells, weather_by_cell, batches = _lookup_cached_cells(coords_list)
+    batch_results = await asyncio.gather(*(fetch_weather_batch_async(batch) for batch in batches))
+    _store_batches(batches, batch_results, weather_by_cell)
+    return [weather_by_cell.get(cell) for cell in cells]
@@ -0,0 +1,118 @@
+"""
+Compact wire format of the route JSON response (?format=compact).
+
+The default JSON response sends every place as a positional list carrying its full marker
+color dict, its weather dict and a photo URL with the API key in it, so a dense route repeats
+the same few colors and weather reports hundreds of times. The compact format is columnar
+instead: one array per field, colors and weather reports listed once in tables and referenced
+by index, and photos sent as references the client resolves through /api/photo/. Together with
+gzip or brotli (see compression.py) it is several times smaller than the default format.
+
+Version 1:
+    {
+        "v": 1,
+        "route_polyline", "center", "start_coords", "dest_coords", "legs", "partial",
+        "filters_used", "applied_filters": as in the default format,
+        "palette": [color, ...],
+        "weather": [weather, ...],
+        "photo_url": prefix of the photo URL, followed by the URL-encoded photo reference,
+        "places": {"lat": [...], "lng": [...], "name": [...], "color": [palette index, ...],
+                   "rating": [...], "ratings_total": [...], "photo": [reference or null, ...],
+                   "weather": [weather index or null, ...], "travel_time": [...], "place_id": [...]}
+    }
+
+Every column has one value per place, in the order of the default format's places.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+COMPACT_FORMAT_VERSION = 1
+COORDINATE_DIGITS = 6  # about 0.1 m, finer than any marker needs
+
+PLACE_COLUMNS = ('lat', 'lng', 'name', 'color', 'rating', 'ratings_total', 'photo', 'weather',
+                 'travel_time', 'place_id')
+
+
+class ValueTable:
+    """
+    List of distinct JSON values, each added once and referenced by its index.
+    """
+
+    def __init__(self):
+        self.values: List[Any] = []
+        self._index: Dict[str, int] = {}
+
+    def add(self, value: Any) -> Optional[int]:
+        """Index of value in the table, adding it if it is new. None stays None."""
+        if value is None:
+            return None
+        key = json.dumps(value, sort_keys=True)
+        index = self._index.get(key)
+        if index is None:
+            index = self._index[key] = len(self.values)
+            self.values.append(value)
+        return index
+
+
+def compact_places(places: Dict[Any, list], palette: ValueTable, weather: ValueTable) -> Dict[str, list]:
+    """
+    Turn the place entries of a route result into columns.
+
+    Args:
+        places: The entries [lat, lng, name, color, rating, user_ratings_total, photo_ref, weather,
+            travel_time, place_id], in display order
+        palette: Table the marker colors are added to
+        weather: Table the weather reports are added to
+
+    Returns:
+        Dictionary mapping each of PLACE_COLUMNS to its values
+    """
+    columns = {name: [] for name in PLACE_COLUMNS}
+    for lat, lng, name, color, rating, ratings_total, photo, place_weather, travel_time, place_id in places.values():
+        columns['lat'].append(round(lat, COORDINATE_DIGITS))
+        columns['lng'].append(round(lng, COORDINATE_DIGITS))
+        columns['name'].append(name)
+        columns['color'].append(palette.add(color))
+        columns['rating'].append(rating)
+        columns['ratings_total'].append(ratings_total)
+        columns['photo'].append(photo)
+        columns['weather'].append(weather.add(place_weather))
+        columns['travel_time'].append(travel_time)
+        columns['place_id'].append(place_id)
+    return columns
+
+
+def compact_route_payload(result: Dict[str, Any], filters_used: list, applied_filters: list,
+                          photo_url: str) -> Dict[str, Any]:
+    """
+    The compact JSON body for a result of compute_route_result.
+
+    Args:
+        result: The route result, its places holding photo references
+        filters_used: The filters of the requesting user
+        applied_filters: The filters that were searched, the first MAX_FILTERS_TO_QUERY of
+            filters_used
+        photo_url: Prefix the client appends a URL-encoded photo reference to
+
+    Returns:
+        JSON-serializable dictionary in the version COMPACT_FORMAT_VERSION format
+    """
+    palette = ValueTable()
+    weather = ValueTable()
+    places = compact_places(result['places'], palette, weather)
+    return {
+        'v': COMPACT_FORMAT_VERSION,
+        'route_polyline': result['polyline'],
+        'center': result['center'],
+        'start_coords': result['start_coords'],
+        'dest_coords': result['dest_coords'],
+        'legs': result['legs'],
+        'partial': result['partial'],
+        'filters_used': filters_used,
+        'applied_filters': applied_filters,
+        'palette': palette.values,
+        'weather': weather.values,
+        'photo_url': photo_url,
+        'places': places,
+    }
@@ -1,7 +1,29 @@
-import React from "react";
+import React, { useEffect, useState } from "react";
 import "./DetailsModal.css";
 
 export default function DetailsModal({ poi, onClose }) {
+    const [details, setDetails] = useState(null);
+
+    // Website, phone and hours are only fetched once the place is opened
+    useEffect(() => {
+        setDetails(null);
+        if (!poi?.place_id) return;
+
+        const controller = new AbortController();
+        const BACKEND_BASE = (typeof import.meta !== 'undefined' && import.meta.env && import.meta.env.VITE_BACKEND_URL)
+            || 'http://127.0.0.1:8000';
+        fetch(`${BACKEND_BASE.replace(/\/$/, '')}/api/place/${encodeURIComponent(poi.place_id)}/`, { signal: controller.signal })
+            .then((res) => {
+                if (!res.ok) throw new Error(`Place details request failed: ${res.status}`);
+                return res.json();
+            })
+            .then(setDetails)
+            .catch((err) => {
+                if (err.name !== 'AbortError') console.error('Error fetching place details:', err);
+            });
+        return () => controller.abort();
+    }, [poi?.place_id]);
+
     if (!poi) return null;
 
     const {
@@ -67,6 +89,27 @@ export default function DetailsModal({ poi, onClose }) {
                 <p>No rating available</p>
             )}
 
+            {details?.website && (
+                <p>
+                    <span className="material-symbols-outlined">language</span>
+                    <a href={details.website} target="_blank" rel="noopener noreferrer">Website</a>
+                </p>
+            )}
+
+            {details?.phone && (
+                <p><span className="material-symbols-outlined">call</span> {details.phone}</p>
+            )}
+
+            {details?.opening_hours?.length > 0 && (
+                <div className="opening-hours">
+                    <p>
+                        <span className="material-symbols-outlined">storefront</span>
+                        {details.open_now === true ? "Open now" : details.open_now === false ? "Closed now" : "Hours"}
+                    </p>
+                    {details.opening_hours.map((line) => <p key={line}>{line}</p>)}
+                </div>
+            )}
+
             {weather ? (
                 <div className="weather-info">
                     <p><span className="material-symbols-outlined">cloud</span> {getWeatherDescription(weather.weather_code)}</p>
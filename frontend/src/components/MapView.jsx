@@ -96,39 +96,60 @@ export default function MapView({ start, end, setSelectedPOI, preferencesVersion
         // Prefer explicit env var VITE_BACKEND_URL in dev; fall back to localhost:8000 if not set
         const BACKEND_BASE = (typeof import.meta !== 'undefined' && import.meta.env && import.meta.env.VITE_BACKEND_URL)
             || 'http://127.0.0.1:8000';
-        const endpoint = `${BACKEND_BASE.replace(/\/$/, '')}/?start=${encodeURIComponent(start)}&destination=${encodeURIComponent(end)}&format=json`;
+        const endpoint = `${BACKEND_BASE.replace(/\/$/, '')}/?start=${encodeURIComponent(start)}&destination=${encodeURIComponent(end)}&format=ndjson`
+            + (localStorage.getItem('preferencesToken') ? `&prefs=${encodeURIComponent(localStorage.getItem('preferencesToken'))}` : '');
         console.debug('Fetching route from', endpoint);
 
         const controller = new AbortController();
         // Increase timeout to 60s to allow the backend more time when many filters are selected
         const timeout = setTimeout(() => controller.abort(), 60000); // 60s timeout
 
+        // Reset the map, then fill it in as the backend streams the route and each place
+        setRoute([]);
+        setPOIs([]);
+        setStartCoords(null);
+        setDestCoords(null);
+
+        const toPOI = ([lat, lng, name, color, rating, user_ratings_total, photo_url, weather, travel_time, place_id]) =>
+            ({ lat, lng, name, color, rating, user_ratings_total, photo_url, weather, travel_time, place_id });
+
+        const handleEvent = (event) => {
+            if (event.type === 'route') {
+                if (!event.route_polyline) throw new Error('No route data');
+                setRoute(polyline.decode(event.route_polyline).map(([lat, lng]) => ({ lat, lng })));
+                setStartCoords(processCoords(event.start_coords));
+                setDestCoords(processCoords(event.dest_coords));
+                setIsLoading(false); // the route is on screen, places keep arriving
+            } else if (event.type === 'place') {
+                setPOIs((prev) => [...prev, toPOI(event.place)]);
+            } else if (event.type === 'details') {
+                // weather and travel times arrive for all places at once, keyed by place id
+                setPOIs((prev) => prev.map((poi, id) => (event.places[id] ? { ...poi, ...event.places[id] } : poi)));
+            } else if (event.type === 'done') {
+                console.debug('route response filters_used:', event.filters_used, 'applied_filters:', event.applied_filters, 'places_count:', event.places_count, 'partial:', event.partial)
+            } else if (event.type === 'error') {
+                console.error('Route stream error', event.error);
+            }
+        };
+
         fetch(endpoint, { signal: controller.signal })
-            .then((res) => {
+            .then(async (res) => {
                 if (!res.ok) {
                     // Try to get any text for debugging
-                    return res.text().then((t) => { throw new Error(`HTTP ${res.status}: ${t.slice(0,200)}`); });
+                    const t = await res.text();
+                    throw new Error(`HTTP ${res.status}: ${t.slice(0,200)}`);
+                }
+                const reader = res.body.getReader();
+                const decoder = new TextDecoder();
+                let buffered = '';
+                for (;;) {
+                    const { done, value } = await reader.read();
+                    buffered += decoder.decode(value || new Uint8Array(), { stream: !done });
+                    const lines = buffered.split('\n');
+                    buffered = lines.pop();
+                    lines.filter((line) => line.trim()).forEach((line) => handleEvent(JSON.parse(line)));
+                    if (done) break;
                 }
-                const contentType = res.headers.get('content-type') || '';
-                if (contentType.includes('application/json')) return res.json();
-                return res.text().then((t) => { throw new Error(`Expected JSON but got: ${t.slice(0,200)}`); });
-            })
-            .then((data) => {
-                console.debug('route response filters_used:', data.filters_used, 'applied_filters:', data.applied_filters, 'places_count:', Object.keys(data.places || {}).length)
-                if (!data || !data.route_polyline) throw new Error('No route data');
-
-                const decodedRoute = polyline.decode(data.route_polyline).map(([lat, lng]) => ({ lat, lng }));
-                const placesArray = Object.values(data.places || {}).map(
-                    ([lat, lng, name, color, rating, user_ratings_total, photo_url, weather, travel_time]) => 
-                        ({ lat, lng, name, color, rating, user_ratings_total, photo_url, weather, travel_time}));
-                const finalStart = processCoords(data.start_coords);
-                const finalDest = processCoords(data.dest_coords);
-
-                // Batch State Updates
-                setRoute(decodedRoute);
-                setPOIs(placesArray);
-                setStartCoords(finalStart);
-                setDestCoords(finalDest);
             })
             .catch((err) => {
                 if (err.name === 'AbortError') console.error('Route fetch aborted (timeout)');
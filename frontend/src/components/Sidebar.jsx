@@ -62,6 +62,10 @@ export default function Sidebar({ setSelectedPOI, onPreferencesUpdated }) {
             }
 
             if (resp.ok) {
+                // MapView sends this token with every route request
+                if (bodyJson && bodyJson.preferences_token) {
+                    localStorage.setItem('preferencesToken', bodyJson.preferences_token)
+                }
                 setUpdateMessage('Preferences updated')
                 return true
             } else {